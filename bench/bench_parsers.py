@@ -0,0 +1,54 @@
+#!/usr/local/bin/python3
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from moviescraper import parsing, streaming
+import synthetic
+
+# Compare parser backends on the sample site and on synthetic listings of increasing size.
+#
+#   python bench/bench_parsers.py [--repeat N]
+
+SAMPLE_SITE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test', 'sample_site.html')
+SAMPLE_SELECTOR = 'div#test-id > div.test-class > span'
+
+
+def fixtures():
+    with open(SAMPLE_SITE) as html_file:
+        yield 'sample_site.html', html_file.read(), SAMPLE_SELECTOR
+    for films in (100, 1000, 5000):
+        yield 'synthetic {} films'.format(films), synthetic.listing_page(films, noise=films // 5), synthetic.LIST_SELECTOR
+
+
+def bench(markup, parser, selector, repeat):
+    def run():
+        if parser == parsing.STREAM:
+            return list(streaming.select_strings(streaming.text_chunks(markup), selector))
+        return parsing.select(parsing.make_soup(markup, parser, selector), selector)
+    count = len(run())
+    return min(timeit.repeat(run, number=1, repeat=repeat)), count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark HTML parser backends')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    parsers = [parser for parser in parsing.PARSERS if parser != parsing.LXML or parsing.LXML_AVAILABLE]
+    print('{:<24} {:>10} {}'.format('fixture', 'size', ''.join('{:>14}'.format(p) for p in parsers)))
+    for name, markup, selector in fixtures():
+        timings = [bench(markup, parser, selector, args.repeat) for parser in parsers]
+        print('{:<24} {:>10} {}'.format(
+            name, len(markup), ''.join('{:>11.2f} ms'.format(seconds * 1000) for seconds, count in timings)
+        ))
+        if len(set(count for seconds, count in timings)) != 1:
+            print('  WARNING: backends disagree on match count {}'.format([count for seconds, count in timings]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/local/bin/python3
+
+import json
+import os
+import re
+
+import synthetic
+
+# Offline fixtures for the benchmark suite.
+#
+# Recorded fixtures live in bench/fixtures/ with a manifest.json written by record.py. Each
+# entry holds the theater's config, so a fixture is replayed with exactly the selector and
+# text search used in production. Synthetic listings are generated in memory on demand.
+# Every fixture is served from a fake URL, so replays still go through the Fetcher.
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 1
+SAMPLE_SITE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test', 'sample_site.html')
+SAMPLE_SELECTOR = 'div#test-id > div.test-class > span'
+DEFAULT_SYNTHETIC_SIZES = (100, 1000, 5000)
+LARGE_SYNTHETIC_SIZES = (100, 1000, 5000, 20000)
+
+
+def slug(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def fixture_url(name):
+    return 'http://fixtures.invalid/{}/'.format(slug(name))
+
+
+def fixture(name, body, theater_config):
+    theater_config = dict(theater_config, theater_name=name, site_url=fixture_url(name))
+    return {'name': name, 'url': theater_config['site_url'], 'body': body, 'theater': theater_config}
+
+
+def read_manifest(directory = FIXTURE_DIR):
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return {'version': MANIFEST_VERSION, 'fixtures': []}
+    with open(path, encoding='utf-8') as manifest_file:
+        return json.load(manifest_file)
+
+
+def write_manifest(manifest, directory = FIXTURE_DIR):
+    with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=4)
+        manifest_file.write('\n')
+
+
+def recorded(directory = FIXTURE_DIR):
+    for entry in read_manifest(directory)['fixtures']:
+        with open(os.path.join(directory, entry['file']), encoding='utf-8') as fixture_file:
+            yield fixture(entry['name'], fixture_file.read(), entry['theater'])
+
+
+def sample():
+    with open(SAMPLE_SITE, encoding='utf-8') as html_file:
+        yield fixture('sample_site', html_file.read(), {'list_selector': SAMPLE_SELECTOR})
+
+
+def generated(sizes = DEFAULT_SYNTHETIC_SIZES):
+    for films in sizes:
+        yield fixture(
+            'synthetic-{}'.format(films), synthetic.listing_page(films, noise=films // 5),
+            {'list_selector': synthetic.LIST_SELECTOR}
+        )
+
+
+def all_fixtures(directory = FIXTURE_DIR, sizes = DEFAULT_SYNTHETIC_SIZES):
+    return list(sample()) + list(recorded(directory)) + list(generated(sizes))
@@ -0,0 +1,80 @@
+#!/usr/local/bin/python3
+
+import argparse
+import datetime
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from moviescraper import config, fetch
+import fixtures
+import synthetic
+
+# Record theater pages as offline benchmark fixtures.
+#
+#   python bench/record.py [--config theaters.json] [--theaters NAME ...] [--synthetic 20000 ...]
+#
+# Each page is saved under bench/fixtures/ and listed in manifest.json together with the
+# theater's config. Re-recording a theater replaces its fixture. --synthetic also writes
+# generated listings of the given film counts, for sizes no real site reaches.
+
+
+def record_theater(fetcher, theater_info, directory):
+    logging.info('Recording {} from {}'.format(theater_info['theater_name'], theater_info['site_url']))
+    response = fetcher.get(theater_info['site_url'])
+    response.raise_for_status()
+    return save_fixture(directory, theater_info['theater_name'], response.text, theater_info)
+
+
+def save_fixture(directory, name, body, theater_info):
+    file_name = fixtures.slug(name) + '.html'
+    with open(os.path.join(directory, file_name), 'w', encoding='utf-8') as fixture_file:
+        fixture_file.write(body)
+    return {
+        'name': name,
+        'file': file_name,
+        'source_url': theater_info.get('site_url'),
+        'recorded_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'bytes': len(body.encode('utf-8')),
+        'theater': dict((field, value) for field, value in theater_info.items()
+                        if field not in ('theater_name', 'site_url'))
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Record theater pages as benchmark fixtures')
+    parser.add_argument('--config', default=config.DEFAULT_CONFIG, help='theater config file')
+    parser.add_argument('--theaters', nargs='*', help='only record these theaters')
+    parser.add_argument('--synthetic', nargs='*', type=int, default=[], metavar='FILMS',
+                        help='also write synthetic listings with these film counts')
+    parser.add_argument('--output', default=fixtures.FIXTURE_DIR, help='fixture directory')
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    manifest = fixtures.read_manifest(args.output)
+    entries = dict((entry['name'], entry) for entry in manifest['fixtures'])
+
+    fetcher = fetch.Fetcher()
+    for theater_info in config.load_config(args.config):
+        if args.theaters and theater_info['theater_name'] not in args.theaters:
+            continue
+        try:
+            entries[theater_info['theater_name']] = record_theater(fetcher, theater_info, args.output)
+        except Exception as error:
+            logging.error('Could not record {}: {!r}'.format(theater_info['theater_name'], error))
+
+    for films in args.synthetic:
+        name = 'recorded-synthetic-{}'.format(films)
+        body = synthetic.listing_page(films, noise=films // 5)
+        entries[name] = save_fixture(args.output, name, body, {'list_selector': synthetic.LIST_SELECTOR})
+
+    manifest['fixtures'] = sorted(entries.values(), key=lambda entry: entry['name'])
+    fixtures.write_manifest(manifest, args.output)
+    logging.info('{} fixtures in {}'.format(len(manifest['fixtures']), args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+#!/usr/local/bin/python3
+
+import argparse
+import datetime
+import gc
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from moviescraper import fetch, moviescraper, parsing
+import fixtures
+
+# Replay offline fixtures through the scraper and report cost per stage.
+#
+#   python bench/run.py [--repeat N] [--large] [--parser strainer] [--output results.json]
+#                       [--baseline old.json]
+#
+# For every fixture this times fetch (through a Fetcher backed by a LocalTransport), parse,
+# select, text_search, filter and normalize separately. It then times a full
+# Theater.movies() call and measures its peak traced memory and the blocks it leaves
+# allocated. Last, it times TheaterList.movies() over all fixtures, sequentially and
+# concurrently. Results are written as JSON. With --baseline, any stage more than
+# --tolerance slower than in the baseline is reported and the exit status is 1.
+
+RESULTS_VERSION = 1
+STAGES = ('fetch', 'parse', 'select', 'text_search', 'filter', 'normalize')
+
+
+def summarize(samples):
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'max': max(samples),
+        'runs': len(samples)
+    }
+
+
+def make_theater(fixture, fetcher, parser, movie_filter):
+    theater = moviescraper.Theater(fetcher=fetcher, parser=parser, **fixture['theater'])
+    theater.movie_filter = movie_filter
+    return theater
+
+
+def time_stages(theater, repeat):
+    # Mirrors the steps Theater.movies() takes, timing each one on its own
+    samples = dict((stage, []) for stage in STAGES)
+    movies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        page = theater._get_page()
+        fetched = time.perf_counter()
+        soup = parsing.make_soup(page, theater.parser, theater.list_selector)
+        parsed = time.perf_counter()
+        movies = [movie.string for movie in parsing.select(soup, theater.list_selector)]
+        selected = time.perf_counter()
+        if theater.text_search is not None:
+            movies = re.search(theater.text_search, ', '.join(movies)).group(1).split(', ')
+        searched = time.perf_counter()
+        if len(theater.movie_filter) > 0:
+            movies = theater._filter_movie_list(movies, theater.movie_filter)
+        filtered = time.perf_counter()
+        movies = theater._strip_movie_titles([movie for movie in movies if movie is not None])
+        normalized = time.perf_counter()
+        for stage, elapsed in zip(STAGES, (fetched - start, parsed - fetched, selected - parsed,
+                                           searched - selected, filtered - searched, normalized - filtered)):
+            samples[stage].append(elapsed)
+    return dict((stage, summarize(stage_samples)) for stage, stage_samples in samples.items()), len(movies)
+
+
+def time_movies(fixture, fetcher, parser, movie_filter, repeat):
+    samples = []
+    for _ in range(repeat):
+        theater = make_theater(fixture, fetcher, parser, movie_filter)
+        start = time.perf_counter()
+        theater.movies()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def measure_memory(fixture, fetcher, parser, movie_filter):
+    theater = make_theater(fixture, fetcher, parser, movie_filter)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        theater.movies()
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    # tracemalloc only sees live blocks, so this is what the call left allocated, not every
+    # allocation it made along the way
+    retained = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    return {'peak_bytes': peak, 'retained_blocks': retained}
+
+
+def time_theater_list(all_fixtures, fetcher, parser, max_workers, repeat):
+    samples = []
+    for _ in range(repeat):
+        theater_list = moviescraper.TheaterList(fetcher=fetcher, parser=parser)
+        for fixture in all_fixtures:
+            theater_list.add_theater(moviescraper.Theater(**fixture['theater']))
+        start = time.perf_counter()
+        theater_list.movies(max_workers=max_workers)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, universal_newlines=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    all_fixtures = fixtures.all_fixtures(
+        args.fixtures, fixtures.LARGE_SYNTHETIC_SIZES if args.large else fixtures.DEFAULT_SYNTHETIC_SIZES)
+    transport = fetch.LocalTransport()
+    for fixture in all_fixtures:
+        transport.add_page(fixture['url'], fixture['body'], headers={'Content-Type': 'text/html; charset=utf-8'})
+    fetcher = fetch.Fetcher(transport=transport)
+
+    results = {
+        'version': RESULTS_VERSION,
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parser': args.parser,
+        'lxml_available': parsing.LXML_AVAILABLE,
+        'repeat': args.repeat,
+        'fixtures': {},
+    }
+    for fixture in all_fixtures:
+        logging.info('Benchmarking {}'.format(fixture['name']))
+        theater = make_theater(fixture, fetcher, args.parser, args.filter)
+        stages, movie_count = time_stages(theater, args.repeat)
+        results['fixtures'][fixture['name']] = {
+            'bytes': len(fixture['body'].encode('utf-8')),
+            'movies': movie_count,
+            'stages': stages,
+            'movies_call': time_movies(fixture, fetcher, args.parser, args.filter, args.repeat),
+            'memory': measure_memory(fixture, fetcher, args.parser, args.filter)
+        }
+    results['theater_list'] = {
+        'theaters': len(all_fixtures),
+        'sequential': time_theater_list(all_fixtures, fetcher, args.parser, 1, args.repeat),
+        'concurrent': time_theater_list(all_fixtures, fetcher, args.parser, args.workers, args.repeat)
+    }
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for name, fixture_results in results['fixtures'].items():
+        baseline_fixture = baseline.get('fixtures', {}).get(name)
+        if baseline_fixture is None:
+            continue
+        timings = dict(fixture_results['stages'], movies_call=fixture_results['movies_call'])
+        baseline_timings = dict(baseline_fixture['stages'], movies_call=baseline_fixture['movies_call'])
+        for stage, timing in timings.items():
+            old = baseline_timings.get(stage, {}).get('median')
+            # Ignore stages too quick to time reliably
+            if old and old > 1e-4 and timing['median'] > old * (1 + tolerance):
+                found.append('{} {}: {:.2f} ms -> {:.2f} ms'.format(name, stage, old * 1000, timing['median'] * 1000))
+    return found
+
+
+def print_summary(results):
+    print('{:<28} {:>10} {:>7} {}{:>12} {:>12}'.format(
+        'fixture', 'bytes', 'movies', ''.join('{:>12}'.format(stage) for stage in STAGES), 'movies()', 'peak KiB'),
+        file=sys.stderr)
+    for name, fixture_results in results['fixtures'].items():
+        print('{:<28} {:>10} {:>7} {}{:>9.2f} ms {:>12.0f}'.format(
+            name, fixture_results['bytes'], fixture_results['movies'],
+            ''.join('{:>9.2f} ms'.format(fixture_results['stages'][stage]['median'] * 1000) for stage in STAGES),
+            fixture_results['movies_call']['median'] * 1000, fixture_results['memory']['peak_bytes'] / 1024.0),
+            file=sys.stderr)
+    theater_list = results['theater_list']
+    print('TheaterList.movies() over {} theaters: {:.2f} ms sequential, {:.2f} ms concurrent'.format(
+        theater_list['theaters'], theater_list['sequential']['median'] * 1000,
+        theater_list['concurrent']['median'] * 1000), file=sys.stderr)
+
+
+def main():
+    # moviescraper configures the root logger at import, so set the level rather than basicConfig
+    logging.getLogger().setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description='Benchmark scraping stages on offline fixtures')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--parser', choices=parsing.PARSERS, default=parsing.DEFAULT_PARSER)
+    parser.add_argument('--workers', type=int, default=8, help='workers for the concurrent TheaterList run')
+    parser.add_argument('--filter', nargs='*', default=[], help='movie filter strings to apply')
+    parser.add_argument('--large', action='store_true', help='include a multi-megabyte synthetic listing')
+    parser.add_argument('--fixtures', default=fixtures.FIXTURE_DIR, help='recorded fixture directory')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    parser.add_argument('--baseline', help='earlier JSON results to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against the baseline')
+    args = parser.parse_args()
+
+    results = run(args)
+    print_summary(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            found = regressions(results, json.load(baseline_file), args.tolerance)
+        for regression in found:
+            print('REGRESSION {}'.format(regression), file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+#!/usr/local/bin/python3
+
+import random
+
+# Synthetic listing pages for benchmarks, shaped like the Veezi sessions page:
+# a film container with one block per film among a lot of unrelated markup.
+
+LIST_SELECTOR = 'div#sessionsByFilmConent > div.film > div > h3.title'
+
+_WORDS = ['Return', 'Night', 'Star', 'Last', 'Home', 'Far', 'Game', 'Dark', 'River', 'King',
+          'Summer', 'Secret', 'Story', 'Empire', 'Ghost', 'Lost', 'City', 'Iron', 'Rising', 'Dawn']
+
+
+def film_title(rng):
+    return ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(1, 4)))
+
+
+def listing_page(films, noise = 20, seed = 0):
+    rng = random.Random(seed)
+    filler = ''.join(
+        '<div class="promo"><p>Special offer {0}</p><ul>{1}</ul></div>\n'.format(
+            x, ''.join('<li><a href="/p/{0}">Item {0}</a></li>'.format(y) for y in range(10)))
+        for x in range(noise)
+    )
+    blocks = []
+    for x in range(films):
+        sessions = ''.join(
+            '<li><a href="/purchase/{0}-{1}">{2}:{3:02d} PM</a></li>'.format(x, y, rng.randint(1, 11), rng.choice([0, 15, 30, 45]))
+            for y in range(rng.randint(1, 6))
+        )
+        blocks.append(
+            '<div class="film"><div class="film-info"><h3 class="title">{0}</h3>'
+            '<p class="rating">PG-13</p></div><div class="sessions"><ul>{1}</ul></div></div>\n'.format(
+                film_title(rng), sessions)
+        )
+    return (
+        '<html><head><title>Sessions</title></head><body>\n<div id="header">{0}</div>\n'
+        '<div id="sessionsByFilmConent">\n{1}</div>\n<div id="footer">{0}</div>\n</body></html>\n'
+    ).format(filler, ''.join(blocks))
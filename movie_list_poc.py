@@ -1,7 +1,7 @@
 #!/usr/local/bin/python3
 
 import re
-from moviescraper import moviescraper
+from moviescraper import matching, moviescraper, parallel
 import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -10,6 +10,7 @@ logger = logging.getLogger(__name__)
 #
 # Each theater has its own class. On request, it returns a list of movies currently playing,
 # scraped from its site. This script prompts for an optional filter, restricting output to matching movies.
+# For cron and batch jobs, use the non-interactive "python -m moviescraper" instead.
 
 # To do:
 #
@@ -23,38 +24,26 @@ logger = logging.getLogger(__name__)
 def main():
     user_movies = _create_filter()
     logging.debug('>>> main(): Created filter')
-    theaters = moviescraper.Theaters()
-    logging.debug('>>> main(): Using default theater list "{}"'.format(theaters))
-
-    movie_list = {}
+    theaters = moviescraper.TheaterList()
+    for theater in moviescraper.Theaters().theater_list():
+        theaters.add_theater(theater)
+    logging.debug('>>> main(): Using default theater list "%s"', theaters.list_theaters())
 
+    # Theaters are fetched concurrently and merged into the index in the order they finish
     logging.info('Starting movie list generation')
-    for theater in theaters.theater_list():
-        logging.debug('*** Starting {} ***'.format(theater.theater_name))
-        theater.movie_filter = user_movies.movies()
-        logging.debug('Got movie filter {}'.format(theater.movie_filter))
-        if len(theater.movies()) == 0:
-            logging.debug('{} returned 0 movies.'.format(theater.theater_name))
-        else:
-            for movie in theater.movies():
-                logging.debug('Starting movie {} for theater {}'.format(movie, theater.theater_name))
-                if movie in movie_list:
-                    movie_list[movie].append(theater.theater_name)
-                    logging.debug('Added {} to {}, user_movies is now {}'.format(
-                        movie, theater.theater_name, user_movies.movies())
-                    )
-                else:
-                    movie_list[movie] = [ theater.theater_name ]
-                    logging.debug('\tAdded {} to {}, user_movies is now {}'.format(
-                        movie, theater.theater_name, user_movies.movies())
-                    )
-        logger.debug('*** Ending theater loop for {}, theater filter is now {}, user_movies is now {} ***'.format(
-            theater.theater_name, theater.movie_filter, user_movies.movies()))
+    movie_list = theaters.movie_index(max_workers=parallel.DEFAULT_MAX_WORKERS).movies()
+    logging.debug('Combined movie list is %s', movie_list)
+
+    # The user filter is applied once to the combined list rather than inside every theater
+    if len(user_movies.movies()) > 0:
+        matcher = matching.MovieMatcher({'user': user_movies.movies()})
+        movie_list = dict((match.title, match.theaters) for match in matcher.match(movie_list))
+        logging.debug('Filtered movie list to %s', movie_list)
 
     print()
 
     for movie, theaters in sorted(movie_list.items()):
-        print('{:<40} {}'.format(movie, ', '.join(theaters)))
+        print('{:<40} {}'.format(movie, ', '.join(sorted(theaters))))
 
     print()
 
@@ -65,7 +54,7 @@ def _create_filter():
         if bool(not filter_string or filter_string.isspace()):
             break
         else:
-            logging.debug('Adding {} to user movie filter'.format(filter_string))
+            logging.debug('Adding %s to user movie filter', filter_string)
             user_movies.add_movies([filter_string])
     return user_movies
 
@@ -80,6 +69,7 @@ class UserMovies:
         self.movie_filter.update(movies)
 
     def remove_movies(self, movies):
-        self.movie_filter = self.movie_list.difference(movies)
+        self.movie_filter = self.movie_filter.difference(movies)
 
-main()
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+#!/usr/local/bin/python3
+
+import sys
+from moviescraper import cli
+
+sys.exit(cli.main())
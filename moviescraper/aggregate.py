@@ -0,0 +1,215 @@
+#!/usr/local/bin/python3
+
+import collections
+import difflib
+import json
+import logging
+import os
+import re
+from moviescraper import titles
+
+logger = logging.getLogger(__name__)
+
+# Cross-theater movie index.
+#
+# Titles are keyed on titles.canonical_key(), so "Spider-Man: Far From Home" and
+# "Spider-man - Far from Home" share one entry. With fuzzy merging on, keys that only differ
+# in spacing or a leading article ("Spiderman", "The Spider Man") are merged outright. Other
+# new keys are folded into an existing key that is one typo away: a letter added, dropped,
+# changed or swapped with its neighbour. Changing the first letter of a word doesn't count
+# ("Far From Rome" is not "Far From Home"), the numbers in the two titles must be the same,
+# so sequels stay apart, and the two keys must still be at least threshold similar.
+#
+# A typo leaves either the first or the second half of a key untouched, so keys are indexed
+# under both halves and a new key is only checked against keys sharing one, at most
+# MAX_CANDIDATES of them in all. Theaters can be added one at a time, as their results arrive.
+
+INDEX_VERSION = 1
+DEFAULT_THRESHOLD = 0.9
+# Very short keys are too easy to confuse ("us" and "up"), so they are never fuzzy-merged
+MIN_FUZZY_LENGTH = 6
+# The most keys a new key is checked against, to keep crowded halves cheap
+MAX_CANDIDATES = 64
+STOPWORDS = frozenset(['the', 'a', 'an', 'la', 'le', 'el'])
+
+_NUMBERS = re.compile(r'\d+')
+
+
+def _halves(squashed, length = None):
+    # Index entries for a key of the given length that shares a half with squashed
+    length = len(squashed) if length is None else length
+    middle = length // 2
+    return [('<', length, squashed[:middle]), ('>', length, squashed[len(squashed) - (length - middle):])]
+
+
+def _typo(squashed, other, word_starts, other_word_starts):
+    # Whether other is squashed with one letter added, dropped, swapped with the next one,
+    # or changed, as long as the changed letter doesn't start a word in either key
+    if len(squashed) > len(other):
+        squashed, other = other, squashed
+    same = len(os.path.commonprefix([squashed, other]))
+    if len(squashed) < len(other):
+        return len(other) == len(squashed) + 1 and squashed[same:] == other[same + 1:]
+    if same == len(squashed):
+        return False
+    if squashed[same + 1:] == other[same + 1:]:
+        return same not in word_starts and same not in other_word_starts
+    return squashed[same] == other[same + 1] and squashed[same + 1] == other[same] and squashed[same + 2:] == other[same + 2:]
+
+
+class MovieEntry(object):
+    __slots__ = ('key', 'theaters', 'variants')
+
+    def __init__(self, key):
+        self.key = key
+        self.theaters = set()
+        # Display titles seen for this movie, with how many theaters used each
+        self.variants = collections.Counter()
+
+    def title(self):
+        # Most common spelling, earliest seen on ties
+        return self.variants.most_common(1)[0][0]
+
+
+class MovieIndex(object):
+    def __init__(self, fuzzy = True, threshold = DEFAULT_THRESHOLD):
+        self.fuzzy = fuzzy
+        self.threshold = threshold
+        self._entries = {}
+        self._aliases = {}
+        self._squashed = {}
+        self._halves = collections.defaultdict(list)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, title):
+        return self._lookup(titles.canonical_key(title)) is not None
+
+    def _words(self, key):
+        words = key.split()
+        if len(words) > 1 and words[0] in STOPWORDS:
+            words = words[1:]
+        return words
+
+    def _squash(self, key):
+        return ''.join(self._words(key))
+
+    def _word_starts(self, key):
+        starts = set()
+        position = 0
+        for word in self._words(key):
+            starts.add(position)
+            position += len(word)
+        return starts
+
+    def _near_duplicate(self, key, squashed):
+        numbers = _NUMBERS.findall(key)
+        word_starts = self._word_starts(key)
+        # Same length first, for changed and swapped letters, then one letter shorter or longer
+        candidates = []
+        for length in (len(squashed), len(squashed) - 1, len(squashed) + 1):
+            for half in _halves(squashed, length):
+                candidates.extend(self._halves.get(half, ())[-MAX_CANDIDATES:])
+        seen = set()
+        for candidate_squashed, candidate in candidates[:MAX_CANDIDATES]:
+            if candidate in seen:
+                continue
+            seen.add(candidate)
+            if _NUMBERS.findall(candidate) != numbers:
+                continue
+            if not _typo(squashed, candidate_squashed, word_starts, self._word_starts(candidate)):
+                continue
+            if difflib.SequenceMatcher(None, squashed, candidate_squashed, autojunk=False).ratio() >= self.threshold:
+                return candidate
+        return None
+
+    def _lookup(self, key):
+        key = self._aliases.get(key, key)
+        return self._entries.get(key)
+
+    def _remember(self, key):
+        squashed = self._squash(key)
+        self._squashed.setdefault(squashed, key)
+        if len(squashed) >= MIN_FUZZY_LENGTH:
+            for half in _halves(squashed):
+                self._halves[half].append((squashed, key))
+
+    def _entry(self, key):
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry
+        if self.fuzzy:
+            squashed = self._squash(key)
+            duplicate = self._squashed.get(squashed)
+            if duplicate is None and len(squashed) >= MIN_FUZZY_LENGTH:
+                duplicate = self._near_duplicate(key, squashed)
+            if duplicate is not None:
+                logging.debug('Merging "%s" into "%s"', key, duplicate)
+                self._aliases[key] = duplicate
+                return self._entries[duplicate]
+        entry = self._entries[key] = MovieEntry(key)
+        self._remember(key)
+        return entry
+
+    def add(self, theater_name, movie_titles):
+        for title in movie_titles:
+            key = titles.canonical_key(title)
+            if not key:
+                continue
+            entry = self._entry(key)
+            if theater_name not in entry.theaters:
+                entry.theaters.add(theater_name)
+                entry.variants[title] += 1
+        return self
+
+    def add_results(self, results):
+        # Consumes ScrapeResults as they arrive, e.g. from TheaterList.iter_movies()
+        for result in results:
+            self.add(result.theater.theater_name, result.movies)
+        return self
+
+    def theaters(self, title):
+        entry = self._lookup(titles.canonical_key(title))
+        return sorted(entry.theaters) if entry is not None else []
+
+    def title(self, title):
+        # Display title of the entry a title was merged into, or None
+        entry = self._lookup(titles.canonical_key(title))
+        return entry.title() if entry is not None else None
+
+    def movies(self):
+        # Display title -> sorted theaters, like the dict movie_list_poc.main() used to build
+        return dict((entry.title(), sorted(entry.theaters)) for entry in self._entries.values())
+
+    def to_dict(self):
+        return {
+            'version': INDEX_VERSION,
+            'movies': [
+                {'key': entry.key, 'title': entry.title(), 'theaters': sorted(entry.theaters),
+                 'variants': dict(entry.variants)}
+                for entry in sorted(self._entries.values(), key=lambda entry: entry.key)
+            ],
+            'aliases': self._aliases
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_dict(cls, data, fuzzy = True, threshold = DEFAULT_THRESHOLD):
+        if data.get('version', INDEX_VERSION) > INDEX_VERSION:
+            raise ValueError('Movie index version {} is newer than supported version {}'.format(
+                data['version'], INDEX_VERSION))
+        index = cls(fuzzy, threshold)
+        for movie in data['movies']:
+            entry = index._entries[movie['key']] = MovieEntry(movie['key'])
+            entry.theaters.update(movie['theaters'])
+            entry.variants.update(movie['variants'])
+            index._remember(entry.key)
+        index._aliases.update(data.get('aliases', {}))
+        return index
+
+    @classmethod
+    def from_json(cls, text, fuzzy = True, threshold = DEFAULT_THRESHOLD):
+        return cls.from_dict(json.loads(text), fuzzy, threshold)
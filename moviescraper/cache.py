@@ -0,0 +1,104 @@
+#!/usr/local/bin/python3
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+# Persistent HTTP response cache used by Theater._get_soup().
+#
+# Each URL is stored as one JSON file holding the page body and its validators (ETag and
+# Last-Modified). Entries younger than the TTL are served directly. Stale entries are
+# revalidated with a conditional request, so an unchanged page costs a 304 instead of a
+# full download. In offline mode only the cache is consulted, whatever the entry's age.
+
+DEFAULT_TTL = 24 * 60 * 60
+
+CacheEntry = collections.namedtuple('CacheEntry', ['url', 'body', 'etag', 'last_modified', 'fetched_at'])
+
+
+class CacheMiss(Exception):
+    pass
+
+
+class ResponseCache(object):
+    def __init__(self, directory, ttl = DEFAULT_TTL, offline = False):
+        self.directory = directory
+        self.ttl = ttl
+        self.offline = offline
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, url):
+        try:
+            with open(self._path(url), encoding='utf-8') as entry_file:
+                entry = CacheEntry(**json.load(entry_file))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError):
+            logging.warning('Ignoring unreadable cache entry for %s', url)
+            return None
+        return entry if entry.url == url else None
+
+    def put(self, url, body, etag = None, last_modified = None, fetched_at = None):
+        entry = CacheEntry(url, body, etag, last_modified, time.time() if fetched_at is None else fetched_at)
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'w', encoding='utf-8') as entry_file:
+                json.dump(entry._asdict(), entry_file)
+            os.replace(temp_path, self._path(url))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return entry
+
+    def remove(self, url):
+        try:
+            os.unlink(self._path(url))
+        except FileNotFoundError:
+            pass
+
+    def is_fresh(self, entry, ttl = None):
+        ttl = self.ttl if ttl is None else ttl
+        return time.time() - entry.fetched_at < ttl
+
+    def fetch(self, url, get, ttl = None):
+        # get is called as get(url, headers) and must return a requests-style response
+        entry = self.get(url)
+        if entry is not None and (self.offline or self.is_fresh(entry, ttl)):
+            logging.debug('Cache hit for %s', url)
+            return entry.body
+        if self.offline:
+            raise CacheMiss('No cached copy of {} available offline'.format(url))
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+            logging.debug('Revalidating stale cache entry for %s with %s', url, headers)
+
+        response = get(url, headers)
+        if response.status_code == 304 and entry is not None:
+            logging.debug('%s not modified, refreshing cache entry', url)
+            self.put(
+                url, entry.body,
+                response.headers.get('ETag', entry.etag),
+                response.headers.get('Last-Modified', entry.last_modified)
+            )
+            return entry.body
+
+        if response.ok:
+            self.put(url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        else:
+            logging.warning('Not caching %s response for %s', response.status_code, url)
+        return response.text
@@ -0,0 +1,198 @@
+#!/usr/local/bin/python3
+
+from array import array
+import collections.abc
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+# Compact theater x title membership for large theater fleets.
+#
+# A TitleTable stores each distinct title once, interned, and numbers titles in the order
+# they are first seen. A Catalogue stores each theater's titles as an array of those
+# numbers, 4 bytes per showing, instead of a list of its own strings. Bulk set operations
+# turn rows into bitsets (Python ints, bit i set for title i) and combine them with |, &
+# and ~, which run over machine words in C rather than over titles in Python.
+#
+# row() hands out a theater's titles as a read-only Row over its array, so callers such as
+# TheaterList don't keep lists of their own. A Row compares equal to a list of the same
+# titles, and list(row) makes one, e.g. to serialize it or change it. Titles stay in the table after every theater
+# has dropped them until compact() renumbers the rows into a new table holding only the
+# titles still shown. Rows taken earlier keep the table they were taken from, while bitsets
+# taken earlier can only be decoded by the table they were taken from.
+
+TYPECODE = 'I'
+
+
+class TitleTable(object):
+    __slots__ = ('_titles', '_ids')
+
+    def __init__(self):
+        self._titles = []
+        self._ids = {}
+
+    def __len__(self):
+        return len(self._titles)
+
+    def __contains__(self, title):
+        return title in self._ids
+
+    def add(self, title):
+        # Returns the title's id, giving it the next one if it is new
+        title_id = self._ids.get(title)
+        if title_id is None:
+            title_id = self._ids[sys.intern(title)] = len(self._titles)
+            self._titles.append(sys.intern(title))
+        return title_id
+
+    def id(self, title):
+        return self._ids.get(title)
+
+    def title(self, title_id):
+        return self._titles[title_id]
+
+
+class Row(collections.abc.Sequence):
+    __slots__ = ('_titles', '_ids')
+
+    def __init__(self, title_table, title_ids):
+        self._titles = title_table
+        self._ids = title_ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._titles.title(title_id) for title_id in self._ids[index]]
+        return self._titles.title(self._ids[index])
+
+    def __iter__(self):
+        return (self._titles.title(title_id) for title_id in self._ids)
+
+    def __eq__(self, other):
+        # Compares equal to a list or tuple of the same titles, like the lists it replaces
+        if not isinstance(other, (Row, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(title == other_title for title, other_title in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class Catalogue(object):
+    __slots__ = ('titles', '_rows')
+
+    def __init__(self, title_table = None):
+        # Catalogues sharing a TitleTable share title ids, so their bitsets can be combined
+        self.titles = title_table if title_table is not None else TitleTable()
+        self._rows = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, theater_name):
+        return theater_name in self._rows
+
+    def set(self, theater_name, movie_titles):
+        # Replaces a theater's titles, keeping their order and dropping repeats
+        title_ids = dict.fromkeys(self.titles.add(title) for title in movie_titles)
+        self._rows[theater_name] = array(TYPECODE, title_ids)
+
+    def discard(self, theater_name):
+        self._rows.pop(theater_name, None)
+
+    def theater_names(self):
+        return list(self._rows)
+
+    def movies(self, theater_name):
+        return [self.titles.title(title_id) for title_id in self._rows[theater_name]]
+
+    def row(self, theater_name):
+        # The theater's titles as a Row, without building a list
+        return Row(self.titles, self._rows[theater_name])
+
+    def compact(self):
+        # Once most of the table's titles are no longer shown anywhere, renumbers the rows into
+        # a new table of the titles still shown; returns whether it did. A catalogue sharing its
+        # TitleTable gets a table of its own.
+        shown = set()
+        for row in self._rows.values():
+            shown.update(row)
+        if len(self.titles) - len(shown) <= len(shown):
+            return False
+        title_table = TitleTable()
+        for theater_name, row in self._rows.items():
+            self._rows[theater_name] = array(TYPECODE, (title_table.add(self.titles.title(title_id)) for title_id in row))
+        logging.debug('Compacted title table from %s to %s titles', len(self.titles), len(title_table))
+        self.titles = title_table
+        return True
+
+    def showings(self):
+        return sum(len(row) for row in self._rows.values())
+
+    def to_dict(self):
+        # theater -> titles, like TheaterList.movies()
+        return dict((theater_name, self.movies(theater_name)) for theater_name in self._rows)
+
+    def theaters(self, title):
+        title_id = self.titles.id(title)
+        if title_id is None:
+            return []
+        return [theater_name for theater_name, row in self._rows.items() if title_id in row]
+
+    def invert(self):
+        # title -> theaters, like matching.invert(), in one pass over the rows
+        theaters = [[] for _ in range(len(self.titles))]
+        for theater_name, row in self._rows.items():
+            for title_id in row:
+                theaters[title_id].append(theater_name)
+        return dict((self.titles.title(title_id), names) for title_id, names in enumerate(theaters) if names)
+
+    def bits(self, theater_name):
+        # The theater's titles as a bitset
+        row = self._rows.get(theater_name, ())
+        packed = bytearray((len(self.titles) + 7) // 8)
+        for title_id in row:
+            packed[title_id >> 3] |= 1 << (title_id & 7)
+        return int.from_bytes(packed, 'little')
+
+    def decode(self, bits):
+        # Sorted titles of a bitset
+        movies = []
+        for byte_index, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')):
+            while byte:
+                low_bit = byte & -byte
+                movies.append(self.titles.title(byte_index * 8 + low_bit.bit_length() - 1))
+                byte ^= low_bit
+        return sorted(movies)
+
+    def any_of(self, theater_names = None):
+        # Titles showing at any of the theaters, by default all of them
+        bits = 0
+        for theater_name in self._names(theater_names):
+            bits |= self.bits(theater_name)
+        return bits
+
+    def all_of(self, theater_names = None):
+        # Titles showing at every one of the theaters
+        bits = None
+        for theater_name in self._names(theater_names):
+            bits = self.bits(theater_name) if bits is None else bits & self.bits(theater_name)
+            if not bits:
+                break
+        return bits or 0
+
+    def only_at(self, theater_name, theater_names = None):
+        # Titles showing at theater_name and none of the other theaters
+        others = [other for other in self._names(theater_names) if other != theater_name]
+        return self.bits(theater_name) & ~self.any_of(others)
+
+    def count(self, bits):
+        return bits.bit_count()
+
+    def _names(self, theater_names):
+        return self._rows if theater_names is None else theater_names
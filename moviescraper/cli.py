@@ -0,0 +1,153 @@
+#!/usr/local/bin/python3
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from moviescraper import config
+
+logger = logging.getLogger(__name__)
+
+# Non-interactive command line for one-off and scheduled runs.
+#
+#   python -m moviescraper --theaters "Laurelhurst" "Academy Theater" --filter-file wanted.txt --format csv
+#
+# Only the config module is imported up front. The scraping modules, and with them
+# BeautifulSoup and requests, are imported once the arguments are known to need a scrape,
+# so --help and --list return at once. With --theaters, only the named theaters are built
+# and fetched. Filters come from --filter and from --filter-file, one per line.
+#
+# Exit status is 0 on success, 1 if any theater failed to scrape (the rest are still
+# printed) and 2 for bad arguments.
+
+FORMATS = ('text', 'json', 'csv')
+
+
+def read_filters(path):
+    # One filter string per line; blank lines and lines starting with # are skipped. - is stdin.
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, encoding='utf-8') as filter_file:
+            lines = filter_file.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith('#')]
+
+
+def load_configs(args):
+    # Theater configs, only for args.theaters when given; raises ConfigError for unknown names
+    if args.store:
+        import sqlite3
+        from moviescraper import store
+        # Opening a mistyped path would create an empty database and list no theaters
+        if not os.path.isfile(args.store):
+            raise config.ConfigError('No such store {}'.format(args.store))
+        try:
+            with store.TheaterStore(args.store) as theater_store:
+                theater_configs = theater_store.load_config(args.theaters)
+        except (store.StoreError, sqlite3.Error) as error:
+            raise config.ConfigError('Cannot read store {}: {}'.format(args.store, error)) from error
+    else:
+        theater_configs = config.load_config(args.config)
+        if args.theaters:
+            theater_configs = [theater_info for theater_info in theater_configs
+                               if theater_info['theater_name'] in args.theaters]
+    if args.theaters:
+        unknown = set(args.theaters) - set(theater_info['theater_name'] for theater_info in theater_configs)
+        if unknown:
+            raise config.ConfigError('Unknown theaters {}'.format(', '.join(sorted(unknown))))
+    return theater_configs
+
+
+def scrape(theater_configs, filters, args):
+    # Returns (title -> theaters, names of theaters that failed)
+    from moviescraper import aggregate, cache, matching, moviescraper, parallel
+
+    response_cache = cache.ResponseCache(args.cache_dir) if args.cache_dir else None
+    theater_list = moviescraper.TheaterList(theater_configs, cache=response_cache, parser=args.parser)
+    max_workers = args.workers or parallel.DEFAULT_MAX_WORKERS
+    index = aggregate.MovieIndex()
+    failed = []
+    for result in theater_list.iter_movies(max_workers):
+        if result.error is not None:
+            failed.append(result.theater.theater_name)
+        index.add(result.theater.theater_name, result.movies)
+    movies = index.movies()
+    if filters:
+        matcher = matching.MovieMatcher({'user': filters}, ignore_case=args.ignore_case)
+        movies = dict((match.title, match.theaters) for match in matcher.match(movies))
+    return movies, sorted(failed)
+
+
+def write_movies(movies, output_format, output):
+    if output_format == 'json':
+        json.dump([{'title': title, 'theaters': sorted(theaters)} for title, theaters in sorted(movies.items())],
+                  output, indent=2)
+        output.write('\n')
+    elif output_format == 'csv':
+        # One row per title and theater, for tools that want flat records
+        writer = csv.writer(output)
+        writer.writerow(['title', 'theater'])
+        for title, theaters in sorted(movies.items()):
+            for theater_name in sorted(theaters):
+                writer.writerow([title, theater_name])
+    else:
+        for title, theaters in sorted(movies.items()):
+            output.write('{:<40} {}\n'.format(title, ', '.join(sorted(theaters))))
+
+
+def build_parser():
+    arg_parser = argparse.ArgumentParser(
+        prog='moviescraper', description='List the movies playing at a set of theaters'
+    )
+    source = arg_parser.add_mutually_exclusive_group()
+    source.add_argument('--config', default=config.DEFAULT_CONFIG, help='theater config file (JSON, TOML or YAML)')
+    source.add_argument('--store', help='TheaterStore database to read theaters from instead')
+    arg_parser.add_argument('--theaters', nargs='+', metavar='NAME', help='only scrape these theaters')
+    arg_parser.add_argument('--list', action='store_true', help='list the configured theaters and exit')
+    arg_parser.add_argument('--filter', action='append', default=[], metavar='STRING',
+                            help='only show titles containing STRING; may be repeated')
+    arg_parser.add_argument('--filter-file', action='append', default=[], metavar='PATH',
+                            help='file of filter strings, one per line; - for stdin')
+    arg_parser.add_argument('--ignore-case', action='store_true', help='match filters ignoring case')
+    arg_parser.add_argument('--format', choices=FORMATS, default='text')
+    arg_parser.add_argument('--output', help='write to this file instead of stdout')
+    arg_parser.add_argument('--workers', type=int, help='theaters scraped at once')
+    arg_parser.add_argument('--parser', help='HTML parser backend, e.g. html.parser, lxml or stream')
+    arg_parser.add_argument('--cache-dir', help='directory for cached pages')
+    arg_parser.add_argument('-v', '--verbose', action='count', default=0, help='log progress; twice for debug')
+    return arg_parser
+
+
+def main(argv = None):
+    arg_parser = build_parser()
+    args = arg_parser.parse_args(argv)
+    logging.basicConfig(level=[logging.WARNING, logging.INFO, logging.DEBUG][min(args.verbose, 2)])
+
+    try:
+        theater_configs = load_configs(args)
+        filters = list(args.filter)
+        for path in args.filter_file:
+            filters.extend(read_filters(path))
+    except (OSError, ValueError) as error:
+        arg_parser.error(str(error))
+    if args.list:
+        for theater_info in theater_configs:
+            print(theater_info['theater_name'])
+        return 0
+    if args.parser is not None:
+        from moviescraper import parsing
+        if args.parser not in parsing.PARSERS:
+            arg_parser.error('Unknown parser "{}", expected one of {}'.format(args.parser, ', '.join(parsing.PARSERS)))
+
+    movies, failed = scrape(theater_configs, filters, args)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as output:
+            write_movies(movies, args.format, output)
+    else:
+        write_movies(movies, args.format, sys.stdout)
+    if failed:
+        logging.error('Failed to scrape %s', ', '.join(failed))
+        return 1
+    return 0
@@ -0,0 +1,103 @@
+#!/usr/local/bin/python3
+
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Declarative theater configuration files.
+#
+# A config file holds a format version and a list of theaters, each described only by the
+# scraping fields Theater takes as keyword arguments:
+#
+#   {"version": 1, "theaters": [{"theater_name": "...", "site_url": "...", "list_selector": "..."}]}
+#
+# JSON is always supported. TOML (as [[theaters]] tables) is read with tomllib on Python 3.11+,
+# and YAML is read and written when PyYAML is installed.
+
+CONFIG_VERSION = 1
+REQUIRED_FIELDS = ('theater_name', 'site_url', 'list_selector')
+OPTIONAL_FIELDS = ('text_search', 'cache_ttl', 'parser', 'refresh_interval', 'showtime_selector', 'date_selector')
+FIELDS = REQUIRED_FIELDS + OPTIONAL_FIELDS
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'theaters.json')
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def _format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.yaml', '.yml'):
+        return 'yaml'
+    if extension == '.toml':
+        return 'toml'
+    return 'json'
+
+
+def validate_theater(theater_info):
+    missing = [field for field in REQUIRED_FIELDS if not theater_info.get(field)]
+    if missing:
+        raise ConfigError('Theater {} is missing {}'.format(theater_info.get('theater_name'), ', '.join(missing)))
+    unknown = set(theater_info) - set(FIELDS)
+    if unknown:
+        raise ConfigError('Theater {} has unknown fields {}'.format(
+            theater_info['theater_name'], ', '.join(sorted(unknown))))
+    return dict((field, theater_info[field]) for field in FIELDS if theater_info.get(field) is not None)
+
+
+def parse_config(data):
+    # Accepts the versioned mapping or, for convenience, a bare list of theaters
+    if isinstance(data, list):
+        theaters = data
+    elif isinstance(data, dict):
+        version = data.get('version', CONFIG_VERSION)
+        if version > CONFIG_VERSION:
+            raise ConfigError('Config version {} is newer than supported version {}'.format(version, CONFIG_VERSION))
+        theaters = data.get('theaters', [])
+    else:
+        raise ConfigError('Expected a mapping or a list of theaters, got {}'.format(type(data).__name__))
+    configs = [validate_theater(theater_info) for theater_info in theaters]
+    names = [theater_info['theater_name'] for theater_info in configs]
+    if len(set(names)) != len(names):
+        raise ConfigError('Duplicate theater names in config')
+    return configs
+
+
+def load_config(path):
+    logging.debug('Loading theater config from %s', path)
+    config_format = _format(path)
+    if config_format == 'toml':
+        import tomllib
+        with open(path, 'rb') as config_file:
+            return parse_config(tomllib.load(config_file))
+    with open(path, encoding='utf-8') as config_file:
+        if config_format == 'yaml':
+            import yaml
+            return parse_config(yaml.safe_load(config_file))
+        return parse_config(json.load(config_file))
+
+
+def save_config(path, theaters):
+    # theaters may be config dicts or Theater instances
+    data = {
+        'version': CONFIG_VERSION,
+        'theaters': [validate_theater(theater_config(theater)) for theater in theaters]
+    }
+    config_format = _format(path)
+    if config_format == 'toml':
+        raise ConfigError('Writing TOML config is not supported, use JSON or YAML')
+    with open(path, 'w', encoding='utf-8') as config_file:
+        if config_format == 'yaml':
+            import yaml
+            yaml.safe_dump(data, config_file, sort_keys=False)
+        else:
+            json.dump(data, config_file, indent=4)
+            config_file.write('\n')
+
+
+def theater_config(theater):
+    if isinstance(theater, dict):
+        return dict(theater)
+    return dict((field, getattr(theater, field)) for field in FIELDS if getattr(theater, field, None) is not None)
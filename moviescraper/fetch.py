@@ -0,0 +1,107 @@
+#!/usr/local/bin/python3
+
+from io import BytesIO
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+from urllib3.util import Retry, make_headers
+
+logger = logging.getLogger(__name__)
+
+# Shared HTTP layer for theater scraping.
+#
+# A Fetcher wraps one requests.Session, so connections are pooled and kept alive per host
+# across every theater that uses it. Each request has connect and read timeouts, and
+# transient failures are retried with exponential backoff. Compressed responses are decoded
+# by urllib3, which advertises brotli only when a brotli module is installed.
+#
+# The transport is an ordinary requests adapter, so tests can mount a LocalTransport that
+# serves canned pages instead of touching the network.
+
+DEFAULT_TIMEOUT = (5, 30)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_POOL_CONNECTIONS = 32
+DEFAULT_POOL_MAXSIZE = 4
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+ACCEPT_ENCODING = make_headers(accept_encoding=True)['accept-encoding']
+USER_AGENT = 'second-run moviescraper'
+
+
+class Fetcher(object):
+    def __init__(self, timeout = DEFAULT_TIMEOUT, retries = DEFAULT_RETRIES,
+                 backoff_factor = DEFAULT_BACKOFF_FACTOR, pool_connections = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize = DEFAULT_POOL_MAXSIZE, transport = None):
+        self.timeout = timeout
+        if transport is None:
+            retry = Retry(
+                total=retries, backoff_factor=backoff_factor, status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset(['GET', 'HEAD']), raise_on_status=False
+            )
+            transport = HTTPAdapter(
+                pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry
+            )
+        self.transport = transport
+        self.session = requests.Session()
+        self.session.headers.update({'Accept-Encoding': ACCEPT_ENCODING, 'User-Agent': USER_AGENT})
+        self.session.mount('http://', transport)
+        self.session.mount('https://', transport)
+
+    def get(self, url, headers = None):
+        logging.debug('Fetching %s with headers %s', url, headers)
+        return self.session.get(url, headers=headers, timeout=self.timeout)
+
+    def stream(self, url, headers = None):
+        # The body is only read as the caller iterates over it; close the response when done
+        logging.debug('Streaming %s with headers %s', url, headers)
+        return self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+
+    def close(self):
+        self.session.close()
+
+
+_default_fetcher = None
+_default_fetcher_lock = threading.Lock()
+
+
+def default_fetcher():
+    # Shared by theaters that aren't part of a TheaterList with its own Fetcher
+    global _default_fetcher
+    with _default_fetcher_lock:
+        if _default_fetcher is None:
+            _default_fetcher = Fetcher()
+        return _default_fetcher
+
+
+class LocalTransport(HTTPAdapter):
+    # Serves canned pages keyed by URL. A page is either (status_code, headers, body) or a
+    # callable taking the PreparedRequest and returning that tuple. A body may be text, bytes
+    # or a binary file object, which is only read as the response is. Unknown URLs get a 404.
+    # Bodies go through urllib3 as real responses do, so Content-Encoding is honoured.
+    def __init__(self, pages = None):
+        super(LocalTransport, self).__init__()
+        self.pages = dict(pages or {})
+        self.sent = []
+
+    def add_page(self, url, body, status_code = 200, headers = None):
+        self.pages[url] = (status_code, headers or {}, body)
+
+    def send(self, request, **kwargs):
+        self.sent.append(request)
+        page = self.pages.get(request.url, (404, {}, ''))
+        status_code, headers, body = page(request) if callable(page) else page
+
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        if isinstance(body, bytes):
+            body = BytesIO(body)
+        raw = HTTPResponse(
+            body=body, headers=headers, status=status_code,
+            preload_content=False, decode_content=True
+        )
+        response = self.build_response(request, raw)
+        if response.encoding is None:
+            response.encoding = 'utf-8'
+        return response
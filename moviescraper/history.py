@@ -0,0 +1,293 @@
+#!/usr/local/bin/python3
+
+from array import array
+import collections
+import contextlib
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from moviescraper import showtimes, store, titles
+
+logger = logging.getLogger(__name__)
+
+# Append-only SQLite history of extended scrapes.
+#
+# Each snapshot is one theater's Screenings at one time, stored as columns rather than one
+# row per showing: the title ids as a packed array, and the dates and showtimes as JSON lists
+# in the same order. Titles and theaters are stored once and referred to by id.
+#
+# Alongside the snapshots, the runs table records each unbroken stretch of snapshots in
+# which a theater listed a title, with when it was first and last seen. Runs are updated as
+# snapshots are appended, so per-title questions ("when did this reach second run", "how
+# long do films stay") and time-range questions are answered from an index, not by reading
+# snapshots. Titles are looked up by titles.canonical_key().
+#
+# compact() removes old snapshots that repeat the theater's previous one. The runs already
+# cover them, so only the snapshots where a listing changed are kept.
+
+SCHEMA_VERSION = 1
+
+MIGRATIONS = {
+    1: '''
+        CREATE TABLE theaters (
+            id INTEGER PRIMARY KEY,
+            theater_name TEXT NOT NULL UNIQUE,
+            last_snapshot REAL
+        );
+        CREATE TABLE titles (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL UNIQUE,
+            key TEXT NOT NULL
+        );
+        CREATE INDEX titles_key ON titles (key);
+        CREATE TABLE snapshots (
+            id INTEGER PRIMARY KEY,
+            theater_id INTEGER NOT NULL REFERENCES theaters (id),
+            scraped_at REAL NOT NULL,
+            title_ids BLOB NOT NULL,
+            dates TEXT NOT NULL,
+            times TEXT NOT NULL
+        );
+        CREATE INDEX snapshots_scraped_at ON snapshots (scraped_at);
+        CREATE INDEX snapshots_theater ON snapshots (theater_id, scraped_at);
+        CREATE TABLE runs (
+            theater_id INTEGER NOT NULL REFERENCES theaters (id),
+            title_id INTEGER NOT NULL REFERENCES titles (id),
+            first_seen REAL NOT NULL,
+            last_seen REAL NOT NULL,
+            PRIMARY KEY (theater_id, title_id, first_seen)
+        );
+        CREATE INDEX runs_title ON runs (title_id, first_seen);
+        CREATE INDEX runs_last_seen ON runs (last_seen);
+    ''',
+}
+
+TYPECODE = 'I'
+
+Snapshot = collections.namedtuple('Snapshot', ['theater_name', 'scraped_at', 'screenings'])
+Run = collections.namedtuple('Run', ['title', 'theater_name', 'first_seen', 'last_seen'])
+
+
+def _pack(title_ids):
+    # Little-endian on every platform, so databases can be copied between machines
+    packed = array(TYPECODE, title_ids)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack(blob):
+    title_ids = array(TYPECODE)
+    title_ids.frombytes(blob)
+    if sys.byteorder == 'big':
+        title_ids.byteswap()
+    return title_ids
+
+
+class HistoryStore(object):
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self._migrate()
+        # Ids never change once assigned, so they are cached for the life of the connection
+        self._title_ids = {}
+        self._titles = {}
+        self._theater_ids = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def schema_version(self):
+        return self.connection.execute('PRAGMA user_version').fetchone()[0]
+
+    def _migrate(self):
+        with self._lock:
+            version = self.schema_version()
+            if version > SCHEMA_VERSION:
+                raise store.StoreError('{} has schema version {}, newer than supported version {}'.format(
+                    self.path, version, SCHEMA_VERSION))
+            for next_version in range(version + 1, SCHEMA_VERSION + 1):
+                logging.info('Migrating %s to schema version %s', self.path, next_version)
+                self.connection.executescript('BEGIN; {} PRAGMA user_version = {}; COMMIT;'.format(
+                    MIGRATIONS[next_version], next_version))
+
+    @contextlib.contextmanager
+    def _writing(self):
+        with self._lock:
+            try:
+                with self.connection:
+                    yield
+            except Exception:
+                # Ids assigned in a rolled back transaction can be handed out again
+                self._title_ids.clear()
+                self._titles.clear()
+                self._theater_ids.clear()
+                raise
+
+    def _title_id(self, title):
+        title_id = self._title_ids.get(title)
+        if title_id is None:
+            self.connection.execute(
+                'INSERT OR IGNORE INTO titles (title, key) VALUES (?, ?)', (title, titles.canonical_key(title))
+            )
+            title_id = self.connection.execute('SELECT id FROM titles WHERE title = ?', (title,)).fetchone()[0]
+            self._title_ids[title] = title_id
+            self._titles[title_id] = title
+        return title_id
+
+    def _title(self, title_id):
+        title = self._titles.get(title_id)
+        if title is None:
+            title = self.connection.execute('SELECT title FROM titles WHERE id = ?', (title_id,)).fetchone()[0]
+            self._titles[title_id] = title
+            self._title_ids[title] = title_id
+        return title
+
+    def _theater_id(self, theater_name):
+        theater_id = self._theater_ids.get(theater_name)
+        if theater_id is None:
+            self.connection.execute('INSERT OR IGNORE INTO theaters (theater_name) VALUES (?)', (theater_name,))
+            theater_id = self.connection.execute(
+                'SELECT id FROM theaters WHERE theater_name = ?', (theater_name,)
+            ).fetchone()[0]
+            self._theater_ids[theater_name] = theater_id
+        return theater_id
+
+    def _append(self, theater_name, screenings, scraped_at):
+        theater_id = self._theater_id(theater_name)
+        last_snapshot = self.connection.execute(
+            'SELECT last_snapshot FROM theaters WHERE id = ?', (theater_id,)
+        ).fetchone()[0]
+        if last_snapshot is not None and scraped_at <= last_snapshot:
+            raise store.StoreError('Snapshot of {} at {} is not after its last snapshot at {}'.format(
+                theater_name, scraped_at, last_snapshot))
+        title_ids = [self._title_id(screening.title) for screening in screenings]
+        cursor = self.connection.execute(
+            'INSERT INTO snapshots (theater_id, scraped_at, title_ids, dates, times) VALUES (?, ?, ?, ?, ?)',
+            (theater_id, scraped_at, _pack(title_ids),
+             json.dumps([screening.date for screening in screenings]),
+             json.dumps([list(screening.times) for screening in screenings]))
+        )
+        for title_id in set(title_ids):
+            # A title listed in the theater's previous snapshot continues its run
+            extended = self.connection.execute(
+                'UPDATE runs SET last_seen = ? WHERE theater_id = ? AND title_id = ? AND last_seen = ?',
+                (scraped_at, theater_id, title_id, last_snapshot)
+            ).rowcount
+            if not extended:
+                self.connection.execute(
+                    'INSERT INTO runs (theater_id, title_id, first_seen, last_seen) VALUES (?, ?, ?, ?)',
+                    (theater_id, title_id, scraped_at, scraped_at)
+                )
+        self.connection.execute('UPDATE theaters SET last_snapshot = ? WHERE id = ?', (scraped_at, theater_id))
+        return cursor.lastrowid
+
+    def append(self, theater_name, screenings, scraped_at = None):
+        # screenings are showtimes.Screenings, e.g. from Theater.screenings()
+        scraped_at = time.time() if scraped_at is None else scraped_at
+        with self._writing():
+            return self._append(theater_name, screenings, scraped_at)
+
+    def append_all(self, theater_screenings, scraped_at = None):
+        # theater -> Screenings, e.g. from TheaterList.screenings(), in one transaction
+        scraped_at = time.time() if scraped_at is None else scraped_at
+        with self._writing():
+            return [self._append(theater_name, screenings, scraped_at)
+                    for theater_name, screenings in theater_screenings.items()]
+
+    def _snapshot(self, row):
+        dates = json.loads(row['dates'])
+        times = json.loads(row['times'])
+        screenings = [
+            showtimes.Screening(self._title(title_id), date, tuple(showing_times))
+            for title_id, date, showing_times in zip(_unpack(row['title_ids']), dates, times)
+        ]
+        return Snapshot(row['theater_name'], row['scraped_at'], screenings)
+
+    def snapshots(self, start = None, end = None, theater_names = None):
+        # Snapshots taken from start up to but not including end, oldest first
+        query = '''SELECT t.theater_name, s.scraped_at, s.title_ids, s.dates, s.times FROM snapshots s
+                   JOIN theaters t ON t.id = s.theater_id WHERE 1'''
+        query, parameters = self._window(query, 's.scraped_at', 's.scraped_at', start, end)
+        if theater_names is not None:
+            query += ' AND t.theater_name IN ({})'.format(', '.join('?' * len(theater_names)))
+            parameters.extend(theater_names)
+        with self._lock:
+            rows = self.connection.execute(query + ' ORDER BY s.scraped_at, t.theater_name', parameters).fetchall()
+            return [self._snapshot(row) for row in rows]
+
+    def latest(self, theater_name):
+        with self._lock:
+            row = self.connection.execute(
+                '''SELECT t.theater_name, s.scraped_at, s.title_ids, s.dates, s.times FROM snapshots s
+                   JOIN theaters t ON t.id = s.theater_id WHERE t.theater_name = ?
+                   ORDER BY s.scraped_at DESC LIMIT 1''',
+                (theater_name,)
+            ).fetchone()
+            return self._snapshot(row) if row is not None else None
+
+    def _window(self, query, start_column, end_column, start, end):
+        parameters = []
+        if start is not None:
+            query += ' AND {} >= ?'.format(end_column)
+            parameters.append(start)
+        if end is not None:
+            query += ' AND {} < ?'.format(start_column)
+            parameters.append(end)
+        return query, parameters
+
+    def runs(self, title = None, theater_name = None, start = None, end = None):
+        # Runs overlapping [start, end), oldest first. title matches on its canonical key.
+        query = '''SELECT ti.title, t.theater_name, r.first_seen, r.last_seen FROM runs r
+                   JOIN titles ti ON ti.id = r.title_id JOIN theaters t ON t.id = r.theater_id WHERE 1'''
+        query, parameters = self._window(query, 'r.first_seen', 'r.last_seen', start, end)
+        if title is not None:
+            query += ' AND ti.key = ?'
+            parameters.append(titles.canonical_key(title))
+        if theater_name is not None:
+            query += ' AND t.theater_name = ?'
+            parameters.append(theater_name)
+        with self._lock:
+            rows = self.connection.execute(query + ' ORDER BY r.first_seen, t.theater_name, ti.title', parameters)
+            return [Run(*row) for row in rows]
+
+    def first_seen(self, title, theater_name = None):
+        # When a title was first listed, anywhere or at one theater; None if never
+        runs = self.runs(title, theater_name)
+        return runs[0].first_seen if runs else None
+
+    def compact(self, before):
+        # Removes snapshots taken before the given time that repeat their theater's previous
+        # snapshot; returns how many were removed
+        removed = []
+        with self._lock, self.connection:
+            previous = {}
+            rows = self.connection.execute(
+                '''SELECT id, theater_id, title_ids, dates, times FROM snapshots WHERE scraped_at < ?
+                   ORDER BY theater_id, scraped_at''',
+                (before,)
+            )
+            for row in rows:
+                content = (row['title_ids'], row['dates'], row['times'])
+                if previous.get(row['theater_id']) == content:
+                    removed.append((row['id'],))
+                previous[row['theater_id']] = content
+            self.connection.executemany('DELETE FROM snapshots WHERE id = ?', removed)
+        logging.info('Compacted %s snapshots taken before %s', len(removed), before)
+        return len(removed)
+
+    def data_version(self):
+        with self._lock:
+            return self.connection.execute('PRAGMA data_version').fetchone()[0]
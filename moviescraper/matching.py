@@ -0,0 +1,104 @@
+#!/usr/local/bin/python3
+
+import collections
+import logging
+from moviescraper import titles
+
+logger = logging.getLogger(__name__)
+
+# Matching of user movie filters against the combined catalogue of every theater.
+#
+# All users' filter strings go into one Aho-Corasick automaton, so each title is scanned
+# once no matter how many users or filters there are. A filter matches a title when it is a
+# substring of it, as in Theater._filter_movie_list(), optionally ignoring case and accents.
+
+Match = collections.namedtuple('Match', ['user', 'title', 'theaters'])
+
+
+def fold(text, ignore_case = False, ignore_accents = False):
+    if ignore_accents:
+        text = titles.strip_accents(text)
+    if ignore_case:
+        text = text.casefold()
+    return text
+
+
+def invert(theater_movies):
+    # Turns TheaterList.movies() output (theater -> titles) into a title -> theaters catalogue
+    catalogue = collections.defaultdict(list)
+    for theater_name, movies in theater_movies.items():
+        for movie in movies:
+            catalogue[movie].append(theater_name)
+    return dict(catalogue)
+
+
+class MovieMatcher(object):
+    def __init__(self, user_filters, ignore_case = False, ignore_accents = False):
+        # user_filters maps each user to an iterable of filter strings
+        self.ignore_case = ignore_case
+        self.ignore_accents = ignore_accents
+        self._goto = [{}]
+        self._fail = [0]
+        self._users = [frozenset()]
+        self._build(user_filters)
+
+    def _normalize(self, text):
+        return fold(text, self.ignore_case, self.ignore_accents)
+
+    def _build(self, user_filters):
+        users_at = collections.defaultdict(set)
+        for user, filters in user_filters.items():
+            for filter_string in filters:
+                filter_string = self._normalize(filter_string)
+                if not filter_string:
+                    continue
+                node = 0
+                for char in filter_string:
+                    next_node = self._goto[node].get(char)
+                    if next_node is None:
+                        next_node = len(self._goto)
+                        self._goto[node][char] = next_node
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._users.append(frozenset())
+                    node = next_node
+                users_at[node].add(user)
+
+        # Breadth-first pass setting failure links, and merging each node's users with those
+        # of its failure target so a match only has to look at the node it lands on
+        queue = collections.deque(self._goto[0].values())
+        for node in queue:
+            self._users[node] = frozenset(users_at.get(node, ()))
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._users[child] = frozenset(users_at.get(child, ())) | self._users[self._fail[child]]
+                queue.append(child)
+        logging.debug('Built movie matcher with %s states', len(self._goto))
+
+    def users_for(self, title):
+        users = set()
+        node = 0
+        goto, fail, node_users = self._goto, self._fail, self._users
+        for char in self._normalize(title):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if node_users[node]:
+                users.update(node_users[node])
+        return users
+
+    def match(self, catalogue):
+        # catalogue maps each title to the theaters showing it; returns a sorted list of Matches
+        matches = []
+        for title, theaters in catalogue.items():
+            for user in self.users_for(title):
+                matches.append(Match(user, title, sorted(theaters)))
+        return sorted(matches)
+
+    def filter_titles(self, titles):
+        return [title for title in titles if self.users_for(title)]
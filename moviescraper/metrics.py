@@ -0,0 +1,131 @@
+#!/usr/local/bin/python3
+
+import collections
+import contextlib
+import threading
+import time
+
+# Per-theater scrape metrics.
+#
+# Theater.movies() times each stage of a scrape (fetch, parse, select, text_search, filter
+# and strip). It also counts bytes downloaded, cache hits, revalidations and misses,
+# unchanged pages and errors. Everything is labelled by theater name, so slow or failing sites stand out.
+# render_prometheus() dumps the registry in the Prometheus text exposition format.
+
+STAGES = ('fetch', 'parse', 'select', 'text_search', 'filter', 'strip')
+PREFIX = 'moviescraper'
+
+COUNTER_HELP = collections.OrderedDict([
+    ('bytes_downloaded', 'Response bytes downloaded'),
+    ('cache_hits', 'Pages served from the response cache without a request'),
+    ('cache_revalidations', 'Stale cache entries confirmed unchanged by the server'),
+    ('cache_misses', 'Pages downloaded in full while a cache was configured'),
+    ('unchanged', 'Re-scrapes skipped because the page had not changed'),
+    ('errors', 'Failed scrapes'),
+    ('scrapes', 'Completed scrapes'),
+])
+
+StageTiming = collections.namedtuple('StageTiming', ['count', 'total', 'max'])
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join('{}="{}"'.format(name, _escape(value)) for name, value in labels.items()) + '}'
+
+
+class Metrics(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = collections.defaultdict(int)
+            self._timings = {}
+
+    def increment(self, name, theater_name, amount = 1):
+        with self._lock:
+            self._counters[(name, theater_name)] += amount
+
+    def observe(self, stage, theater_name, seconds):
+        with self._lock:
+            count, total, longest = self._timings.get((stage, theater_name), (0, 0.0, 0.0))
+            self._timings[(stage, theater_name)] = StageTiming(count + 1, total + seconds, max(longest, seconds))
+
+    @contextlib.contextmanager
+    def timer(self, stage, theater_name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, theater_name, time.perf_counter() - start)
+
+    def counter(self, name, theater_name = None):
+        # Total over all theaters when theater_name is None
+        with self._lock:
+            if theater_name is not None:
+                return self._counters.get((name, theater_name), 0)
+            return sum(value for (counter_name, _), value in self._counters.items() if counter_name == name)
+
+    def timing(self, stage, theater_name):
+        with self._lock:
+            return self._timings.get((stage, theater_name), StageTiming(0, 0.0, 0.0))
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            timings = dict(self._timings)
+        theaters = collections.defaultdict(lambda: {'counters': {}, 'stages': {}})
+        for (name, theater_name), value in counters.items():
+            theaters[theater_name]['counters'][name] = value
+        for (stage, theater_name), timing in timings.items():
+            theaters[theater_name]['stages'][stage] = timing._asdict()
+        return dict(theaters)
+
+    def slowest(self, stage = None, limit = 10):
+        # Theaters by total time, in one stage or summed over all of them
+        totals = collections.defaultdict(float)
+        with self._lock:
+            for (timed_stage, theater_name), timing in self._timings.items():
+                if stage is None or timed_stage == stage:
+                    totals[theater_name] += timing.total
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def render_prometheus(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            timings = sorted(self._timings.items())
+        lines = []
+        for name, help_text in COUNTER_HELP.items():
+            samples = [(theater_name, value) for (counter_name, theater_name), value in counters if counter_name == name]
+            if not samples:
+                continue
+            metric = '{}_{}_total'.format(PREFIX, name)
+            lines.append('# HELP {} {}'.format(metric, help_text))
+            lines.append('# TYPE {} counter'.format(metric))
+            lines.extend('{}{} {}'.format(metric, _labels(theater=theater_name), value) for theater_name, value in samples)
+        if timings:
+            metric = '{}_stage_seconds'.format(PREFIX)
+            lines.append('# HELP {} Time spent in each scrape stage'.format(metric))
+            lines.append('# TYPE {} summary'.format(metric))
+            for (stage, theater_name), timing in timings:
+                labels = _labels(theater=theater_name, stage=stage)
+                lines.append('{}_sum{} {!r}'.format(metric, labels, timing.total))
+                lines.append('{}_count{} {}'.format(metric, labels, timing.count))
+            metric = '{}_stage_max_seconds'.format(PREFIX)
+            lines.append('# HELP {} Longest single run of each scrape stage'.format(metric))
+            lines.append('# TYPE {} gauge'.format(metric))
+            for (stage, theater_name), timing in timings:
+                lines.append('{}{} {!r}'.format(metric, _labels(theater=theater_name, stage=stage), timing.max))
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+_default_metrics = Metrics()
+
+
+def default_metrics():
+    # Shared by theaters that aren't given their own Metrics
+    return _default_metrics
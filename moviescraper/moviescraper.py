@@ -1,185 +1,459 @@
 #!/usr/local/bin/python3
 
-from bs4 import BeautifulSoup
-import pickle
+from moviescraper import aggregate, catalogue, config, matching, metrics, parallel, parsing, showtimes, streaming, titles
+import codecs
+import contextlib
+import hashlib
+import json
 import logging
 import re
-import requests
+import sys
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+class ScrapeError(Exception):
+    # The page was read but list_selector or text_search didn't fit it
+    pass
+
+
 class Theater(object):
-    def __new__(cls, site_url = None, theater_name = None, list_selector = None, text_search = None, filepath=None):
-        logging.debug('In Theater.__new__(), got the following arguments')
-        logging.debug('\tsite_url: {}'.format(site_url))
-        logging.debug('\ttheater_name: {}'.format(theater_name))
-        logging.debug('\tlist_selector: {}'.format(list_selector))
-        logging.debug('\ttext_search: {}'.format(text_search))
-        logging.debug('\tfilepath: {}'.format(filepath))
-        if filepath:
-            logging.debug('Loading Theater instance from filepath {}'.format(filepath))
-            with open(filepath, 'rb') as theater_file:
-                instance = pickle.load(theater_file)
-        else:
-            logging.debug('Creating new Theater instance from scratch')
-            instance = super(Theater, cls).__new__(cls)
-        return instance
+    # Slotted, as a process may hold tens of thousands of theaters
+    __slots__ = (
+        'site_url', 'theater_name', 'list_selector', 'text_search', 'movie_list', 'content_hash', 'expired',
+        'movie_filter', 'cache', 'cache_ttl', 'fetcher', 'parser', 'metrics', 'refresh_interval',
+        'showtime_selector', 'date_selector'
+    )
 
-    def __init__(self, site_url = None, theater_name = None, list_selector = None, text_search = None, filepath=None):
+    def __init__(self, site_url = None, theater_name = None, list_selector = None, text_search = None, filepath=None,
+                 cache = None, cache_ttl = None, fetcher = None, parser = None, metrics = None,
+                 refresh_interval = None, showtime_selector = None, date_selector = None):
+        self.site_url = site_url
+        self.theater_name = theater_name
+        self.list_selector = list_selector
+        self.text_search = text_search
+        # None until scraped; content_hash identifies the page and settings it was scraped from.
+        # In a TheaterList, a scraped theater's movie_list is a read-only catalogue.Row rather
+        # than a list; movies() always returns a list.
+        self.movie_list = None
+        self.content_hash = None
+        self.expired = False
+        self.movie_filter = ([])
+        # A ResponseCache and an optional per-theater TTL overriding the cache's default
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        # Fetcher used for HTTP sites; None means the shared default one
+        self.fetcher = fetcher
+        # One of parsing.PARSERS; None means parsing.DEFAULT_PARSER
+        self.parser = parser
+        # Metrics registry for this theater's scrapes; None means metrics.default_metrics()
+        self.metrics = metrics
+        # Seconds between scheduled scrapes; None means scheduler.DEFAULT_REFRESH_INTERVAL
+        self.refresh_interval = refresh_interval
+        # Optional selectors for screenings(), applied within each title's block of the page
+        self.showtime_selector = showtime_selector
+        self.date_selector = date_selector
         if filepath:
-            logging.debug('Skipping initialization because object was loaded from pickle')
-        else:
-            self.site_url = site_url
-            self.theater_name = theater_name
-            self.list_selector = list_selector
-            self.text_search = text_search
-            self.movie_list = ([])
-            self.movie_filter = ([])
+            self._load_theater_info(filepath)
 
     def __str__(self):
         return "\n".join(['    {}'.format(movie) for movie in self.movies()])
     
     def movies(self):
-        # Only generate list if we haven't already done so
-        # Doesn't currently handle cases where we have already done so but got 0 movies
-        if len(list(self.movie_list)) == 0:
-            logging.info('Generating movie list for {}'.format(self.theater_name))
+        # movie_list is None until the theater has been scraped, so an empty list means it is
+        # known to have no movies. After expire(), the next call fetches the page again but
+        # keeps the stored list if the page's content hash hasn't changed.
+        if self.movie_list is None or self.expired:
+            metrics = self._metrics()
             try:
-                self.movie_list = set(self._generate_movie_list())
-            except (AttributeError, IndexError):
-                logging.error('Error retrieving data for {} -- check configuration.'.format(self.theater_name))
-                self.movie_list = []
-            logging.debug('Got movie list: {}'.format(self.movie_list))
-
-            if len(self.movie_filter) > 0:
-                logging.info('Applying user filter to movie list for {}'.format(self.theater_name))
-                self.movie_list = self._filter_movie_list(self.movie_list, self.movie_filter)
-                logging.debug('Filtered to {}'.format(self.movie_list))
-            else:
-                logging.info('No user filter found during {} generation'.format(self.theater_name))
-
-            logging.debug('Returning list is type {}, value {}'.format(type(self.movie_list), self.movie_list))
-            if self.movie_list == {None}:
-                logging.debug('Movie list is "None", setting to []')
-                self.movie_list = []
-            else:
-                logging.debug('Movie list is {}, stripping titles'.format(self.movie_list))
-                self.movie_list = sorted(self._strip_movie_titles(self.movie_list))
+                page = content_hash = None
+                if not self._streaming():
+                    page = self._read_page()
+                    content_hash = self._content_hash(page)
+                if self.movie_list is not None and content_hash is not None and content_hash == self.content_hash:
+                    logging.info('%s is unchanged, keeping its movie list', self.theater_name)
+                    metrics.increment('unchanged', self.theater_name)
+                else:
+                    self.movie_list = self._scrape(page)
+            except Exception:
+                metrics.increment('errors', self.theater_name)
+                raise
+            self.content_hash = content_hash
+            self.expired = False
         else:
-            logging.debug('Skipping movie list generation for {} because we already have it'.format(self.theater_name))
-        logging.debug('Completed movies() method for {}, filter is now {}'.format(self.theater_name, self.movie_filter))
+            logging.debug('Skipping movie list generation for %s because we already have it', self.theater_name)
+        logging.debug('Completed movies() method for %s, filter is now %s', self.theater_name, self.movie_filter)
+        if isinstance(self.movie_list, catalogue.Row):
+            return list(self.movie_list)
         return self.movie_list
 
-    def _generate_movie_list(self):
-        logging.debug('Using list_selector {} for URL {}'.format(self.list_selector, self.site_url))
-        soup = self._get_soup()
-        logging.debug('Got soup: {}'.format(soup))
-        movie_list = soup.select(self.list_selector)
-        logging.debug('Selected data from soup.select() is {}'.format(movie_list))
-        movies = [movie.string for movie in movie_list]
-        logging.debug('Movie strings are {}'.format(movies))
+    def expire(self):
+        self.expired = True
+
+    def refresh(self):
+        self.expire()
+        return self.movies()
+
+    def _scrape(self, page = None):
+        logging.info('Generating movie list for %s', self.theater_name)
+        metrics = self._metrics()
+        try:
+            movie_list = [movie for movie in self._generate_movie_list(page) if movie is not None]
+        except (AttributeError, IndexError) as error:
+            # Raised rather than saved as an empty list, so the failure isn't mistaken for a
+            # theater with no movies; movies() counts it
+            logging.error('Error retrieving data for %s -- check configuration.', self.theater_name)
+            raise ScrapeError('Cannot read the movie list of {}: {!r}'.format(self.theater_name, error)) from error
+        logging.debug('Got movie list: %s', movie_list)
+
+        if len(self.movie_filter) > 0:
+            logging.info('Applying user filter to movie list for %s', self.theater_name)
+            with metrics.timer('filter', self.theater_name):
+                movie_list = self._filter_movie_list(movie_list, self.movie_filter)
+            logging.debug('Filtered to %s', movie_list)
+        else:
+            logging.info('No user filter found during %s generation', self.theater_name)
+
+        # Always a sorted list of distinct, interned titles
+        with metrics.timer('strip', self.theater_name):
+            movie_list = sorted(set(self._strip_movie_titles(movie_list)))
+        metrics.increment('scrapes', self.theater_name)
+        return movie_list
+
+    def screenings(self):
+        # Extended scrape: each title with its date and showtimes. Always parses the whole
+        # page, as times and dates sit outside the elements list_selector picks out.
+        metrics = self._metrics()
+        try:
+            page = self._read_page()
+            with metrics.timer('parse', self.theater_name):
+                soup = parsing.make_soup(page, self.parser or parsing.DEFAULT_PARSER)
+            with metrics.timer('select', self.theater_name):
+                screenings = showtimes.extract(
+                    soup, self.list_selector, self.text_search, self.showtime_selector, self.date_selector
+                )
+        except Exception:
+            metrics.increment('errors', self.theater_name)
+            raise
+        if self.movie_filter:
+            screenings = [screening for screening in screenings
+                          if self._filter_movie_list([screening.title], self.movie_filter)]
+        return screenings
+
+    def _content_hash(self, page):
+        # Covers everything the stored movie list depends on, not just the page
+        digest = hashlib.sha256()
+        # movie_filter may be a set, so it is sorted to hash the same in every process
+        for part in (self.list_selector, self.text_search or '', '\n'.join(sorted(self.movie_filter)), page):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def iter_movies(self):
+        # Yields the same titles as movies(). With the streaming parser and no text_search,
+        # each title is yielded as soon as its element has been read, before the page is done.
+        if (self.movie_list is not None and not self.expired) or not self._streaming() or self.text_search is not None:
+            for movie in self.movies():
+                yield movie
+            return
+        logging.info('Streaming movie list for %s', self.theater_name)
+        metrics = self._metrics()
+        seen = set()
+        try:
+            for movie in self._stream_movie_list():
+                if movie is None or (self.movie_filter and not self._filter_movie_list([movie], self.movie_filter)):
+                    continue
+                movie = sys.intern(titles.strip_title(movie))
+                if movie not in seen:
+                    seen.add(movie)
+                    yield movie
+        except Exception:
+            metrics.increment('errors', self.theater_name)
+            raise
+        self.movie_list = sorted(seen)
+        self.content_hash = None
+        self.expired = False
+        metrics.increment('scrapes', self.theater_name)
+
+    def _metrics(self):
+        return self.metrics or metrics.default_metrics()
+
+    def _streaming(self):
+        if self.parser != parsing.STREAM:
+            return False
+        if not streaming.supports(self.list_selector):
+            logging.debug('Cannot stream selector %s, parsing the whole page', self.list_selector)
+            return False
+        return True
+
+    def _generate_movie_list(self, page = None):
+        logging.debug('Using list_selector %s for URL %s', self.list_selector, self.site_url)
+        if self._streaming():
+            movies = list(self._stream_movie_list())
+        else:
+            soup = self._get_soup(page)
+            logging.debug('Got soup: %s', soup)
+            with self._metrics().timer('select', self.theater_name):
+                movie_list = parsing.select(soup, self.list_selector)
+                logging.debug('Selected data from soup.select() is %s', movie_list)
+                movies = [movie.string for movie in movie_list]
+        logging.debug('Movie strings are %s', movies)
         if self.text_search is not None:
             # Special case to handle multiple movies in one text string
-            logging.debug('Applying custom text search {}'.format(self.text_search))
-            movies = re.search(self.text_search, ', '.join(movies)).group(1).split(', ')
+            logging.debug('Applying custom text search %s', self.text_search)
+            with self._metrics().timer('text_search', self.theater_name):
+                movies = re.search(self.text_search, ', '.join(movies)).group(1).split(', ')
         return movies
 
-    def _get_soup(self):
+    def _get_soup(self, page = None):
         # Broken out to simplify testing
-        if self.site_url.startswith('http'):
-            logging.debug('Getting soup for URL {}'.format(self.site_url))
-            soup = BeautifulSoup(requests.get(self.site_url).text, 'html.parser')
-        else:
-            logging.debug('Getting soup for file path {}'.format(self.site_url))
+        parser = self.parser or parsing.DEFAULT_PARSER
+        if page is None:
+            page = self._read_page()
+        with self._metrics().timer('parse', self.theater_name):
+            return parsing.make_soup(page, parser, self.list_selector)
+
+    def _read_page(self):
+        with self._metrics().timer('fetch', self.theater_name):
+            if self.site_url.startswith('http'):
+                logging.debug('Getting page for URL %s', self.site_url)
+                return self._get_page()
+            logging.debug('Getting page for file path %s', self.site_url)
+            with open(self.site_url) as html_file:
+                return html_file.read()
+
+    def _stream_movie_list(self):
+        # Reading and selecting are interleaved, so their times are summed into the fetch
+        # and parse stages and recorded once the stream ends
+        metrics = self._metrics()
+        fetch_time = parse_time = 0.0
+        selector = streaming.StreamSelector(self.list_selector)
+        chunks = self._stream_page()
+        try:
+            while not selector.done:
+                start = time.perf_counter()
+                chunk = next(chunks, None)
+                fetch_time += time.perf_counter() - start
+                start = time.perf_counter()
+                movies = selector.close() if chunk is None else selector.feed(chunk)
+                parse_time += time.perf_counter() - start
+                for movie in movies:
+                    yield movie
+        finally:
+            # Closing the page generator ends the download if the selector finished early
+            chunks.close()
+            metrics.observe('fetch', self.theater_name, fetch_time)
+            metrics.observe('parse', self.theater_name, parse_time)
+
+    def _stream_page(self):
+        # Yields the page as text chunks. Cached pages are read whole, as the cache stores whole pages.
+        if not self.site_url.startswith('http'):
+            logging.debug('Streaming file path %s', self.site_url)
             with open(self.site_url) as html_file:
-                soup = BeautifulSoup(html_file, 'html.parser')
-        return soup
+                for chunk in streaming.read_chunks(html_file):
+                    yield chunk
+            return
+        if self.cache is not None:
+            for chunk in streaming.text_chunks(self._get_page()):
+                yield chunk
+            return
+
+        logging.debug('Streaming URL %s', self.site_url)
+        fetcher = self.fetcher or self._default_fetcher()
+        metrics = self._metrics()
+        with contextlib.closing(fetcher.stream(self.site_url)) as response:
+            response.raise_for_status()
+            decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+            for block in response.iter_content(streaming.DEFAULT_CHUNK_SIZE):
+                metrics.increment('bytes_downloaded', self.theater_name, len(block))
+                yield decoder.decode(block)
+            yield decoder.decode(b'', final=True)
+
+    def _default_fetcher(self):
+        # Imported here, as requests is slow to import and local pages never need it
+        from moviescraper import fetch
+        return fetch.default_fetcher()
+
+    def _get_page(self):
+        fetcher = self.fetcher or self._default_fetcher()
+        metrics = self._metrics()
+        responses = []
+
+        def get(url, headers = None):
+            response = fetcher.get(url, headers)
+            metrics.increment('bytes_downloaded', self.theater_name, len(response.content))
+            # An error page isn't a movie listing, so fail the scrape instead of parsing it
+            response.raise_for_status()
+            responses.append(response)
+            return response
+
+        if self.cache is None:
+            return get(self.site_url).text
+        page = self.cache.fetch(self.site_url, get, self.cache_ttl)
+        if not responses:
+            metrics.increment('cache_hits', self.theater_name)
+        elif responses[-1].status_code == 304:
+            metrics.increment('cache_revalidations', self.theater_name)
+        else:
+            metrics.increment('cache_misses', self.theater_name)
+        return page
 
     def _filter_movie_list(self, movie_list, movie_filter):
-        # It would be more efficient to apply this only once after retrieving from all theaters
-        logging.debug('Movie list is {}'.format(movie_list))
-        logging.debug('User filter is {}'.format(movie_filter))
+        # For many theaters or users, TheaterList.matches() applies filters once to the combined list
+        logging.debug('Movie list is %s', movie_list)
+        logging.debug('User filter is %s', movie_filter)
         return list(filter(
             (lambda x: any(filter_string in x for filter_string in movie_filter)), movie_list
         ))
 
     def _strip_movie_titles(self, movie_titles):
-        # Could do multiple regexes in one pass but let's start simple
-        logging.debug('Stripping titles: {}'.format(movie_titles))
-        movie_titles = [re.sub(r'^\W+', '', title) for title in movie_titles]
-        movie_titles = [re.sub(r'\W+$', '', title) for title in movie_titles]
-        movie_titles = [re.sub(r' //.*', '', title) for title in movie_titles]
-        movie_titles = [re.sub(u"\u2019", '\'', title) for title in movie_titles]
-        logging.debug('Stripped titles: {}'.format(movie_titles))
+        # Interned, so theaters showing the same film share one copy of its title
+        logging.debug('Stripping titles: %s', movie_titles)
+        movie_titles = [sys.intern(titles.strip_title(title)) for title in movie_titles]
+        logging.debug('Stripped titles: %s', movie_titles)
         return movie_titles
 
-    # Basic POC
+    def to_config(self):
+        return config.theater_config(self)
+
     def _save_theater_info(self, filepath):
-        logging.debug('Saving theater info to {}'.format(filepath))
-        with open(filepath, 'wb') as theater_file:
-            pickle.dump(self, theater_file)
+        logging.debug('Saving theater info to %s', filepath)
+        with open(filepath, 'w', encoding='utf-8') as theater_file:
+            json.dump({
+                'version': config.CONFIG_VERSION,
+                'theater': self.to_config(),
+                'movie_list': None if self.movie_list is None else list(self.movie_list),
+                'content_hash': self.content_hash
+            }, theater_file)
+
+    def _load_theater_info(self, filepath):
+        logging.debug('Loading theater info from %s', filepath)
+        with open(filepath, encoding='utf-8') as theater_file:
+            theater_info = json.load(theater_file)
+        for field, value in config.parse_config([theater_info['theater']])[0].items():
+            setattr(self, field, value)
+        movie_list = theater_info.get('movie_list')
+        self.movie_list = None if movie_list is None else [sys.intern(movie) for movie in movie_list]
+        self.content_hash = theater_info.get('content_hash')
 
 
 class Theaters:
-    def __init__(self):
-        laurelhurst_theater = Theater(
-            site_url = 'http://laurelhursttheater.com/', theater_name = 'Laurelhurst',
-            list_selector = 'div.movieListing_titleContainer > span.movieListing_title > a'
-        )
-        lake_theater = Theater(
-            site_url = 'http://laketheatercafe.com/', theater_name = 'Lake Theater',
-            list_selector = 'section#nowplaying > div.section-inner > div.section-content > p > span',
-            text_search = 'Now Playing: (.+)$'
-        )
-        academy_theater = Theater(
-            site_url = 'http://www.academytheaterpdx.com/', theater_name = 'Academy Theater',
-            list_selector = 'div.now_playing > section.board > ul > li > a'
-        )
-        livingroom_theater = Theater(
-            site_url = 'http://pdx.livingroomtheaters.com/', theater_name = 'Living Room Theaters',
-            list_selector = 'ul.movie_titles > li > a'
-        )
-        wunderland_theater = Theater(
-            site_url = 'http://www.wunderlandgames.com/gettimes.asp?house=3054',
-            theater_name = 'Milwaukie Wunderland Cinema', list_selector = 'a.a1title > b'
-        )
-        moreland_theater = Theater(
-            site_url = 'https://ticketing.us.veezi.com/sessions/?siteToken=v0v9bscth4zdgv6ezczt5ecsjm',
-            theater_name = 'Moreland Theater',
-            list_selector = 'div#sessionsByFilmConent > div.film > div > h3.title'
-        )
-        self.theaters = [ laurelhurst_theater, lake_theater, academy_theater, 
-                livingroom_theater, wunderland_theater, moreland_theater ]
+    def __init__(self, config_path = config.DEFAULT_CONFIG):
+        self.theaters = [ Theater(**theater_info) for theater_info in config.load_config(config_path) ]
 
     def theater_list(self):
         return self.theaters
 
 
 class TheaterList(object):
-    def __init__(self, config = None):
+    def __init__(self, config = None, cache = None, fetcher = None, parser = None, metrics = None):
         logging.debug('Initializing new TheaterList instance')
         self.theater_list = []
+        # Every theater's latest titles, as ids into one shared title table. Once scraped,
+        # each theater's movie_list is a Row over its catalogue row rather than a list of its
+        # own; movies() still returns plain lists, built from the catalogue.
+        self.catalogue = catalogue.Catalogue()
+        # theater -> exception, for the theaters that failed in the last movies() or screenings()
+        self.errors = {}
+        self.cache = cache
+        self.fetcher = fetcher
+        self.parser = parser
+        self.metrics = metrics
         if config:
-            logging.debug('Loading theater list from config: {}'.format(config))
+            logging.debug('Loading theater list from config: %s', config)
             for theater_info in config:
-                logging.debug('Loading a theater with theater info {}'.format(theater_info))
+                logging.debug('Loading a theater with theater info %s', theater_info)
                 theater = Theater(**theater_info)
                 self.add_theater(theater)
 
     def add_theater(self, theater):
+        if theater.cache is None:
+            theater.cache = self.cache
+        if theater.fetcher is None:
+            theater.fetcher = self.fetcher
+        if theater.parser is None:
+            theater.parser = self.parser
+        if theater.metrics is None:
+            theater.metrics = self.metrics
         self.theater_list.append(theater)
 
     def remove_theater(self, theater):
         if theater in self.theater_list:
             self.theater_list.remove(theater)
+            self.catalogue.discard(theater.theater_name)
+            if isinstance(theater.movie_list, catalogue.Row):
+                theater.movie_list = list(theater.movie_list)
 
     def list_theaters(self):
         return [ theater.theater_name for theater in self.theater_list ]
 
-    def movies(self):
-        movies = {}
+    def movies(self, max_workers = 1, per_host_limit = parallel.DEFAULT_PER_HOST_LIMIT):
+        # Theaters that fail to scrape are left out, keep their previous catalogue row and
+        # are listed in errors, so a failure is never mistaken for a theater with no movies
+        if max_workers > 1:
+            results = self.iter_movies(max_workers, per_host_limit)
+        else:
+            results = (parallel.scrape_theater(theater) for theater in self.theater_list)
+        scraped = {}
+        self.errors = {}
+        for result in results:
+            if result.error is not None:
+                self.errors[result.theater.theater_name] = result.error
+            else:
+                scraped[result.theater.theater_name] = result.movies
+        movies = dict((theater.theater_name, scraped[theater.theater_name])
+                      for theater in self.theater_list if theater.theater_name in scraped)
+        for theater_name, movie_list in movies.items():
+            self.catalogue.set(theater_name, movie_list)
+        self.catalogue.compact()
         for theater in self.theater_list:
-            movies[theater.theater_name] = theater.movies()
-        return movies
+            if theater.theater_name in movies:
+                theater.movie_list = self.catalogue.row(theater.theater_name)
+        return dict((theater_name, self.catalogue.movies(theater_name)) for theater_name in movies)
+
+    def refresh(self, max_workers = 1, per_host_limit = parallel.DEFAULT_PER_HOST_LIMIT):
+        # Fetches every theater again, only re-parsing the pages that changed
+        for theater in self.theater_list:
+            theater.expire()
+        return self.movies(max_workers, per_host_limit)
+
+    def screenings(self):
+        # theater -> Screenings, for HistoryStore.append_all(). As in movies(), theaters that
+        # fail are left out and listed in errors.
+        screenings = {}
+        self.errors = {}
+        for theater in self.theater_list:
+            try:
+                screenings[theater.theater_name] = theater.screenings()
+            except Exception as error:
+                logging.error('Error scraping screenings of %s: %r', theater.theater_name, error)
+                self.errors[theater.theater_name] = error
+        return screenings
+
+    def movie_index(self, max_workers = 1, per_host_limit = parallel.DEFAULT_PER_HOST_LIMIT, fuzzy = True):
+        # Movie -> theaters index keyed on canonical titles, filled in as each theater finishes
+        index = aggregate.MovieIndex(fuzzy)
+        if max_workers > 1:
+            index.add_results(self.iter_movies(max_workers, per_host_limit))
+        else:
+            index.add_results(parallel.scrape_theater(theater) for theater in self.theater_list)
+        return index
+
+    def matches(self, user_filters, ignore_case = False, ignore_accents = False, max_workers = 1):
+        # Every (user, title, theaters) match across all theaters, from one pass over the titles
+        matcher = matching.MovieMatcher(user_filters, ignore_case, ignore_accents)
+        self.movies(max_workers)
+        return matcher.match(self.catalogue.invert())
+
+    def iter_movies(self, max_workers = parallel.DEFAULT_MAX_WORKERS,
+                    per_host_limit = parallel.DEFAULT_PER_HOST_LIMIT):
+        # Yields a ScrapeResult per theater, in completion order
+        return parallel.scrape_threaded(self.theater_list, max_workers, per_host_limit)
+
+    def iter_movies_async(self, max_workers = parallel.DEFAULT_MAX_WORKERS,
+                          per_host_limit = parallel.DEFAULT_PER_HOST_LIMIT):
+        # Async generator version of iter_movies(), for use with "async for"
+        return parallel.scrape_async(self.theater_list, max_workers, per_host_limit)
 
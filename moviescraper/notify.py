@@ -0,0 +1,346 @@
+#!/usr/local/bin/python3
+
+import collections
+import email.message
+import json
+import logging
+import smtplib
+import sqlite3
+import threading
+import time
+from moviescraper import matching, store
+
+logger = logging.getLogger(__name__)
+
+# Multi-user watchlists and notification of new showings.
+#
+# Each run compares the latest scrape with the previous snapshot, so only (title, theater)
+# pairs that weren't showing last time are matched against watchlists. Filters added since
+# the last delivered run, here or by another process, are also matched against everything
+# playing; when each filter was added and when the last run started are kept in the
+# database, so a Notifier made afresh for every run (e.g. from cron) does the same.
+# Pairs a user has already been told about are skipped, so each user hears about a movie
+# once per theater.
+# Notifications are handed to a sink in batches, and only recorded once the sink accepts them.
+
+SCHEMA_VERSION = 2
+
+MIGRATIONS = {
+    1: '''
+        CREATE TABLE users (
+            user_id TEXT PRIMARY KEY,
+            address TEXT
+        );
+        CREATE TABLE watchlist (
+            user_id TEXT NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+            filter_string TEXT NOT NULL,
+            PRIMARY KEY (user_id, filter_string)
+        );
+        CREATE TABLE snapshot (
+            theater_name TEXT NOT NULL,
+            title TEXT NOT NULL,
+            first_seen REAL NOT NULL,
+            PRIMARY KEY (theater_name, title)
+        );
+        CREATE TABLE notified (
+            user_id TEXT NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+            theater_name TEXT NOT NULL,
+            title TEXT NOT NULL,
+            notified_at REAL NOT NULL,
+            PRIMARY KEY (user_id, theater_name, title)
+        );
+    ''',
+    2: '''
+        ALTER TABLE watchlist ADD COLUMN added_at REAL NOT NULL DEFAULT 0;
+        CREATE TABLE state (
+            name TEXT PRIMARY KEY,
+            value REAL NOT NULL
+        );
+    ''',
+}
+
+DEFAULT_BATCH_SIZE = 100
+
+Notification = collections.namedtuple('Notification', ['user', 'address', 'matches'])
+
+
+class WatchlistStore(object):
+    def __init__(self, path):
+        # Kept apart from TheaterStore's database, since each tracks its own schema version
+        self.path = path
+        self._lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self._migrate()
+        # Bumped on every watchlist change so callers can tell when to rebuild matchers
+        self.version = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def _migrate(self):
+        with self._lock:
+            version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+            if version > SCHEMA_VERSION:
+                raise store.StoreError('{} has schema version {}, newer than supported version {}'.format(
+                    self.path, version, SCHEMA_VERSION))
+            for next_version in range(version + 1, SCHEMA_VERSION + 1):
+                self.connection.executescript('BEGIN; {} PRAGMA user_version = {}; COMMIT;'.format(
+                    MIGRATIONS[next_version], next_version))
+
+    def data_version(self):
+        # Unlike version, this also changes when another connection or process commits
+        with self._lock:
+            return self.connection.execute('PRAGMA data_version').fetchone()[0]
+
+    def add_user(self, user, address = None):
+        with self._lock, self.connection:
+            self.connection.execute(
+                'INSERT INTO users (user_id, address) VALUES (?, ?) '
+                'ON CONFLICT (user_id) DO UPDATE SET address = excluded.address',
+                (user, address)
+            )
+
+    def remove_user(self, user):
+        with self._lock, self.connection:
+            self.connection.execute('DELETE FROM users WHERE user_id = ?', (user,))
+            self.version += 1
+
+    def users(self):
+        with self._lock:
+            return dict(self.connection.execute('SELECT user_id, address FROM users ORDER BY user_id'))
+
+    def add_movies(self, user, movies):
+        with self._lock, self.connection:
+            self.connection.execute('INSERT OR IGNORE INTO users (user_id) VALUES (?)', (user,))
+            added_at = time.time()
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO watchlist (user_id, filter_string, added_at) VALUES (?, ?, ?)',
+                [(user, movie, added_at) for movie in movies]
+            )
+            self.version += 1
+
+    def remove_movies(self, user, movies):
+        with self._lock, self.connection:
+            self.connection.executemany(
+                'DELETE FROM watchlist WHERE user_id = ? AND filter_string = ?',
+                [(user, movie) for movie in movies]
+            )
+            self.version += 1
+
+    def movies(self, user):
+        with self._lock:
+            return set(row[0] for row in self.connection.execute(
+                'SELECT filter_string FROM watchlist WHERE user_id = ?', (user,)))
+
+    def user_filters(self, added_since = None):
+        # user -> filters, only those added at or after added_since when given
+        query = 'SELECT user_id, filter_string FROM watchlist'
+        parameters = ()
+        if added_since is not None:
+            query += ' WHERE added_at >= ?'
+            parameters = (added_since,)
+        filters = collections.defaultdict(set)
+        with self._lock:
+            for user, filter_string in self.connection.execute(query, parameters):
+                filters[user].add(filter_string)
+        return dict(filters)
+
+    def last_run(self):
+        # When the last delivered Notifier run started, or None before the first
+        with self._lock:
+            row = self.connection.execute("SELECT value FROM state WHERE name = 'last_run'").fetchone()
+        return row[0] if row is not None else None
+
+    def mark_run(self, started_at):
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO state (name, value) VALUES ('last_run', ?) "
+                'ON CONFLICT (name) DO UPDATE SET value = excluded.value',
+                (started_at,)
+            )
+
+    def _snapshot(self, theater_name):
+        return set(row[0] for row in self.connection.execute(
+            'SELECT title FROM snapshot WHERE theater_name = ?', (theater_name,)))
+
+    def new_showings(self, theater_movies):
+        # Compares theater_movies (theater -> titles) with the stored snapshot and returns the
+        # (title, theater) pairs that weren't there before, as a title -> theaters catalogue
+        new = collections.defaultdict(list)
+        with self._lock:
+            for theater_name, movies in theater_movies.items():
+                for title in set(movies) - self._snapshot(theater_name):
+                    new[title].append(theater_name)
+        logging.debug('Snapshot diff found %s new titles', len(new))
+        return dict(new)
+
+    def save_snapshot(self, theater_movies, seen_at = None):
+        # Only the theaters in theater_movies are replaced, so a theater whose scrape failed
+        # and was left out keeps its previous snapshot
+        seen_at = time.time() if seen_at is None else seen_at
+        with self._lock, self.connection:
+            for theater_name, movies in theater_movies.items():
+                previous = self._snapshot(theater_name)
+                current = set(movies)
+                self.connection.executemany(
+                    'DELETE FROM snapshot WHERE theater_name = ? AND title = ?',
+                    [(theater_name, title) for title in previous - current]
+                )
+                self.connection.executemany(
+                    'INSERT INTO snapshot (theater_name, title, first_seen) VALUES (?, ?, ?)',
+                    [(theater_name, title, seen_at) for title in current - previous]
+                )
+
+    def unnotified(self, matches):
+        # Drops (user, theater) pairs from each Match that the user has already been told about
+        remaining = []
+        with self._lock:
+            for match in matches:
+                theaters = [
+                    theater_name for theater_name in match.theaters
+                    if self.connection.execute(
+                        'SELECT 1 FROM notified WHERE user_id = ? AND theater_name = ? AND title = ?',
+                        (match.user, theater_name, match.title)
+                    ).fetchone() is None
+                ]
+                if theaters:
+                    remaining.append(match._replace(theaters=theaters))
+        return remaining
+
+    def mark_notified(self, notifications, notified_at = None):
+        notified_at = time.time() if notified_at is None else notified_at
+        rows = [
+            (notification.user, theater_name, match.title, notified_at)
+            for notification in notifications for match in notification.matches for theater_name in match.theaters
+        ]
+        with self._lock, self.connection:
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO notified (user_id, theater_name, title, notified_at) VALUES (?, ?, ?, ?)', rows
+            )
+
+
+class Notifier(object):
+    def __init__(self, store, sink, batch_size = DEFAULT_BATCH_SIZE, ignore_case = True, ignore_accents = True):
+        self.store = store
+        self.sink = sink
+        self.batch_size = batch_size
+        self.ignore_case = ignore_case
+        self.ignore_accents = ignore_accents
+        self._matcher = None
+        self._matcher_version = None
+
+    def _filters_version(self):
+        # version covers this connection's changes, data_version commits from other processes
+        return (self.store.version, self.store.data_version())
+
+    def matcher(self):
+        version = self._filters_version()
+        if self._matcher is None or self._matcher_version != version:
+            self._matcher = matching.MovieMatcher(self.store.user_filters(), self.ignore_case, self.ignore_accents)
+            self._matcher_version = version
+        return self._matcher
+
+    def run(self, theater_movies):
+        # theater_movies is TheaterList.movies() output; returns the notifications delivered.
+        # New showings are matched against every watchlist, and filters added since the last
+        # run against everything playing, so a film already showing is still reported.
+        # The snapshot and run time are only saved after delivery, so a failed run is retried
+        # next time. Filters added while a run is going are matched again by the next one.
+        started_at = time.time()
+        matcher = self.matcher()
+        new = self.store.new_showings(theater_movies)
+        matches = matcher.match(new) if new else []
+        added = self.store.user_filters(self.store.last_run())
+        if added:
+            added_matcher = matching.MovieMatcher(added, self.ignore_case, self.ignore_accents)
+            matches.extend(added_matcher.match(matching.invert(theater_movies)))
+        matches = self.store.unnotified(_merge(matches))
+        if not matches:
+            logging.info('No new showings for any watchlist since the last run')
+            self.store.save_snapshot(theater_movies)
+            self.store.mark_run(started_at)
+            return []
+
+        by_user = collections.OrderedDict()
+        for match in matches:
+            by_user.setdefault(match.user, []).append(match)
+        addresses = self.store.users()
+        notifications = [Notification(user, addresses.get(user), user_matches) for user, user_matches in by_user.items()]
+
+        for start in range(0, len(notifications), self.batch_size):
+            batch = notifications[start:start + self.batch_size]
+            self.sink.send(batch)
+            self.store.mark_notified(batch)
+        self.store.save_snapshot(theater_movies)
+        self.store.mark_run(started_at)
+        logging.info('Sent %s notifications for %s new titles', len(notifications), len(new))
+        return notifications
+
+
+def _merge(matches):
+    # One Match per user and title, with the theaters of every Match for them
+    theaters = collections.defaultdict(set)
+    for match in matches:
+        theaters[(match.user, match.title)].update(match.theaters)
+    return [matching.Match(user, title, sorted(theaters[(user, title)])) for user, title in sorted(theaters)]
+
+
+def format_notification(notification):
+    lines = ['Movies on your list are now playing:', '']
+    for match in notification.matches:
+        lines.append('    {} at {}'.format(match.title, ', '.join(match.theaters)))
+    return '\n'.join(lines) + '\n'
+
+
+class MemorySink(object):
+    def __init__(self):
+        self.sent = []
+
+    def send(self, notifications):
+        self.sent.extend(notifications)
+
+
+class FileSink(object):
+    # Appends one JSON line per notification
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, notifications):
+        with open(self.path, 'a', encoding='utf-8') as sink_file:
+            for notification in notifications:
+                sink_file.write(json.dumps({
+                    'user': notification.user,
+                    'address': notification.address,
+                    'matches': [match._asdict() for match in notification.matches]
+                }) + '\n')
+
+
+class SMTPSink(object):
+    # Sends each batch over one SMTP connection. smtp_factory can be replaced with a stand-in.
+    def __init__(self, host = 'localhost', port = 25, sender = 'second-run@localhost',
+                 subject = 'Movies on your list are playing', smtp_factory = smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.subject = subject
+        self.smtp_factory = smtp_factory
+
+    def send(self, notifications):
+        with self.smtp_factory(self.host, self.port) as smtp:
+            for notification in notifications:
+                if not notification.address:
+                    logging.warning('No address for user %s, skipping email', notification.user)
+                    continue
+                message = email.message.EmailMessage()
+                message['From'] = self.sender
+                message['To'] = notification.address
+                message['Subject'] = self.subject
+                message.set_content(format_notification(notification))
+                smtp.send_message(message)
@@ -0,0 +1,273 @@
+#!/usr/local/bin/python3
+
+import argparse
+import collections
+import concurrent.futures
+import json
+import logging
+import math
+import os
+import re
+from moviescraper import config, moviescraper, parsing, store
+
+logger = logging.getLogger(__name__)
+
+# Bulk onboarding of new theaters from saved pages.
+#
+# discover() proposes list selectors for a page. Every element with a single string is
+# grouped by its path from the nearest ancestor with an id ("div#listing > ul.films > li > a"),
+# and each group is scored on how much it looks like a list of movie titles:
+#
+#   - repeated: more items score higher, with diminishing returns
+#   - distinct: navigation and session times repeat, titles mostly don't
+#   - title-like text: not times, dates, prices, ratings or menu words, and not too long
+#   - title-ish markup: headings, or a class or id mentioning a title, film or movie
+#
+# An element reading "Now Playing: A, B, C" gets a text_search proposal, selecting just that element.
+# Proposals are checked by running a real Theater against the saved page, in parallel worker
+# processes, and the configs that validate are written to a TheaterStore.
+
+MAX_DEPTH = 5
+MIN_ITEMS = 2
+MIN_MOVIES = 1
+DEFAULT_CANDIDATES = 5
+DEFAULT_PROCESSES = 4
+MAX_TITLE_LENGTH = 100
+MAX_TITLE_WORDS = 15
+
+HEADINGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+NAVIGATION = frozenset([
+    'home', 'about', 'about us', 'contact', 'contact us', 'tickets', 'buy tickets', 'get tickets',
+    'more info', 'info', 'details', 'read more', 'menu', 'events', 'calendar', 'gift cards', 'login',
+    'log in', 'sign in', 'trailer', 'watch trailer', 'showtimes', 'now playing', 'coming soon', 'faq',
+    'news', 'shop', 'donate', 'membership', 'privacy policy', 'rentals', 'careers', 'search'
+])
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][\w-]*$')
+# Generated class names ("css-1x2y3z", "jsx-20391") change between deploys
+_GENERATED = re.compile(r'\d{3}|^(?:css|jsx|sc)-')
+_TITLE_HINT = re.compile(r'title|film|movie|show|feature', re.IGNORECASE)
+_NOT_TITLE = re.compile(
+    r'^(?:\d{1,2}(?::\d\d)?\s*(?:[ap]\.?m\.?)?|[$€£]\s*\d.*|\d{1,2}/\d{1,2}(?:/\d{2,4})?'
+    r'|(?:mon|tues?|wed(?:nes)?|thu(?:rs?)?|fri|sat(?:ur)?|sun)(?:day)?\.?'
+    r'(?:,?\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{1,2}|,?\s+\d{1,2}/\d{1,2})?'
+    r'|g|pg|pg-13|r|nc-17|nr|not rated)$',
+    re.IGNORECASE
+)
+_LABELLED_LIST = re.compile(r'^\s*(?P<label>[A-Za-z][\w ]{1,39}?)\s*:\s*(?P<items>[^,]+(?:,\s*[^,]+)+?)\s*$')
+
+Proposal = collections.namedtuple('Proposal', ['list_selector', 'text_search', 'movies', 'score'])
+Page = collections.namedtuple('Page', ['theater_name', 'site_url', 'path'])
+Onboarding = collections.namedtuple('Onboarding', ['page', 'config', 'movies', 'proposals', 'error'])
+
+
+def title_like(text):
+    text = text.strip()
+    return (
+        0 < len(text) <= MAX_TITLE_LENGTH and len(text.split()) <= MAX_TITLE_WORDS
+        and any(c.isalnum() for c in text) and text.casefold() not in NAVIGATION and not _NOT_TITLE.match(text)
+    )
+
+
+def _compound(element):
+    element_id = element.get('id')
+    if element_id and _IDENTIFIER.match(element_id):
+        return '{}#{}'.format(element.name, element_id), True
+    for class_name in element.get('class') or ():
+        if _IDENTIFIER.match(class_name) and not _GENERATED.search(class_name):
+            return '{}.{}'.format(element.name, class_name), False
+    return element.name, False
+
+
+def element_selector(element, unique = False):
+    # Child-combinator path up to the nearest ancestor with an id, at most MAX_DEPTH steps.
+    # With unique, steps that share their compound with a sibling get :nth-of-type().
+    parts = []
+    node = element
+    while node is not None and node.name not in (None, '[document]', 'html', 'body') and len(parts) < MAX_DEPTH:
+        compound, anchored = _compound(node)
+        if unique and not anchored and node.parent is not None:
+            siblings = node.parent.find_all(node.name, recursive=False)
+            if len(siblings) > 1:
+                compound += ':nth-of-type({})'.format(siblings.index(node) + 1)
+        parts.append(compound)
+        if anchored:
+            break
+        node = node.parent
+    return ' > '.join(reversed(parts))
+
+
+def score(selector, texts):
+    # texts are the .string of each selected element, None where there isn't one
+    strings = [text.strip() for text in texts if text is not None and text.strip()]
+    if len(strings) < MIN_ITEMS:
+        return 0.0
+    distinct = len(set(strings)) / len(texts)
+    titles = sum(1 for text in strings if title_like(text)) / len(texts)
+    last_compound = selector.split(' > ')[-1]
+    hint = 1.5 if last_compound.split('.')[0].split('#')[0] in HEADINGS or _TITLE_HINT.search(selector) else 1.0
+    return math.log2(len(strings) + 1) * distinct * titles * hint
+
+
+def _text_search_proposal(element):
+    match = _LABELLED_LIST.match(element.string)
+    if match is None:
+        return None
+    movies = [movie.strip() for movie in match.group('items').split(', ')]
+    if len(movies) < MIN_ITEMS or not all(title_like(movie) for movie in movies):
+        return None
+    # Other elements would be joined into the searched text, so select just this one
+    selector = element_selector(element, unique=True)
+    text_search = re.escape(match.group('label')) + r': (.+)$'
+    return Proposal(selector, text_search, movies, score(selector, movies) * 0.9)
+
+
+def discover(markup, limit = DEFAULT_CANDIDATES):
+    # Returns up to limit Proposals, best first
+    soup = parsing.make_soup(markup)
+    groups = collections.OrderedDict()
+    for element in soup.find_all(True):
+        if element.name in ('script', 'style', 'title', 'head', 'option'):
+            continue
+        text = element.string
+        if text is None or not text.strip():
+            continue
+        selector = element_selector(element)
+        if selector:
+            groups.setdefault(selector, []).append(element)
+
+    ranked = sorted(
+        groups.items(), key=lambda item: score(item[0], [element.string for element in item[1]]), reverse=True
+    )
+    proposals = []
+    seen = set()
+    for selector, _ in ranked[:limit * 4]:
+        # The group only holds elements whose own path is the selector, so select for real
+        texts = [element.string for element in parsing.select(soup, selector)]
+        movies = tuple(text.strip() for text in texts if text is not None and text.strip())
+        if movies in seen:
+            # <li><a>Title</a></li> gives the same titles for li and li > a
+            continue
+        seen.add(movies)
+        proposal = Proposal(selector, None, list(movies), score(selector, texts))
+        if proposal.score > 0:
+            proposals.append(proposal)
+    for elements in groups.values():
+        for element in elements:
+            proposal = _text_search_proposal(element)
+            if proposal is not None and (proposal.text_search, tuple(proposal.movies)) not in seen:
+                # <p><span>Now Playing: ...</span></p> gives the same proposal for p and span
+                seen.add((proposal.text_search, tuple(proposal.movies)))
+                proposals.append(proposal)
+    return sorted(proposals, key=lambda proposal: proposal.score, reverse=True)[:limit]
+
+
+def validate(theater_info, path, min_movies = MIN_MOVIES):
+    # Scrapes the saved page at path with theater_info; returns (movies, error message or None)
+    theater_options = dict(theater_info, site_url=path)
+    try:
+        theater = moviescraper.Theater(**theater_options)
+        movies = theater.movies()
+    except Exception as error:
+        # Includes ScrapeError, for a selector or text_search that doesn't fit the page
+        return [], repr(error)
+    if len(movies) < min_movies:
+        return movies, 'found {} movies, expected at least {}'.format(len(movies), min_movies)
+    return movies, None
+
+
+def onboard_page(page, limit = DEFAULT_CANDIDATES, min_movies = MIN_MOVIES):
+    # Proposes selectors for one saved page and keeps the best one that validates
+    try:
+        with open(page.path, encoding='utf-8', errors='replace') as page_file:
+            proposals = discover(page_file.read(), limit)
+    except Exception as error:
+        return Onboarding(page, None, [], [], repr(error))
+    error = 'no candidate selectors found'
+    for proposal in proposals:
+        theater_info = {'theater_name': page.theater_name, 'site_url': page.site_url, 'list_selector': proposal.list_selector}
+        if proposal.text_search is not None:
+            theater_info['text_search'] = proposal.text_search
+        movies, error = validate(theater_info, page.path, min_movies)
+        if error is None:
+            return Onboarding(page, config.validate_theater(theater_info), movies, proposals, None)
+    return Onboarding(page, None, [], proposals, error)
+
+
+def _validate_config(args):
+    theater_info, path, min_movies = args
+    return validate(theater_info, path, min_movies)
+
+
+def validate_configs(configs, paths, processes = DEFAULT_PROCESSES, min_movies = MIN_MOVIES):
+    # Checks existing configs against saved pages in parallel; returns (movies, error) per config
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(_validate_config, [(config.theater_config(theater_info), path, min_movies)
+                                                    for theater_info, path in zip(configs, paths)]))
+
+
+def onboard(pages, processes = DEFAULT_PROCESSES, limit = DEFAULT_CANDIDATES, min_movies = MIN_MOVIES):
+    # Yields an Onboarding per page, in order, with pages handled in parallel worker processes
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(onboard_page, page, limit, min_movies) for page in pages]
+        for future in futures:
+            yield future.result()
+
+
+def save(theater_store, results):
+    # Writes the configs that validated to a TheaterStore; returns how many were written
+    return theater_store.import_config([result.config for result in results if result.config is not None])
+
+
+def page_name(path):
+    # "laurelhurst_theater.html" -> "Laurelhurst Theater"
+    return ' '.join(word.capitalize() for word in re.split(r'[-_\s]+', os.path.splitext(os.path.basename(path))[0]) if word)
+
+
+def read_batch(path):
+    # A JSON list of {"theater_name", "site_url", "page"} objects; page is relative to the batch file
+    with open(path, encoding='utf-8') as batch_file:
+        entries = json.load(batch_file)
+    directory = os.path.dirname(os.path.abspath(path))
+    return [
+        Page(entry['theater_name'], entry['site_url'], os.path.join(directory, entry['page']))
+        for entry in entries
+    ]
+
+
+def main(argv = None):
+    arg_parser = argparse.ArgumentParser(description='Propose and validate configs for saved theater pages')
+    arg_parser.add_argument('store', help='TheaterStore database to add the validated theaters to')
+    arg_parser.add_argument('pages', nargs='*', help='saved pages, named after their theater')
+    arg_parser.add_argument('--url', action='append', default=[],
+                            help="the live site_url of each page, in order; needed unless --dry-run")
+    arg_parser.add_argument('--batch', help='JSON list of {"theater_name", "site_url", "page"} entries')
+    arg_parser.add_argument('--processes', type=int, default=DEFAULT_PROCESSES)
+    arg_parser.add_argument('--min-movies', type=int, default=MIN_MOVIES)
+    arg_parser.add_argument('--dry-run', action='store_true', help="report proposals without saving them")
+    args = arg_parser.parse_args(argv)
+
+    # A saved config has to point at the live site, not at the page it was validated against
+    if args.url and len(args.url) != len(args.pages):
+        arg_parser.error('expected one --url per page, got {} for {} pages'.format(len(args.url), len(args.pages)))
+    if args.pages and not args.url and not args.dry_run:
+        arg_parser.error('pages need a --url each to be saved; use --batch, or --dry-run to only check them')
+    urls = args.url or [os.path.abspath(path) for path in args.pages]
+    pages = [Page(page_name(path), url, os.path.abspath(path)) for path, url in zip(args.pages, urls)]
+    if args.batch:
+        pages.extend(read_batch(args.batch))
+    results = []
+    for result in onboard(pages, args.processes, min_movies=args.min_movies):
+        results.append(result)
+        if result.error is None:
+            print('OK    {}: {} ({} movies, e.g. {})'.format(
+                result.page.theater_name, result.config['list_selector'], len(result.movies), ', '.join(result.movies[:3])))
+        else:
+            print('FAIL  {}: {}'.format(result.page.theater_name, result.error))
+    if not args.dry_run:
+        with store.TheaterStore(args.store) as theater_store:
+            print('Saved {} of {} theaters to {}'.format(save(theater_store, results), len(results), args.store))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/local/bin/python3
+
+import asyncio
+import collections
+import concurrent.futures
+import logging
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Concurrent scraping of many theaters.
+#
+# Theater.movies() blocks on network and parsing, so both the thread-pool and the asyncio
+# variants run it on worker threads. Results are yielded as each theater finishes, and a
+# theater that raises is reported with an empty movie list instead of stopping the run.
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PER_HOST_LIMIT = 2
+
+ScrapeResult = collections.namedtuple('ScrapeResult', ['theater', 'movies', 'error'])
+
+
+def site_host(site_url):
+    # Local file paths have no netloc, so they all share the '' host
+    return urlsplit(site_url).netloc.lower()
+
+
+def theater_host(theater):
+    return site_host(theater.site_url)
+
+
+def scrape_theater(theater):
+    try:
+        return ScrapeResult(theater, theater.movies(), None)
+    except Exception as error:
+        logging.error('Error scraping %s: %r', theater.theater_name, error)
+        return ScrapeResult(theater, [], error)
+
+
+def scrape_threaded(theaters, max_workers = DEFAULT_MAX_WORKERS, per_host_limit = DEFAULT_PER_HOST_LIMIT):
+    # Theaters are only handed to the pool once their host has a free slot, so a busy host
+    # never ties up workers that could be fetching from somewhere else.
+    waiting = collections.OrderedDict()
+    for theater in theaters:
+        waiting.setdefault(theater_host(theater), collections.deque()).append(theater)
+    in_flight = collections.Counter()
+    futures = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_ready():
+            for host, queued in waiting.items():
+                while queued and in_flight[host] < per_host_limit and len(futures) < max_workers:
+                    theater = queued.popleft()
+                    logging.debug('Submitting %s (host "%s")', theater.theater_name, host)
+                    futures[executor.submit(scrape_theater, theater)] = host
+                    in_flight[host] += 1
+
+        submit_ready()
+        while futures:
+            done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                in_flight[futures.pop(future)] -= 1
+                yield future.result()
+            submit_ready()
+
+
+async def scrape_async(theaters, max_workers = DEFAULT_MAX_WORKERS, per_host_limit = DEFAULT_PER_HOST_LIMIT):
+    loop = asyncio.get_running_loop()
+    limit = asyncio.Semaphore(max_workers)
+    host_limits = collections.defaultdict(lambda: asyncio.Semaphore(per_host_limit))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        async def run(theater):
+            # Take the host slot first so we don't hold a global slot while waiting on a host
+            async with host_limits[theater_host(theater)]:
+                async with limit:
+                    return await loop.run_in_executor(executor, scrape_theater, theater)
+
+        tasks = [asyncio.ensure_future(run(theater)) for theater in theaters]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
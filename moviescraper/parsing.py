@@ -0,0 +1,98 @@
+#!/usr/local/bin/python3
+
+import functools
+import logging
+import re
+from bs4 import BeautifulSoup, SoupStrainer
+import soupsieve
+
+logger = logging.getLogger(__name__)
+
+# HTML parser backends for Theater._get_soup().
+#
+#   html.parser  Python's built-in parser, always available (the default).
+#   lxml         libxml2-based parser, much faster on large pages. Needs the lxml package.
+#   strainer     Only builds the subtrees rooted at elements matching the first compound
+#                of the list selector (e.g. "div#sessionsByFilmConent"), using lxml when it
+#                is installed. Selectors that can't be strained fall back to a full parse.
+#   stream       Never builds a tree: Theater feeds the page to a streaming.StreamSelector
+#                as it downloads and stops once the list is complete. Used as a tree
+#                builder (or with a selector streaming can't handle) it means html.parser.
+#
+# Selectors are compiled once with soupsieve and shared by every theater using them.
+
+HTML_PARSER = 'html.parser'
+LXML = 'lxml'
+STRAINER = 'strainer'
+STREAM = 'stream'
+PARSERS = (HTML_PARSER, LXML, STRAINER, STREAM)
+DEFAULT_PARSER = HTML_PARSER
+
+try:
+    import lxml
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Leading "tag#id.class" compound, which must be followed by a combinator or the end
+_FIRST_COMPOUND = re.compile(r'^\s*(?P<tag>[a-zA-Z][\w-]*)?(?P<rest>(?:[#.][\w-]+)*)(?=\s|>|$)')
+
+
+def tree_builder(parser):
+    if parser not in PARSERS:
+        raise ValueError('Unknown parser "{}", expected one of {}'.format(parser, ', '.join(PARSERS)))
+    if parser in (HTML_PARSER, STREAM) or not LXML_AVAILABLE:
+        if parser == LXML:
+            logging.warning('lxml is not installed, falling back to %s', HTML_PARSER)
+        return HTML_PARSER
+    return LXML
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_selector(selector):
+    return soupsieve.compile(selector)
+
+
+def _has_class(class_name):
+    def match(value):
+        if value is None:
+            return False
+        values = value.split() if isinstance(value, str) else value
+        return class_name in values
+    return match
+
+
+@functools.lru_cache(maxsize=1024)
+def selector_strainer(selector):
+    # Returns None when the selector's first compound can't be expressed as a SoupStrainer
+    match = _FIRST_COMPOUND.match(selector)
+    if ',' in selector or match is None or not (match.group('tag') or match.group('rest')):
+        return None
+    # Sibling combinators reach outside the strained subtree, so only descendant and child
+    # combinators can be strained
+    if '+' in selector or '~' in selector:
+        return None
+    attrs = {}
+    for part in re.findall(r'[#.][\w-]+', match.group('rest')):
+        if part.startswith('#'):
+            attrs['id'] = part[1:]
+        elif 'class' in attrs:
+            # SoupStrainer takes one matcher per attribute, so require extra classes after parsing
+            return None
+        else:
+            attrs['class'] = _has_class(part[1:])
+    return SoupStrainer(match.group('tag') or True, attrs=attrs)
+
+
+def make_soup(markup, parser = DEFAULT_PARSER, selector = None):
+    builder = tree_builder(parser)
+    if parser == STRAINER and selector is not None:
+        strainer = selector_strainer(selector)
+        if strainer is not None:
+            return BeautifulSoup(markup, builder, parse_only=strainer)
+        logging.debug('Cannot strain on selector %s, parsing the whole page', selector)
+    return BeautifulSoup(markup, builder)
+
+
+def select(soup, selector):
+    return compile_selector(selector).select(soup)
@@ -0,0 +1,325 @@
+#!/usr/local/bin/python3
+
+import argparse
+import collections
+import concurrent.futures
+import contextlib
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from moviescraper import cache, config, fetch, parallel, parsing, store
+
+logger = logging.getLogger(__name__)
+
+# Headless scheduled scraping of many theaters.
+#
+# A ScrapeQueue is a SQLite work queue with one job per theater. Workers, in a process pool
+# on this host or on other hosts sharing the queue file, lease the next due job, refresh
+# that theater from a TheaterStore, save its movie list and reschedule it. Refreshes use
+# change detection, so an unchanged page isn't parsed again.
+#
+#   - each theater runs every refresh_interval seconds (from its config), plus or minus jitter
+#   - requests to one host are spaced by a per-host delay, with at most per_host_limit in flight
+#   - a failing theater is retried with exponential backoff, while other jobs carry on
+#   - a lease that isn't completed in time (a crashed worker) makes the job available again
+#
+# SQLite needs working file locks, so several hosts should only share a queue on a
+# filesystem that provides them.
+
+SCHEMA_VERSION = 1
+
+MIGRATIONS = {
+    1: '''
+        CREATE TABLE jobs (
+            theater_name TEXT PRIMARY KEY,
+            host TEXT NOT NULL,
+            refresh_interval REAL NOT NULL,
+            next_run REAL NOT NULL,
+            failures INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            leased_by TEXT,
+            lease_expires REAL
+        );
+        CREATE INDEX jobs_next_run ON jobs (next_run);
+        CREATE INDEX jobs_host ON jobs (host, lease_expires);
+        CREATE TABLE hosts (
+            host TEXT PRIMARY KEY,
+            delay REAL,
+            next_request REAL NOT NULL DEFAULT 0
+        );
+    ''',
+}
+
+DEFAULT_REFRESH_INTERVAL = 6 * 60 * 60
+DEFAULT_JITTER = 0.1
+DEFAULT_HOST_DELAY = 5.0
+DEFAULT_LEASE_TIMEOUT = 10 * 60
+DEFAULT_BACKOFF = 60.0
+MAX_BACKOFF = 24 * 60 * 60
+DEFAULT_PROCESSES = 4
+DEFAULT_IDLE_WAIT = 5.0
+
+Job = collections.namedtuple('Job', ['theater_name', 'host', 'refresh_interval', 'failures'])
+
+
+class ScrapeQueue(object):
+    def __init__(self, path, host_delay = DEFAULT_HOST_DELAY, per_host_limit = 1, jitter = DEFAULT_JITTER,
+                 lease_timeout = DEFAULT_LEASE_TIMEOUT, backoff = DEFAULT_BACKOFF, clock = time.time, rng = None):
+        self.path = path
+        self.host_delay = host_delay
+        self.per_host_limit = per_host_limit
+        self.jitter = jitter
+        self.lease_timeout = lease_timeout
+        self.backoff = backoff
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self._lock = threading.RLock()
+        # Transactions are managed explicitly, so claims can take the write lock up front
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._migrate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def schema_version(self):
+        return self.connection.execute('PRAGMA user_version').fetchone()[0]
+
+    def _migrate(self):
+        with self._lock:
+            version = self.schema_version()
+            if version > SCHEMA_VERSION:
+                raise store.StoreError('{} has schema version {}, newer than supported version {}'.format(
+                    self.path, version, SCHEMA_VERSION))
+            for next_version in range(version + 1, SCHEMA_VERSION + 1):
+                logging.info('Migrating %s to schema version %s', self.path, next_version)
+                self.connection.executescript('BEGIN; {} PRAGMA user_version = {}; COMMIT;'.format(
+                    MIGRATIONS[next_version], next_version))
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock at once, so two workers can't claim the same job
+        with self._lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+            self.connection.execute('COMMIT')
+
+    def _jittered(self, seconds):
+        return seconds * (1 + self.rng.uniform(-self.jitter, self.jitter))
+
+    def schedule(self, theaters):
+        # Adds or updates jobs; theaters may be config dicts or Theater instances. New jobs are
+        # spread over the first jitter fraction of their interval instead of all starting at once.
+        now = self.clock()
+        rows = []
+        for theater in theaters:
+            theater_info = config.theater_config(theater)
+            interval = theater_info.get('refresh_interval') or DEFAULT_REFRESH_INTERVAL
+            host = parallel.site_host(theater_info['site_url'])
+            rows.append((theater_info['theater_name'], host, interval, now + self.rng.uniform(0, self.jitter * interval)))
+        with self._transaction():
+            self.connection.executemany(
+                '''INSERT INTO jobs (theater_name, host, refresh_interval, next_run) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (theater_name) DO UPDATE SET
+                   host = excluded.host, refresh_interval = excluded.refresh_interval''',
+                rows
+            )
+        return len(rows)
+
+    def sync(self, theater_store):
+        # Makes the queue hold exactly the theaters in a TheaterStore
+        theaters = theater_store.load_config()
+        self.schedule(theaters)
+        names = set(theater_info['theater_name'] for theater_info in theaters)
+        with self._transaction():
+            stale = [row[0] for row in self.connection.execute('SELECT theater_name FROM jobs') if row[0] not in names]
+            self.connection.executemany('DELETE FROM jobs WHERE theater_name = ?', [(name,) for name in stale])
+        return len(names)
+
+    def set_host_delay(self, host, delay):
+        # Overrides host_delay for one host; None goes back to the default
+        with self._transaction():
+            self.connection.execute(
+                '''INSERT INTO hosts (host, delay) VALUES (?, ?)
+                   ON CONFLICT (host) DO UPDATE SET delay = excluded.delay''',
+                (host.lower(), delay)
+            )
+
+    def claim(self, worker_id):
+        # Leases the most overdue job whose host is free, or returns None
+        now = self.clock()
+        with self._transaction():
+            row = self.connection.execute(
+                '''SELECT j.theater_name, j.host, j.refresh_interval, j.failures, h.delay FROM jobs j
+                   LEFT JOIN hosts h ON h.host = j.host
+                   WHERE j.next_run <= :now AND (j.lease_expires IS NULL OR j.lease_expires <= :now)
+                   AND COALESCE(h.next_request, 0) <= :now
+                   AND (SELECT COUNT(*) FROM jobs a WHERE a.host = j.host AND a.lease_expires > :now) < :limit
+                   ORDER BY j.next_run LIMIT 1''',
+                {'now': now, 'limit': self.per_host_limit}
+            ).fetchone()
+            if row is None:
+                return None
+            delay = self.host_delay if row['delay'] is None else row['delay']
+            self.connection.execute(
+                'UPDATE jobs SET leased_by = ?, lease_expires = ? WHERE theater_name = ?',
+                (worker_id, now + self.lease_timeout, row['theater_name'])
+            )
+            self.connection.execute(
+                '''INSERT INTO hosts (host, next_request) VALUES (?, ?)
+                   ON CONFLICT (host) DO UPDATE SET next_request = excluded.next_request''',
+                (row['host'], now + delay)
+            )
+        logging.debug('%s claimed %s', worker_id, row['theater_name'])
+        return Job(row['theater_name'], row['host'], row['refresh_interval'], row['failures'])
+
+    def complete(self, job, worker_id):
+        next_run = self.clock() + self._jittered(job.refresh_interval)
+        return self._release(job, worker_id, next_run, 0, None)
+
+    def fail(self, job, worker_id, error):
+        failures = job.failures + 1
+        delay = min(self.backoff * 2 ** (failures - 1), MAX_BACKOFF)
+        logging.warning('Scraping %s failed %s time(s), retrying in %.0fs: %r', job.theater_name, failures, delay, error)
+        return self._release(job, worker_id, self.clock() + self._jittered(delay), failures, repr(error))
+
+    def _release(self, job, worker_id, next_run, failures, error):
+        # Returns False if the lease expired and another worker has taken the job since
+        with self._transaction():
+            cursor = self.connection.execute(
+                '''UPDATE jobs SET next_run = ?, failures = ?, last_error = ?, leased_by = NULL, lease_expires = NULL
+                   WHERE theater_name = ? AND leased_by = ?''',
+                (next_run, failures, error, job.theater_name, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def next_due(self):
+        # Earliest next_run of any job, or None for an empty queue
+        return self.connection.execute('SELECT MIN(next_run) FROM jobs').fetchone()[0]
+
+    def next_ready(self):
+        # Earliest time any job could be claimed, allowing for leases and host rate limits
+        return self.connection.execute(
+            '''SELECT MIN(MAX(j.next_run, COALESCE(h.next_request, 0), COALESCE(j.lease_expires, 0)))
+               FROM jobs j LEFT JOIN hosts h ON h.host = j.host'''
+        ).fetchone()[0]
+
+    def jobs(self):
+        return [dict(row) for row in self.connection.execute('SELECT * FROM jobs ORDER BY theater_name')]
+
+
+def default_worker_id():
+    return '{}-{}'.format(socket.gethostname(), os.getpid())
+
+
+class Worker(object):
+    def __init__(self, queue, theater_store, worker_id = None, theater_options = None, sleep = time.sleep):
+        # theater_options are passed to every Theater, e.g. cache, fetcher or parser
+        self.queue = queue
+        self.theater_store = theater_store
+        self.worker_id = worker_id or default_worker_id()
+        self.theater_options = dict(theater_options or {})
+        self.sleep = sleep
+
+    def run_once(self):
+        # Scrapes one due theater; returns its Job, or None if nothing could be claimed
+        job = self.queue.claim(self.worker_id)
+        if job is None:
+            return None
+        try:
+            theater = self.theater_store.load_theater(job.theater_name, **self.theater_options)
+            theater.refresh()
+            self.theater_store.save_movie_lists([theater])
+        except Exception as error:
+            self.queue.fail(job, self.worker_id, error)
+        else:
+            self.queue.complete(job, self.worker_id)
+        return job
+
+    def run(self, max_jobs = None, until = None, exit_when_idle = False, idle_wait = DEFAULT_IDLE_WAIT):
+        # Keeps claiming jobs, sleeping while none are due, and returns the number scraped
+        done = 0
+        while max_jobs is None or done < max_jobs:
+            if until is not None and self.queue.clock() >= until:
+                break
+            if self.run_once() is not None:
+                done += 1
+                continue
+            now = self.queue.clock()
+            if exit_when_idle:
+                # Due jobs held back by a host's rate limit or another worker's lease still
+                # count, so only stop once nothing is due
+                next_due = self.queue.next_due()
+                if next_due is None or next_due > now:
+                    break
+            next_ready = self.queue.next_ready()
+            wait = idle_wait if next_ready is None else max(0.0, min(idle_wait, next_ready - now))
+            # A due job can still be blocked by its host's rate limit, so never spin
+            self.sleep(wait or min(idle_wait, 0.1))
+        return done
+
+
+def _run_worker(queue_path, store_path, queue_options, run_options, cache_directory, parser):
+    # Entry point for each pool process, which opens its own connections
+    theater_options = {'fetcher': fetch.Fetcher()}
+    if cache_directory is not None:
+        theater_options['cache'] = cache.ResponseCache(cache_directory)
+    if parser is not None:
+        theater_options['parser'] = parser
+    with ScrapeQueue(queue_path, **queue_options) as queue, store.TheaterStore(store_path) as theater_store:
+        return Worker(queue, theater_store, theater_options=theater_options).run(**run_options)
+
+
+def run_workers(queue_path, store_path, processes = DEFAULT_PROCESSES, queue_options = None,
+                cache_directory = None, parser = None, **run_options):
+    # Runs Worker.run(**run_options) in each of processes worker processes and returns the
+    # total number of jobs scraped
+    queue_options = dict(queue_options or {})
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(_run_worker, queue_path, store_path, queue_options, run_options, cache_directory, parser)
+            for _ in range(processes)
+        ]
+        return sum(future.result() for future in futures)
+
+
+def main(argv = None):
+    arg_parser = argparse.ArgumentParser(description='Scrape the theaters in a TheaterStore on a schedule')
+    arg_parser.add_argument('store', help='TheaterStore database')
+    arg_parser.add_argument('queue', help='work queue database, shared by every worker')
+    arg_parser.add_argument('--processes', type=int, default=DEFAULT_PROCESSES)
+    arg_parser.add_argument('--host-delay', type=float, default=DEFAULT_HOST_DELAY,
+                            help='seconds between requests to one host')
+    arg_parser.add_argument('--per-host-limit', type=int, default=1, help='requests in flight per host')
+    arg_parser.add_argument('--cache', help='response cache directory')
+    arg_parser.add_argument('--parser', choices=parsing.PARSERS)
+    arg_parser.add_argument('--once', action='store_true', help='exit when no job is due instead of waiting')
+    arg_parser.add_argument('--no-sync', action='store_true',
+                            help="don't add or remove jobs to match the store (for extra worker hosts)")
+    args = arg_parser.parse_args(argv)
+
+    queue_options = {'host_delay': args.host_delay, 'per_host_limit': args.per_host_limit}
+    if not args.no_sync:
+        with ScrapeQueue(args.queue, **queue_options) as queue, store.TheaterStore(args.store) as theater_store:
+            logging.info('Scheduled %s theaters', queue.sync(theater_store))
+    done = run_workers(args.queue, args.store, args.processes, queue_options, args.cache, args.parser,
+                       exit_when_idle=args.once)
+    logging.info('Scraped %s theaters', done)
+
+
+if __name__ == '__main__':
+    main()
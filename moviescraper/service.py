@@ -0,0 +1,335 @@
+#!/usr/local/bin/python3
+
+import argparse
+import asyncio
+import bisect
+import collections
+import concurrent.futures
+import datetime
+import json
+import logging
+import math
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+from moviescraper import aggregate, matching, notify, store, titles
+
+logger = logging.getLogger(__name__)
+
+# Read-only HTTP query service over scraped results.
+#
+# Requests are answered from a QueryIndex, which is built once per scrape and never changed
+# afterwards. A reload builds the next index on a worker thread and then swaps the reference,
+# so a request sees either the old index or the new one, never a mix, and no request ever
+# waits on a scrape or a database. With a StoreLoader, the service polls the stores and
+# reloads whenever another process (e.g. a scheduler worker) commits new results.
+#
+#   GET /movies                 every title and the theaters showing it
+#   GET /movies?title=X         where X is playing, by canonical title, else by substring
+#   GET /new?since=T            showings first seen after T (Unix time or ISO 8601)
+#   GET /users/U/matches        titles matching user U's watchlist
+#   GET /status                 index version and sizes
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+DEFAULT_RELOAD_INTERVAL = 5.0
+KEEPALIVE_TIMEOUT = 15.0
+MAX_HEADERS = 100
+
+Showing = collections.namedtuple('Showing', ['first_seen', 'title', 'theater'])
+
+
+class QueryError(Exception):
+    def __init__(self, status, message):
+        super(QueryError, self).__init__(message)
+        self.status = status
+
+
+class QueryIndex(object):
+    def __init__(self, theater_movies = None, user_filters = None, scraped_at = None, previous = None,
+                 built_at = None, fuzzy = True, first_seen = None):
+        # theater_movies maps theater -> titles, user_filters user -> filter strings and
+        # scraped_at theater -> scrape time. first_seen maps (title, theater) -> a recorded
+        # first_seen, e.g. TheaterStore.first_seen(); other showings already in previous keep
+        # theirs, and the rest are first seen at their theater's scrape time.
+        theater_movies = theater_movies or {}
+        scraped_at = scraped_at or {}
+        self.built_at = time.time() if built_at is None else built_at
+        self.version = previous.version + 1 if previous is not None else 1
+        self.theater_count = len(theater_movies)
+
+        movie_index = aggregate.MovieIndex(fuzzy)
+        for theater_name in sorted(theater_movies):
+            movie_index.add(theater_name, theater_movies[theater_name])
+        self._movie_index = movie_index
+        self.movies = movie_index.movies()
+        # (canonical key, title) pairs for substring lookups
+        self._keys = sorted((titles.canonical_key(title), title) for title in self.movies)
+
+        previous_seen = previous._first_seen if previous is not None else {}
+        first_seen = first_seen or {}
+        self._first_seen = {}
+        for theater_name, movies in theater_movies.items():
+            seen_at = scraped_at.get(theater_name, self.built_at)
+            for title in movies:
+                key = (title, theater_name)
+                self._first_seen[key] = first_seen.get(key, previous_seen.get(key, seen_at))
+        self._showings = sorted(
+            Showing(first_seen, title, theater) for (title, theater), first_seen in self._first_seen.items()
+        )
+        self._showing_times = [showing.first_seen for showing in self._showings]
+
+        self.user_matches = dict((user, []) for user in (user_filters or {}))
+        if user_filters:
+            matcher = matching.MovieMatcher(user_filters, ignore_case=True, ignore_accents=True)
+            for match in matcher.match(self.movies):
+                self.user_matches[match.user].append({'title': match.title, 'theaters': match.theaters})
+        # Encoded bodies of the responses that don't depend on free-form input
+        self._responses = {}
+
+    def where(self, title):
+        movie = self._movie_index.title(title)
+        if movie is not None:
+            return [{'title': movie, 'theaters': self.movies[movie]}]
+        key = titles.canonical_key(title)
+        if not key:
+            return []
+        return [{'title': movie, 'theaters': self.movies[movie]} for movie_key, movie in self._keys if key in movie_key]
+
+    def new_since(self, since):
+        start = bisect.bisect_right(self._showing_times, since)
+        return [showing._asdict() for showing in reversed(self._showings[start:])]
+
+    def matches(self, user):
+        if user not in self.user_matches:
+            raise QueryError(404, 'Unknown user {}'.format(user))
+        return self.user_matches[user]
+
+    def status(self):
+        return {
+            'version': self.version, 'built_at': self.built_at, 'movies': len(self.movies),
+            'theaters': self.theater_count, 'users': len(self.user_matches)
+        }
+
+    def respond(self, path, query = None):
+        # Returns (status, encoded JSON body) for a GET of path with parsed query parameters
+        query = query or {}
+        try:
+            if path == '/movies' and 'title' in query:
+                matches = self.where(query['title'])
+                return 200, _encode({'version': self.version, 'title': query['title'], 'matches': matches})
+            if path == '/new':
+                if 'since' not in query:
+                    raise QueryError(400, 'Missing since parameter')
+                since = parse_time(query['since'])
+                return 200, _encode({'version': self.version, 'since': since, 'showings': self.new_since(since)})
+            if path == '/status':
+                return 200, _encode(self.status())
+            if path == '/movies':
+                return 200, self._cached(path, lambda: {'version': self.version, 'movies': self.movies})
+            parts = path.split('/')
+            if len(parts) == 4 and parts[1] == 'users' and parts[3] == 'matches':
+                user = unquote(parts[2])
+                matches = self.matches(user)
+                return 200, self._cached(path, lambda: {'version': self.version, 'user': user, 'matches': matches})
+            raise QueryError(404, 'No such resource {}'.format(path))
+        except QueryError as error:
+            return error.status, _encode({'error': str(error)})
+
+    def _cached(self, key, build):
+        body = self._responses.get(key)
+        if body is None:
+            body = self._responses[key] = _encode(build())
+        return body
+
+
+def _encode(data):
+    return json.dumps(data, sort_keys=True).encode('utf-8')
+
+
+def parse_time(value):
+    try:
+        since = float(value)
+    except ValueError:
+        pass
+    else:
+        if not math.isfinite(since):
+            raise QueryError(400, 'Cannot parse time {}'.format(value))
+        return since
+    try:
+        moment = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise QueryError(400, 'Cannot parse time {}'.format(value))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.timestamp()
+
+
+class StoreLoader(object):
+    # Reads the latest results from a TheaterStore and, optionally, users from a WatchlistStore.
+    # Opens its own connections, so commits from other connections show up in data_version.
+    def __init__(self, theater_store_path, watchlist_path = None, fuzzy = True):
+        self.theater_store = store.TheaterStore(theater_store_path)
+        self.watchlist_store = notify.WatchlistStore(watchlist_path) if watchlist_path else None
+        self.fuzzy = fuzzy
+
+    def data_version(self):
+        versions = [self.theater_store.data_version()]
+        if self.watchlist_store is not None:
+            versions.append(self.watchlist_store.data_version())
+        return tuple(versions)
+
+    def load(self, previous = None):
+        user_filters = self.watchlist_store.user_filters() if self.watchlist_store is not None else None
+        return QueryIndex(
+            self.theater_store.movie_lists(), user_filters, self.theater_store.scraped_at(), previous, fuzzy=self.fuzzy,
+            first_seen=self.theater_store.first_seen()
+        )
+
+    def close(self):
+        self.theater_store.close()
+        if self.watchlist_store is not None:
+            self.watchlist_store.close()
+
+
+class QueryService(object):
+    def __init__(self, loader = None, host = DEFAULT_HOST, port = DEFAULT_PORT,
+                 reload_interval = DEFAULT_RELOAD_INTERVAL):
+        self.loader = loader
+        self.host = host
+        self.port = port
+        self.reload_interval = reload_interval
+        self.index = QueryIndex()
+        self.server = None
+        self._watcher = None
+        self._loaded_version = None
+        # One thread, so reloads never overlap
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def publish(self, theater_movies, user_filters = None, scraped_at = None):
+        # Swaps in an index built from in-process results, e.g. after TheaterList.refresh()
+        self.index = QueryIndex(theater_movies, user_filters, scraped_at, self.index)
+        return self.index
+
+    async def reload(self):
+        loop = asyncio.get_running_loop()
+        data_version = await loop.run_in_executor(self._executor, self.loader.data_version)
+        index = await loop.run_in_executor(self._executor, self.loader.load, self.index)
+        self.index = index
+        self._loaded_version = data_version
+        logging.info('Loaded query index version %s with %s movies', index.version, len(index.movies))
+        return index
+
+    async def _watch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                if await loop.run_in_executor(self._executor, self.loader.data_version) != self._loaded_version:
+                    await self.reload()
+            except Exception as error:
+                # Keep serving the last good index
+                logging.error('Reloading query index failed: %r', error)
+
+    async def start(self):
+        if self.loader is not None:
+            await self.reload()
+            if self.reload_interval:
+                self._watcher = asyncio.ensure_future(self._watch())
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logging.info('Serving queries on %s:%s', self.host, self.port)
+        return self
+
+    async def close(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self._executor.shutdown(wait=False)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def _read_request(self, reader):
+        request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+        if not request_line:
+            return None
+        headers = {}
+        for _ in range(MAX_HEADERS):
+            line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        parts = request_line.decode('latin-1').split()
+        if len(parts) != 3:
+            raise ValueError('Malformed request line')
+        return parts[0], parts[1], parts[2], headers
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except (asyncio.TimeoutError, ConnectionError):
+                    break
+                except ValueError:
+                    await self._write(writer, 400, _encode({'error': 'Bad request'}), False, False)
+                    break
+                if request is None:
+                    break
+                method, target, version, headers = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+                if method not in ('GET', 'HEAD'):
+                    status, body = 405, _encode({'error': 'Only GET and HEAD are supported'})
+                else:
+                    url = urlsplit(target)
+                    query = dict((name, values[-1]) for name, values in parse_qs(url.query).items())
+                    # Take the reference once, so the whole response comes from one index
+                    status, body = self.index.respond(url.path.rstrip('/') or '/', query)
+                await self._write(writer, status, body, keep_alive, method == 'HEAD')
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _write(self, writer, status, body, keep_alive, head_only):
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}.get(status, '')
+        writer.write((
+            'HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n'
+            'Connection: {}\r\n\r\n'.format(status, reason, len(body), 'keep-alive' if keep_alive else 'close')
+        ).encode('latin-1'))
+        if not head_only:
+            writer.write(body)
+        await writer.drain()
+
+
+def main(argv = None):
+    arg_parser = argparse.ArgumentParser(description='Serve queries over scraped movie lists')
+    arg_parser.add_argument('store', help='TheaterStore database')
+    arg_parser.add_argument('--watchlists', help='WatchlistStore database, for user matches')
+    arg_parser.add_argument('--host', default=DEFAULT_HOST)
+    arg_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    arg_parser.add_argument('--reload-interval', type=float, default=DEFAULT_RELOAD_INTERVAL,
+                            help='seconds between checks for new results')
+    args = arg_parser.parse_args(argv)
+
+    loader = StoreLoader(args.store, args.watchlists)
+    try:
+        asyncio.run(QueryService(loader, args.host, args.port, args.reload_interval).serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loader.close()
+
+
+if __name__ == '__main__':
+    main()
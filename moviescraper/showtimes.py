@@ -0,0 +1,105 @@
+#!/usr/local/bin/python3
+
+import bisect
+import collections
+import logging
+import re
+from moviescraper import parsing, titles
+
+logger = logging.getLogger(__name__)
+
+# Showtimes and dates for the titles a theater's list_selector finds.
+#
+# Listing pages put each film's times next to its title rather than inside it, so the
+# optional showtime_selector and date_selector are applied within the title's block: the
+# largest ancestor of the title element, below <body>, that holds no other title. Where the
+# block has no date, the nearest date_selector match before the title in the page is used,
+# for listings that give a date above a run of films. Where it has no times, as in flat
+# listings that put titles and times side by side in one container, the showtime_selector
+# matches after the title and before the next one, within the title's parent, are used.
+
+ROOTS = frozenset(['[document]', 'html', 'body'])
+
+Screening = collections.namedtuple('Screening', ['title', 'date', 'times'])
+
+
+def _text(element):
+    text = element.get_text(' ')
+    return ' '.join(text.split()) or None
+
+
+def _blocks(elements):
+    # Maps each element to its block, climbing while an ancestor holds only that element
+    holding = collections.Counter()
+    for element in elements:
+        for ancestor in element.parents:
+            holding[id(ancestor)] += 1
+    blocks = {}
+    for element in elements:
+        block = element
+        for ancestor in element.parents:
+            if holding[id(ancestor)] > 1 or ancestor.name in ROOTS:
+                break
+            block = ancestor
+        blocks[id(element)] = block
+    return blocks
+
+
+def _preceding(positions, matches, position):
+    # The last of matches, given in document order with their positions, before position
+    index = bisect.bisect_left(positions, position)
+    return matches[index - 1] if index else None
+
+
+def extract(soup, list_selector, text_search = None, showtime_selector = None, date_selector = None):
+    # Returns Screenings sorted by title and date, one per title and date
+    elements = parsing.select(soup, list_selector)
+    blocks = _blocks(elements)
+    # Document order of every tag, for the fallbacks outside a title's block
+    order = dict((id(tag), position) for position, tag in enumerate(soup.find_all(True)))
+    page_dates = parsing.select(soup, date_selector) if date_selector else []
+    date_positions = [order[id(date)] for date in page_dates]
+    page_times = parsing.select(soup, showtime_selector) if showtime_selector else []
+    time_positions = [order[id(time)] for time in page_times]
+
+    screenings = collections.OrderedDict()
+    for index, element in enumerate(elements):
+        if element.string is None:
+            continue
+        if text_search is not None:
+            match = re.search(text_search, element.string)
+            if match is None:
+                continue
+            movies = match.group(1).split(', ')
+        else:
+            movies = [element.string]
+        block = blocks[id(element)]
+        position = order[id(element)]
+        date = None
+        if date_selector:
+            dates = parsing.select(block, date_selector)
+            date_element = dates[0] if dates else _preceding(date_positions, page_dates, position)
+            if date_element is not None:
+                date = _text(date_element)
+        times = []
+        if showtime_selector:
+            time_elements = parsing.select(block, showtime_selector)
+            if not time_elements:
+                end = order[id(elements[index + 1])] if index + 1 < len(elements) else len(order)
+                time_elements = [
+                    time for time in page_times[bisect.bisect_right(time_positions, position):
+                                                bisect.bisect_left(time_positions, end)]
+                    if any(parent is element.parent for parent in time.parents)
+                ]
+            times = [text for text in (_text(time) for time in time_elements) if text]
+        for movie in movies:
+            title = titles.strip_title(movie)
+            if not title:
+                continue
+            showing = screenings.setdefault((title, date), [])
+            showing.extend(time for time in times if time not in showing)
+    logging.debug('Extracted screenings %s', screenings)
+    return sorted(
+        (Screening(title, date, tuple(times)) for (title, date), times in screenings.items()),
+        key=lambda screening: (screening.title, screening.date or '')
+    )
@@ -0,0 +1,223 @@
+#!/usr/local/bin/python3
+
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from moviescraper import config, moviescraper
+
+logger = logging.getLogger(__name__)
+
+# SQLite store for theater configs and their last-scraped movie lists.
+#
+# Configs are kept as JSON keyed by theater name, so new optional fields don't need a
+# schema change. Scrape state lives in its own table and is only read for the theaters
+# being loaded. A theater with no scrape_state row has never been scraped; one with an
+# empty movie list is known to have no movies. The content hash saved with each list lets
+# Theater.movies() skip parsing a page that hasn't changed. The showings table keeps when
+# each title on a theater's current list was first saved, so services started later still
+# know which showings are new. The schema version is kept in
+# PRAGMA user_version, and opening an older database applies the missing migrations in order.
+
+SCHEMA_VERSION = 3
+
+MIGRATIONS = {
+    1: '''
+        CREATE TABLE theaters (
+            theater_name TEXT PRIMARY KEY,
+            site_url TEXT NOT NULL,
+            config TEXT NOT NULL
+        );
+        CREATE INDEX theaters_site_url ON theaters (site_url);
+        CREATE TABLE scrape_state (
+            theater_name TEXT PRIMARY KEY REFERENCES theaters (theater_name) ON DELETE CASCADE,
+            movie_list TEXT NOT NULL,
+            scraped_at REAL NOT NULL
+        );
+        CREATE INDEX scrape_state_scraped_at ON scrape_state (scraped_at);
+    ''',
+    2: '''
+        ALTER TABLE scrape_state ADD COLUMN content_hash TEXT;
+    ''',
+    3: '''
+        CREATE TABLE showings (
+            theater_name TEXT NOT NULL REFERENCES theaters (theater_name) ON DELETE CASCADE,
+            title TEXT NOT NULL,
+            first_seen REAL NOT NULL,
+            PRIMARY KEY (theater_name, title)
+        );
+        INSERT OR IGNORE INTO showings (theater_name, title, first_seen)
+            SELECT s.theater_name, j.value, s.scraped_at FROM scrape_state s, json_each(s.movie_list) j;
+    ''',
+}
+
+
+class StoreError(Exception):
+    pass
+
+
+class TheaterStore(object):
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self._migrate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def schema_version(self):
+        return self.connection.execute('PRAGMA user_version').fetchone()[0]
+
+    def _migrate(self):
+        with self._lock:
+            version = self.schema_version()
+            if version > SCHEMA_VERSION:
+                raise StoreError('{} has schema version {}, newer than supported version {}'.format(
+                    self.path, version, SCHEMA_VERSION))
+            for next_version in range(version + 1, SCHEMA_VERSION + 1):
+                logging.info('Migrating %s to schema version %s', self.path, next_version)
+                # executescript() commits first, so each migration and its version bump go together
+                self.connection.executescript('BEGIN; {} PRAGMA user_version = {}; COMMIT;'.format(
+                    MIGRATIONS[next_version], next_version))
+
+    def import_config(self, theaters):
+        # Bulk insert or update; theaters may be config dicts or Theater instances
+        rows = []
+        for theater in theaters:
+            theater_info = config.validate_theater(config.theater_config(theater))
+            rows.append((theater_info['theater_name'], theater_info['site_url'], json.dumps(theater_info)))
+        with self._lock, self.connection:
+            self.connection.executemany(
+                '''INSERT INTO theaters (theater_name, site_url, config) VALUES (?, ?, ?)
+                   ON CONFLICT (theater_name) DO UPDATE SET site_url = excluded.site_url, config = excluded.config''',
+                rows
+            )
+        return len(rows)
+
+    def import_config_file(self, path):
+        return self.import_config(config.load_config(path))
+
+    def export_config_file(self, path, theater_names = None):
+        config.save_config(path, self.load_config(theater_names))
+
+    def remove_theater(self, theater_name):
+        with self._lock, self.connection:
+            self.connection.execute('DELETE FROM theaters WHERE theater_name = ?', (theater_name,))
+
+    def theater_names(self):
+        with self._lock:
+            return [row[0] for row in self.connection.execute('SELECT theater_name FROM theaters ORDER BY theater_name')]
+
+    def _select(self, query, theater_names):
+        with self._lock:
+            if theater_names is None:
+                return self.connection.execute(query + ' ORDER BY t.theater_name').fetchall()
+            rows = []
+            theater_names = list(theater_names)
+            # Stay well under SQLite's bound parameter limit
+            for start in range(0, len(theater_names), 500):
+                chunk = theater_names[start:start + 500]
+                rows.extend(self.connection.execute(
+                    '{} WHERE t.theater_name IN ({})'.format(query, ', '.join('?' * len(chunk))), chunk
+                ))
+            order = dict((name, index) for index, name in enumerate(theater_names))
+            return sorted(rows, key=lambda row: order[row['theater_name']])
+
+    def load_config(self, theater_names = None):
+        return [json.loads(row['config']) for row in self._select('SELECT t.theater_name, t.config FROM theaters t', theater_names)]
+
+    def load_theaters(self, theater_names = None, **options):
+        # options are passed to every Theater, e.g. cache, fetcher or parser
+        rows = self._select(
+            '''SELECT t.theater_name, t.config, s.movie_list, s.content_hash FROM theaters t
+               LEFT JOIN scrape_state s ON s.theater_name = t.theater_name''',
+            theater_names
+        )
+        theaters = []
+        for row in rows:
+            theater_options = dict(options)
+            theater_options.update(json.loads(row['config']))
+            theater = moviescraper.Theater(**theater_options)
+            if row['movie_list'] is not None:
+                theater.movie_list = [sys.intern(movie) for movie in json.loads(row['movie_list'])]
+                theater.content_hash = row['content_hash']
+            theaters.append(theater)
+        return theaters
+
+    def load_theater(self, theater_name, **options):
+        theaters = self.load_theaters([theater_name], **options)
+        if not theaters:
+            raise KeyError(theater_name)
+        return theaters[0]
+
+    def theater_list(self, theater_names = None, cache = None, fetcher = None, parser = None, metrics = None):
+        theater_list = moviescraper.TheaterList(cache=cache, fetcher=fetcher, parser=parser, metrics=metrics)
+        for theater in self.load_theaters(theater_names):
+            theater_list.add_theater(theater)
+        return theater_list
+
+    def save_movie_lists(self, theaters, scraped_at = None):
+        # Theaters that haven't been scraped are skipped, keeping any state already saved for them
+        scraped_at = time.time() if scraped_at is None else scraped_at
+        rows = [
+            (theater.theater_name, json.dumps(list(theater.movie_list)), theater.content_hash, scraped_at)
+            for theater in theaters if theater.movie_list is not None
+        ]
+        with self._lock, self.connection:
+            self.connection.executemany(
+                '''INSERT INTO scrape_state (theater_name, movie_list, content_hash, scraped_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (theater_name) DO UPDATE SET movie_list = excluded.movie_list,
+                   content_hash = excluded.content_hash, scraped_at = excluded.scraped_at''',
+                rows
+            )
+            for theater_name, movie_list, _, _ in rows:
+                # A title that drops off a list and comes back later is a new showing
+                movies = json.loads(movie_list)
+                self.connection.execute(
+                    'DELETE FROM showings WHERE theater_name = ? AND title NOT IN (SELECT value FROM json_each(?))',
+                    (theater_name, movie_list)
+                )
+                self.connection.executemany(
+                    'INSERT OR IGNORE INTO showings (theater_name, title, first_seen) VALUES (?, ?, ?)',
+                    [(theater_name, movie, scraped_at) for movie in movies]
+                )
+
+    def movie_lists(self, theater_names = None):
+        rows = self._select(
+            '''SELECT t.theater_name, s.movie_list FROM theaters t
+               JOIN scrape_state s ON s.theater_name = t.theater_name''',
+            theater_names
+        )
+        return dict((row['theater_name'], json.loads(row['movie_list'])) for row in rows)
+
+    def scraped_at(self, theater_names = None):
+        rows = self._select(
+            '''SELECT t.theater_name, s.scraped_at FROM theaters t
+               JOIN scrape_state s ON s.theater_name = t.theater_name''',
+            theater_names
+        )
+        return dict((row['theater_name'], row['scraped_at']) for row in rows)
+
+    def first_seen(self, theater_names = None):
+        # (title, theater) -> when the title was first saved in the theater's current run of lists
+        rows = self._select(
+            'SELECT t.theater_name, s.title, s.first_seen FROM theaters t JOIN showings s ON s.theater_name = t.theater_name',
+            theater_names
+        )
+        return dict(((row['title'], row['theater_name']), row['first_seen']) for row in rows)
+
+    def data_version(self):
+        # Changes whenever another connection commits, so readers can poll for new results cheaply
+        with self._lock:
+            return self.connection.execute('PRAGMA data_version').fetchone()[0]
@@ -0,0 +1,216 @@
+#!/usr/local/bin/python3
+
+import functools
+from html.parser import HTMLParser
+import re
+
+# Incremental list selection for very large listing pages.
+#
+# StreamSelector is fed the page a chunk at a time and never builds a document tree. It
+# tracks only the stack of open elements, plus the contents of an element while that
+# element matches the list selector. Each matched element's text is returned as soon as
+# the element closes. If the selector starts with an id (e.g. "div#sessionsByFilmConent > ..."),
+# the page can hold only one container, so the selector is done once that element closes and
+# the rest of the page doesn't need to be downloaded.
+#
+# Only the selectors theater configs use are supported: compounds of tag, #id, .class and *
+# joined by descendant or child combinators. Anything else raises ValueError.
+
+DEFAULT_CHUNK_SIZE = 16 * 1024
+
+# Elements that never have children or an end tag
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+    'source', 'track', 'wbr'
+])
+
+_COMPOUND = re.compile(r'(?P<tag>\*|[a-zA-Z][\w-]*)?(?P<rest>(?:[#.][\w-]+)*)$')
+_COMBINATOR = re.compile(r'\s*(>)\s*|\s+')
+
+
+class Compound(object):
+    __slots__ = ('tag', 'id', 'classes')
+
+    def __init__(self, tag, element_id, classes):
+        self.tag = tag
+        self.id = element_id
+        self.classes = classes
+
+    def matches(self, element):
+        tag, element_id, classes = element
+        return ((self.tag is None or self.tag == tag) and (self.id is None or self.id == element_id)
+                and self.classes <= classes)
+
+
+def _compound(text, selector):
+    match = _COMPOUND.match(text)
+    if not text or match is None or not (match.group('tag') or match.group('rest')):
+        raise ValueError('Selector "{}" is not supported for streaming'.format(selector))
+    tag = match.group('tag')
+    element_id = None
+    classes = set()
+    for part in re.findall(r'[#.][\w-]+', match.group('rest')):
+        if part.startswith('#'):
+            element_id = part[1:]
+        else:
+            classes.add(part[1:])
+    return Compound(None if tag in (None, '*') else tag.lower(), element_id, frozenset(classes))
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_selector(selector):
+    # Returns ((combinator, Compound), ...) from left to right; the first combinator is None
+    parts = _COMBINATOR.split(selector.strip())
+    # split() alternates compounds with the captured combinator (None for whitespace)
+    steps = [(None, _compound(parts[0], selector))]
+    for index in range(1, len(parts), 2):
+        steps.append((parts[index] or ' ', _compound(parts[index + 1], selector)))
+    return tuple(steps)
+
+
+def supports(selector):
+    try:
+        parse_selector(selector)
+    except ValueError:
+        return False
+    return True
+
+
+def _matches(steps, ancestors, element):
+    # Right-to-left match of steps against element, with ancestors ordered from the root
+    combinator, compound = steps[-1]
+    if not compound.matches(element):
+        return False
+    if len(steps) == 1:
+        return True
+    if combinator == '>':
+        return bool(ancestors) and _matches(steps[:-1], ancestors[:-1], ancestors[-1])
+    for index in range(len(ancestors) - 1, -1, -1):
+        if _matches(steps[:-1], ancestors[:index], ancestors[index]):
+            return True
+    return False
+
+
+def _string(children):
+    # Same rule as BeautifulSoup's Tag.string: the text of an element with a single child
+    # string, directly or through a chain of only children; otherwise None
+    while len(children) == 1:
+        if isinstance(children[0], str):
+            return children[0]
+        children = children[0]
+    return None
+
+
+class StreamSelector(HTMLParser):
+    def __init__(self, selector):
+        super(StreamSelector, self).__init__(convert_charrefs=True)
+        self.steps = parse_selector(selector)
+        # An id is unique, so the first compound's element is the only possible container
+        self.single_container = self.steps[0][1].id is not None
+        self.done = False
+        self._open = []
+        # One children list per open element that is inside (or is) a match, innermost last
+        self._captures = []
+        self._container_depth = None
+        self._results = []
+
+    def feed(self, data):
+        # Returns the strings of the matched elements that closed while reading data
+        if not self.done:
+            super(StreamSelector, self).feed(data)
+        return self._take_results()
+
+    def close(self):
+        if not self.done:
+            super(StreamSelector, self).close()
+            while self._open:
+                self._pop()
+            self.done = True
+        return self._take_results()
+
+    def _take_results(self):
+        results, self._results = self._results, []
+        return results
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        attrs = dict(attrs)
+        element = (tag, attrs.get('id'), frozenset((attrs.get('class') or '').split()))
+        if self._container_depth is None and self.single_container and self.steps[0][1].matches(element):
+            self._container_depth = len(self._open)
+        matched = _matches(self.steps, [entry[0] for entry in self._open], element)
+        if self._captures or matched:
+            children = []
+            if self._captures:
+                self._captures[-1].append(children)
+            self._captures.append(children)
+            captured = True
+        else:
+            captured = False
+        if tag in VOID_ELEMENTS:
+            self._close_capture(captured, matched)
+        else:
+            self._open.append((element, captured, matched))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS and self._open and self._open[-1][0][0] == tag:
+            self._pop()
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        # Like html.parser's tree builder, an end tag closes the nearest open element with
+        # that name and anything left open inside it; a stray end tag is ignored
+        for index in range(len(self._open) - 1, -1, -1):
+            if self._open[index][0][0] == tag:
+                while len(self._open) > index and not self.done:
+                    self._pop()
+                return
+
+    def handle_data(self, data):
+        if self._captures and not self.done:
+            children = self._captures[-1]
+            if children and isinstance(children[-1], str):
+                children[-1] += data
+            else:
+                children.append(data)
+
+    def _pop(self):
+        element, captured, matched = self._open.pop()
+        self._close_capture(captured, matched)
+        if self._container_depth is not None and len(self._open) == self._container_depth:
+            self.done = True
+
+    def _close_capture(self, captured, matched):
+        if captured:
+            children = self._captures.pop()
+            if matched:
+                self._results.append(_string(children))
+
+
+def select_strings(chunks, selector):
+    # Yields the string of each element matching selector, reading chunks only as far as needed
+    stream = StreamSelector(selector)
+    chunks = iter(chunks)
+    try:
+        for chunk in chunks:
+            for string in stream.feed(chunk):
+                yield string
+            if stream.done:
+                return
+        for string in stream.close():
+            yield string
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def read_chunks(file_object, chunk_size = DEFAULT_CHUNK_SIZE):
+    return iter(functools.partial(file_object.read, chunk_size), '')
+
+
+def text_chunks(text, chunk_size = DEFAULT_CHUNK_SIZE):
+    return (text[start:start + chunk_size] for start in range(0, len(text), chunk_size))
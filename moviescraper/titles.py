@@ -0,0 +1,51 @@
+#!/usr/local/bin/python3
+
+import functools
+import re
+import unicodedata
+
+# Movie title normalization shared by every theater.
+#
+# strip_title() cleans a scraped title for display: it drops leading and trailing
+# punctuation and anything after " //", and turns curly apostrophes into straight ones.
+# canonical_key() also folds case, accents, punctuation and a parenthesized year, so the
+# same film listed slightly differently by two theaters gets the same key.
+#
+# Both are memoized in bounded caches. Theaters mostly show the same films, so most
+# titles are only normalized once per process.
+
+CACHE_SIZE = 8192
+
+# One pattern and one pass per title. Alternatives are tried left to right at each
+# position, which gives the same result as applying them one after another.
+_STRIP = re.compile(r'^\W+| //.*|\W+$|(?P<apostrophe>’)')
+# The closing bracket is optional because strip_title() drops it from the end of a title
+_YEAR = re.compile(r'[(\[]\s*(?:18|19|20)\d\d\s*[)\]]?')
+_APOSTROPHES = re.compile(r"['’]")
+_PUNCTUATION = re.compile(r'[\W_]+')
+
+
+def _strip_replacement(match):
+    return "'" if match.lastgroup == 'apostrophe' else ''
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def strip_title(title):
+    return _STRIP.sub(_strip_replacement, title)
+
+
+def strip_accents(text):
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def canonical_key(title):
+    text = strip_accents(strip_title(title)).casefold()
+    text = _YEAR.sub(' ', text)
+    text = _APOSTROPHES.sub('', text)
+    return ' '.join(_PUNCTUATION.sub(' ', text).split())
+
+
+def clear_caches():
+    strip_title.cache_clear()
+    canonical_key.cache_clear()
@@ -0,0 +1,115 @@
+#!/usr/local/bin/python3
+
+import unittest
+import logging
+from moviescraper import moviescraper
+from moviescraper import aggregate, parallel
+import os
+import random
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_SITE = os.path.join(os.path.dirname(__file__), 'sample_site.html')
+
+
+class TestMovieIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = aggregate.MovieIndex()
+        self.index.add('Laurelhurst', ['Spider-Man: Far From Home', 'Toy Story 4'])
+        self.index.add('Academy Theater', ['Spider-man - Far from Home', 'Toy Story 3'])
+        self.index.add('Lake Theater', ['Spider-Man: Far From Home', 'Spiderman: Far From Hone'])
+
+    def test_canonical_merge(self):
+        self.assertEqual(
+            self.index.theaters('SPIDER-MAN: FAR FROM HOME'),
+            ['Academy Theater', 'Lake Theater', 'Laurelhurst']
+        )
+        self.assertEqual(self.index.movies()['Spider-Man: Far From Home'], ['Academy Theater', 'Lake Theater', 'Laurelhurst'])
+
+    def test_fuzzy_merge(self):
+        self.assertIn('Spiderman: Far From Hone', self.index)
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.title('Spiderman: Far From Hone'), 'Spider-Man: Far From Home')
+        self.assertIsNone(self.index.title('Jaws'))
+
+    def test_sequels_kept_apart(self):
+        self.assertEqual(self.index.theaters('Toy Story 4'), ['Laurelhurst'])
+        self.assertEqual(self.index.theaters('Toy Story 3'), ['Academy Theater'])
+
+    def test_typos_only(self):
+        index = aggregate.MovieIndex()
+        index.add('Laurelhurst', ['Spider-Man: Far From Home', 'Spider-Man: Far From Rome', 'Spiderman: Far From Hmoe',
+                                  'Spider-Man: Far Fro Home', 'Parasite', 'Parasites'])
+        self.assertEqual(sorted(index.movies()), ['Parasite', 'Spider-Man: Far From Home', 'Spider-Man: Far From Rome'])
+
+    def test_no_fuzzy(self):
+        index = aggregate.MovieIndex(fuzzy=False)
+        index.add('Lake Theater', ['Spider-Man: Far From Home', 'Spiderman: Far From Hone'])
+        self.assertEqual(len(index), 2)
+
+    def test_short_titles_not_fuzzy_merged(self):
+        index = aggregate.MovieIndex()
+        index.add('Laurelhurst', ['Us', 'Up'])
+        self.assertEqual(len(index), 2)
+
+    def test_serialization(self):
+        restored = aggregate.MovieIndex.from_json(self.index.to_json())
+        self.assertEqual(restored.movies(), self.index.movies())
+        self.assertEqual(restored.theaters('Spiderman: Far From Hone'), self.index.theaters('Spider-Man: Far From Home'))
+        restored.add('Moreland Theater', ['Spider-Man: Far From Home!'])
+        self.assertIn('Moreland Theater', restored.theaters('Spider-Man: Far From Home'))
+
+    def test_newer_version_rejected(self):
+        with self.assertRaises(ValueError):
+            aggregate.MovieIndex.from_dict({'version': aggregate.INDEX_VERSION + 1, 'movies': []})
+
+    def test_large_catalogue(self):
+        rng = random.Random(0)
+        words = [''.join(rng.choice('abcdefghijklmnoprstuvwy') for _ in range(rng.randint(2, 9))) for _ in range(3000)]
+        movie_titles = list(set(' '.join(rng.choice(words) for _ in range(rng.randint(1, 4))) for _ in range(30000)))
+        index = aggregate.MovieIndex()
+        start = time.perf_counter()
+        for theater in range(100):
+            index.add('Theater {}'.format(theater), rng.sample(movie_titles, 500))
+        self.assertLess(time.perf_counter() - start, 20)
+        self.assertGreater(len(index), 10000)
+
+    def test_many_distinct_titles(self):
+        # Fuzzy merging has to stay close to the cost of exact keys with tens of thousands of titles
+        rng = random.Random(1)
+        words = [''.join(rng.choice('abcdefghijklmnoprstuvwy') for _ in range(rng.randint(2, 9))) for _ in range(5000)]
+        movie_titles = sorted(set(' '.join(rng.choice(words) for _ in range(rng.randint(2, 4))) for _ in range(40000)))
+        start = time.perf_counter()
+        aggregate.MovieIndex(fuzzy=False).add('Laurelhurst', movie_titles)
+        exact = time.perf_counter() - start
+        index = aggregate.MovieIndex()
+        start = time.perf_counter()
+        index.add('Laurelhurst', movie_titles)
+        self.assertLess(time.perf_counter() - start, max(10 * exact, 2.0))
+        self.assertGreater(len(index), len(movie_titles) * 0.99)
+
+
+class TestTheaterListMovieIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_theater_list = moviescraper.TheaterList([
+            {
+                'site_url': SAMPLE_SITE,
+                'theater_name': 'Test Theater {}'.format(x),
+                'list_selector': 'div#test-id > div.test-class > span'
+            } for x in range(3)
+        ])
+
+    def test_movie_index(self):
+        for max_workers in (1, parallel.DEFAULT_MAX_WORKERS):
+            index = self.test_theater_list.movie_index(max_workers=max_workers)
+            self.assertEqual(
+                index.movies()['Second Sample Movie: The Return'],
+                ['Test Theater 0', 'Test Theater 1', 'Test Theater 2']
+            )
+            self.assertEqual(len(index), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
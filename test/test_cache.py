@@ -0,0 +1,132 @@
+#!/usr/local/bin/python3
+
+import unittest
+from unittest.mock import MagicMock
+import logging
+from moviescraper import moviescraper
+from moviescraper import cache, fetch
+import shutil
+import tempfile
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TEST_PAGE = '''<html><body><div id="test-id"><div class="test-class">
+<span>Cached Movie</span></div></div></body></html>'''
+
+
+def make_response(status_code = 200, text = '', headers = None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.ok = status_code < 400
+    response.text = text
+    response.headers = headers or {}
+    return response
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache = cache.ResponseCache(self.test_dir, ttl=60)
+        self.url = 'http://testtheatersite.com/'
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_fetch_stores_body_and_validators(self):
+        get = MagicMock(return_value=make_response(
+            text=TEST_PAGE, headers={'ETag': '"abc"', 'Last-Modified': 'Mon, 01 Jul 2019 00:00:00 GMT'}
+        ))
+        self.assertEqual(self.cache.fetch(self.url, get), TEST_PAGE)
+        get.assert_called_once_with(self.url, {})
+
+        entry = self.cache.get(self.url)
+        self.assertEqual(entry.body, TEST_PAGE)
+        self.assertEqual(entry.etag, '"abc"')
+        self.assertEqual(entry.last_modified, 'Mon, 01 Jul 2019 00:00:00 GMT')
+
+    def test_fresh_entry_skips_request(self):
+        self.cache.put(self.url, TEST_PAGE)
+        get = MagicMock()
+        self.assertEqual(self.cache.fetch(self.url, get), TEST_PAGE)
+        get.assert_not_called()
+
+    def test_stale_entry_revalidates(self):
+        self.cache.put(self.url, TEST_PAGE, '"abc"', 'Mon, 01 Jul 2019 00:00:00 GMT', time.time() - 120)
+        get = MagicMock(return_value=make_response(status_code=304))
+        self.assertEqual(self.cache.fetch(self.url, get), TEST_PAGE)
+        get.assert_called_once_with(self.url, {
+            'If-None-Match': '"abc"', 'If-Modified-Since': 'Mon, 01 Jul 2019 00:00:00 GMT'
+        })
+        self.assertTrue(self.cache.is_fresh(self.cache.get(self.url)))
+
+    def test_stale_entry_replaced_when_modified(self):
+        self.cache.put(self.url, 'old page', '"abc"', None, time.time() - 120)
+        get = MagicMock(return_value=make_response(text=TEST_PAGE, headers={'ETag': '"def"'}))
+        self.assertEqual(self.cache.fetch(self.url, get), TEST_PAGE)
+        self.assertEqual(self.cache.get(self.url).etag, '"def"')
+
+    def test_per_call_ttl(self):
+        self.cache.put(self.url, TEST_PAGE, fetched_at=time.time() - 30)
+        get = MagicMock(return_value=make_response(text='new page'))
+        self.assertEqual(self.cache.fetch(self.url, get, ttl=3600), TEST_PAGE)
+        self.assertEqual(self.cache.fetch(self.url, get, ttl=10), 'new page')
+
+    def test_error_response_not_cached(self):
+        get = MagicMock(return_value=make_response(status_code=500, text='error'))
+        self.cache.fetch(self.url, get)
+        self.assertIsNone(self.cache.get(self.url))
+
+    def test_offline(self):
+        offline_cache = cache.ResponseCache(self.test_dir, offline=True)
+        get = MagicMock()
+        with self.assertRaises(cache.CacheMiss):
+            offline_cache.fetch(self.url, get)
+        self.cache.put(self.url, TEST_PAGE, fetched_at=0)
+        self.assertEqual(offline_cache.fetch(self.url, get), TEST_PAGE)
+        get.assert_not_called()
+
+
+class TestTheaterCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache = cache.ResponseCache(self.test_dir)
+        self.transport = fetch.LocalTransport()
+        self.transport.add_page('http://testtheatersite.com/', TEST_PAGE, headers={'ETag': '"abc"'})
+        self.fetcher = fetch.Fetcher(transport=self.transport)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def make_theater(self):
+        return moviescraper.Theater(
+            site_url = 'http://testtheatersite.com/', theater_name = 'Test Theater',
+            list_selector = 'div#test-id > div.test-class > span',
+            cache = self.cache, fetcher = self.fetcher
+        )
+
+    def test_movies_uses_cache(self):
+        self.assertEqual(self.make_theater().movies(), ['Cached Movie'])
+        self.assertEqual(self.make_theater().movies(), ['Cached Movie'])
+        self.assertEqual(len(self.transport.sent), 1)
+
+    def test_theater_list_shares_cache(self):
+        theater_list = moviescraper.TheaterList([{
+            'site_url': 'http://testtheatersite.com/', 'theater_name': 'Test Theater',
+            'list_selector': 'div#test-id > div.test-class > span', 'cache_ttl': 0
+        }], cache=self.cache, fetcher=self.fetcher)
+        self.assertIs(theater_list.theater_list[0].cache, self.cache)
+        self.assertEqual(theater_list.movies(), {'Test Theater': ['Cached Movie']})
+
+    def test_stale_theater_sends_conditional_request(self):
+        self.make_theater().movies()
+        self.transport.pages['http://testtheatersite.com/'] = (304, {}, '')
+        theater = self.make_theater()
+        theater.cache_ttl = 0
+        self.assertEqual(theater.movies(), ['Cached Movie'])
+        self.assertEqual(self.transport.sent[-1].headers['If-None-Match'], '"abc"')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/local/bin/python3
+
+import unittest
+import logging
+from moviescraper import catalogue, matching
+import sys
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+THEATER_MOVIES = {
+    'Academy Theater': ['Booksmart', 'Parasite', 'Toy Story 4'],
+    'Laurelhurst': ['Parasite', 'Rocketman', 'Toy Story 4'],
+    'Lake Theater': ['Toy Story 4', 'Yesterday'],
+}
+
+
+class TestTitleTable(unittest.TestCase):
+    def test_ids(self):
+        table = catalogue.TitleTable()
+        self.assertEqual(table.add('Parasite'), 0)
+        self.assertEqual(table.add('Booksmart'), 1)
+        self.assertEqual(table.add('Parasite'), 0)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.id('Booksmart'), 1)
+        self.assertIsNone(table.id('Rocketman'))
+        self.assertEqual(table.title(1), 'Booksmart')
+        self.assertIn('Parasite', table)
+
+    def test_interned(self):
+        table = catalogue.TitleTable()
+        title = ''.join(['Toy ', 'Story 4'])
+        table.add(title)
+        self.assertIs(table.title(0), sys.intern('Toy Story 4'))
+
+
+class TestCatalogue(unittest.TestCase):
+    def setUp(self):
+        self.catalogue = catalogue.Catalogue()
+        for theater_name, movies in THEATER_MOVIES.items():
+            self.catalogue.set(theater_name, movies)
+
+    def test_rows(self):
+        self.assertEqual(len(self.catalogue), 3)
+        self.assertEqual(self.catalogue.to_dict(), THEATER_MOVIES)
+        self.assertEqual(len(self.catalogue.titles), 5)
+        self.assertEqual(self.catalogue.showings(), 8)
+        self.assertEqual(self.catalogue.theaters('Parasite'), ['Academy Theater', 'Laurelhurst'])
+        self.assertEqual(self.catalogue.theaters('Cats'), [])
+
+    def test_set_replaces_and_dedupes(self):
+        self.catalogue.set('Lake Theater', ['Yesterday', 'Rocketman', 'Yesterday'])
+        self.assertEqual(self.catalogue.movies('Lake Theater'), ['Yesterday', 'Rocketman'])
+        self.assertEqual(self.catalogue.theaters('Toy Story 4'), ['Academy Theater', 'Laurelhurst'])
+        self.catalogue.discard('Lake Theater')
+        self.catalogue.discard('Lake Theater')
+        self.assertNotIn('Lake Theater', self.catalogue)
+
+    def test_row(self):
+        row = self.catalogue.row('Academy Theater')
+        self.assertEqual(row, THEATER_MOVIES['Academy Theater'])
+        self.assertEqual(len(row), 3)
+        self.assertEqual(row[1], 'Parasite')
+        self.assertEqual(row[-2:], ['Parasite', 'Toy Story 4'])
+        self.assertIn('Booksmart', row)
+        self.assertNotEqual(row, ['Booksmart'])
+        self.assertEqual(repr(row), repr(THEATER_MOVIES['Academy Theater']))
+
+    def test_compact(self):
+        self.assertFalse(self.catalogue.compact())
+        before = self.catalogue.row('Lake Theater')
+        for generation in range(3):
+            self.catalogue.set('Lake Theater', ['Movie {} {}'.format(generation, number) for number in range(10)])
+        self.assertEqual(len(self.catalogue.titles), 35)
+        self.assertTrue(self.catalogue.compact())
+        self.assertEqual(len(self.catalogue.titles), 14)
+        self.assertEqual(self.catalogue.movies('Lake Theater')[0], 'Movie 2 0')
+        self.assertEqual(self.catalogue.theaters('Parasite'), ['Academy Theater', 'Laurelhurst'])
+        self.assertNotIn('Movie 0 0', self.catalogue.titles)
+        # Rows taken before keep reading the old table
+        self.assertEqual(before, THEATER_MOVIES['Lake Theater'])
+
+    def test_invert(self):
+        self.assertEqual(self.catalogue.invert(), matching.invert(THEATER_MOVIES))
+
+    def test_set_operations(self):
+        self.assertEqual(self.catalogue.decode(self.catalogue.any_of()),
+                         ['Booksmart', 'Parasite', 'Rocketman', 'Toy Story 4', 'Yesterday'])
+        self.assertEqual(self.catalogue.decode(self.catalogue.all_of()), ['Toy Story 4'])
+        self.assertEqual(self.catalogue.decode(self.catalogue.all_of(['Academy Theater', 'Laurelhurst'])),
+                         ['Parasite', 'Toy Story 4'])
+        self.assertEqual(self.catalogue.decode(self.catalogue.only_at('Academy Theater')), ['Booksmart'])
+        self.assertEqual(self.catalogue.decode(self.catalogue.only_at('Lake Theater', ['Academy Theater'])),
+                         ['Yesterday'])
+        self.assertEqual(self.catalogue.count(self.catalogue.any_of(['Laurelhurst', 'Lake Theater'])), 4)
+        self.assertEqual(self.catalogue.decode(self.catalogue.any_of([])), [])
+        self.assertEqual(self.catalogue.all_of([]), 0)
+
+    def test_shared_title_table(self):
+        other = catalogue.Catalogue(self.catalogue.titles)
+        other.set('Cinema 21', ['Rocketman', 'Midsommar'])
+        self.assertEqual(self.catalogue.decode(self.catalogue.bits('Laurelhurst') & other.bits('Cinema 21')),
+                         ['Rocketman'])
+
+    def test_large(self):
+        large = catalogue.Catalogue()
+        for theater in range(200):
+            large.set(str(theater), ['Movie {}'.format(movie) for movie in range(theater, theater + 50)])
+        self.assertEqual(len(large.titles), 249)
+        self.assertEqual(large.count(large.any_of()), 249)
+        self.assertEqual(large.decode(large.all_of(['0', '49'])), ['Movie 49'])
+        self.assertEqual(large.theaters('Movie 249'), [])
+        self.assertEqual(large.theaters('Movie 248'), ['199'])
+
+
+if __name__ == '__main__':
+    unittest.main()
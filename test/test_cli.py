@@ -0,0 +1,129 @@
+#!/usr/local/bin/python3
+
+import unittest
+import logging
+from moviescraper import cli
+import contextlib
+import csv
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_SITE = os.path.join(os.path.dirname(__file__), 'sample_site.html')
+SAMPLE_SELECTOR = 'div#test-id > div.test-class > span'
+SAMPLE_MOVIES = ['First Sample Movie', 'Second Sample Movie: The Return', 'Third Sample Movie']
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.test_dir, 'theaters.json')
+        with open(self.config_path, 'w') as config_file:
+            json.dump({'version': 1, 'theaters': [
+                {'theater_name': 'One', 'site_url': SAMPLE_SITE, 'list_selector': SAMPLE_SELECTOR},
+                {'theater_name': 'Two', 'site_url': SAMPLE_SITE, 'list_selector': SAMPLE_SELECTOR},
+                {'theater_name': 'Broken', 'site_url': os.path.join(self.test_dir, 'missing.html'),
+                 'list_selector': SAMPLE_SELECTOR},
+            ]}, config_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def run_cli(self, *args):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            status = cli.main(['--config', self.config_path] + list(args))
+        return status, output.getvalue()
+
+    def test_list(self):
+        self.assertEqual(self.run_cli('--list'), (0, 'One\nTwo\nBroken\n'))
+        self.assertEqual(self.run_cli('--list', '--theaters', 'Two'), (0, 'Two\n'))
+
+    def test_unknown_theater(self):
+        with self.assertRaises(SystemExit) as raised, contextlib.redirect_stderr(io.StringIO()):
+            self.run_cli('--theaters', 'One', 'Nowhere')
+        self.assertEqual(raised.exception.code, 2)
+
+    def test_json(self):
+        status, output = self.run_cli('--theaters', 'One', 'Two', '--format', 'json')
+        self.assertEqual(status, 0)
+        self.assertEqual(json.loads(output), [{'title': movie, 'theaters': ['One', 'Two']} for movie in SAMPLE_MOVIES])
+
+    def test_csv_with_filters(self):
+        filter_path = os.path.join(self.test_dir, 'wanted.txt')
+        with open(filter_path, 'w') as filter_file:
+            filter_file.write('# wanted\n\nthird\n')
+        status, output = self.run_cli(
+            '--theaters', 'One', '--filter', 'Return', '--filter-file', filter_path, '--ignore-case', '--format', 'csv'
+        )
+        self.assertEqual(status, 0)
+        self.assertEqual(list(csv.reader(io.StringIO(output))), [
+            ['title', 'theater'], ['Second Sample Movie: The Return', 'One'], ['Third Sample Movie', 'One']
+        ])
+
+    def test_failed_theater(self):
+        output_path = os.path.join(self.test_dir, 'movies.txt')
+        with self.assertLogs(level='ERROR'):
+            status, _ = self.run_cli('--output', output_path, '--workers', '2')
+        self.assertEqual(status, 1)
+        with open(output_path) as output_file:
+            lines = output_file.read().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('First Sample Movie'))
+        self.assertTrue(lines[0].endswith('One, Two'))
+
+    def test_store(self):
+        from moviescraper import store
+        store_path = os.path.join(self.test_dir, 'theaters.db')
+        with store.TheaterStore(store_path) as theater_store:
+            theater_store.import_config_file(self.config_path)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            status = cli.main(['--store', store_path, '--theaters', 'Two', '--format', 'json'])
+        self.assertEqual(status, 0)
+        self.assertEqual([movie['theaters'] for movie in json.loads(output.getvalue())], [['Two']] * 3)
+
+    def test_bad_store(self):
+        import sqlite3
+        missing_path = os.path.join(self.test_dir, 'typo.db')
+        not_a_store_path = os.path.join(self.test_dir, 'notes.db')
+        with open(not_a_store_path, 'w') as not_a_store:
+            not_a_store.write('not a database\n' * 100)
+        newer_path = os.path.join(self.test_dir, 'newer.db')
+        connection = sqlite3.connect(newer_path)
+        connection.execute('PRAGMA user_version = 999')
+        connection.close()
+        for store_path in (missing_path, not_a_store_path, newer_path):
+            with self.assertRaises(SystemExit) as raised, contextlib.redirect_stderr(io.StringIO()):
+                cli.main(['--store', store_path, '--list'])
+            self.assertEqual(raised.exception.code, 2)
+        self.assertFalse(os.path.exists(missing_path))
+
+    def test_read_filters_from_stdin(self):
+        stdin = sys.stdin
+        sys.stdin = io.StringIO('alpha\n  beta  \n')
+        try:
+            self.assertEqual(cli.read_filters('-'), ['alpha', 'beta'])
+        finally:
+            sys.stdin = stdin
+
+    def test_lazy_imports(self):
+        # Listing theaters shouldn't pay for importing the parsing and HTTP modules
+        script = 'import sys; from moviescraper import cli; cli.main(["--list"]); ' \
+                 'print(sorted(m for m in ("bs4", "requests") if m in sys.modules))'
+        output = subprocess.run(
+            [sys.executable, '-c', script], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout
+        self.assertEqual(output.splitlines()[-1], '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
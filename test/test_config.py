@@ -0,0 +1,87 @@
+#!/usr/local/bin/python3
+
+import unittest
+import json
+import logging
+from moviescraper import moviescraper
+from moviescraper import config
+import os
+import shutil
+import tempfile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TEST_CONFIG = [
+    {
+        'theater_name': 'Test Theater One',
+        'site_url': 'http://testtheatersite1.com/',
+        'list_selector': 'div > span'
+    },
+    {
+        'theater_name': 'Test Theater Two',
+        'site_url': 'http://testtheatersite2.com/',
+        'list_selector': 'div > span',
+        'text_search': 'Test (.+)$',
+        'cache_ttl': 3600
+    }
+]
+
+
+class TestConfig(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_save_load_json(self):
+        path = os.path.join(self.test_dir, 'theaters.json')
+        config.save_config(path, TEST_CONFIG)
+        with open(path) as config_file:
+            self.assertEqual(json.load(config_file)['version'], config.CONFIG_VERSION)
+        self.assertEqual(config.load_config(path), TEST_CONFIG)
+
+    def test_save_theater_instances(self):
+        path = os.path.join(self.test_dir, 'theaters.json')
+        config.save_config(path, [moviescraper.Theater(**theater_info) for theater_info in TEST_CONFIG])
+        self.assertEqual(config.load_config(path), TEST_CONFIG)
+
+    def test_load_toml(self):
+        path = os.path.join(self.test_dir, 'theaters.toml')
+        with open(path, 'w') as config_file:
+            config_file.write('version = 1\n\n[[theaters]]\ntheater_name = "Test Theater One"\n'
+                              'site_url = "http://testtheatersite1.com/"\nlist_selector = "div > span"\n')
+        self.assertEqual(config.load_config(path), TEST_CONFIG[:1])
+
+    def test_save_load_yaml(self):
+        try:
+            import yaml
+        except ImportError:
+            self.skipTest('PyYAML is not installed')
+        path = os.path.join(self.test_dir, 'theaters.yaml')
+        config.save_config(path, TEST_CONFIG)
+        self.assertEqual(config.load_config(path), TEST_CONFIG)
+
+    def test_bare_list(self):
+        self.assertEqual(config.parse_config(TEST_CONFIG), TEST_CONFIG)
+
+    def test_invalid_config(self):
+        with self.assertRaises(config.ConfigError):
+            config.parse_config([{'theater_name': 'No URL', 'list_selector': 'div'}])
+        with self.assertRaises(config.ConfigError):
+            config.parse_config([dict(TEST_CONFIG[0], unknown_field='x')])
+        with self.assertRaises(config.ConfigError):
+            config.parse_config([TEST_CONFIG[0], TEST_CONFIG[0]])
+        with self.assertRaises(config.ConfigError):
+            config.parse_config({'version': config.CONFIG_VERSION + 1, 'theaters': []})
+
+    def test_default_theaters(self):
+        theaters = moviescraper.Theaters()
+        self.assertEqual(len(theaters.theater_list()), 6)
+        self.assertEqual(theaters.theater_list()[1].theater_name, 'Lake Theater')
+        self.assertEqual(theaters.theater_list()[1].text_search, 'Now Playing: (.+)$')
+
+
+if __name__ == '__main__':
+    unittest.main()
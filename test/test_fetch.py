@@ -0,0 +1,82 @@
+#!/usr/local/bin/python3
+
+import unittest
+import gzip
+import logging
+from moviescraper import moviescraper
+from moviescraper import fetch
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TEST_PAGE = '''<html><body><div id="test-id"><div class="test-class">
+<span>Fetched Movie</span></div></div></body></html>'''
+
+
+class TestFetcher(unittest.TestCase):
+    def setUp(self):
+        self.transport = fetch.LocalTransport()
+        self.transport.add_page('http://testtheatersite.com/', TEST_PAGE)
+        self.fetcher = fetch.Fetcher(timeout=(1, 2), transport=self.transport)
+
+    def test_get(self):
+        response = self.fetcher.get('http://testtheatersite.com/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text, TEST_PAGE)
+
+    def test_get_unknown_url(self):
+        self.assertEqual(self.fetcher.get('http://elsewhere.com/').status_code, 404)
+
+    def test_request_headers(self):
+        self.fetcher.get('http://testtheatersite.com/', headers={'If-None-Match': '"abc"'})
+        sent = self.transport.sent[-1]
+        self.assertEqual(sent.headers['If-None-Match'], '"abc"')
+        self.assertIn('gzip', sent.headers['Accept-Encoding'])
+
+    def test_default_transport(self):
+        fetcher = fetch.Fetcher(retries=5, backoff_factor=1, pool_maxsize=7)
+        adapter = fetcher.session.get_adapter('https://testtheatersite.com/')
+        self.assertEqual(adapter.max_retries.total, 5)
+        self.assertEqual(adapter.max_retries.backoff_factor, 1)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+        self.assertEqual(adapter._pool_maxsize, 7)
+
+    def test_default_fetcher_is_shared(self):
+        self.assertIs(fetch.default_fetcher(), fetch.default_fetcher())
+
+
+class TestTheaterListFetcher(unittest.TestCase):
+    def setUp(self):
+        self.transport = fetch.LocalTransport()
+        self.fetcher = fetch.Fetcher(transport=self.transport)
+        for x in range(2):
+            self.transport.add_page('http://testtheatersite{}.com/'.format(x), TEST_PAGE)
+        self.test_theater_list = moviescraper.TheaterList([
+            {
+                'site_url': 'http://testtheatersite{}.com/'.format(x),
+                'theater_name': 'Test Theater {}'.format(x),
+                'list_selector': 'div#test-id > div.test-class > span'
+            } for x in range(2)
+        ], fetcher=self.fetcher)
+
+    def test_theaters_share_fetcher(self):
+        for theater in self.test_theater_list.theater_list:
+            self.assertIs(theater.fetcher, self.fetcher)
+
+    def test_movies(self):
+        self.assertEqual(self.test_theater_list.movies(), {
+            'Test Theater 0': ['Fetched Movie'],
+            'Test Theater 1': ['Fetched Movie']
+        })
+        self.assertEqual(len(self.transport.sent), 2)
+
+    def test_gzip_response(self):
+        self.transport.pages['http://testtheatersite0.com/'] = (
+            200, {'Content-Encoding': 'gzip'}, gzip.compress(TEST_PAGE.encode('utf-8'))
+        )
+        theater = self.test_theater_list.theater_list[0]
+        self.assertEqual(theater.movies(), ['Fetched Movie'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/local/bin/python3
+
+import unittest
+import logging
+from moviescraper import history, showtimes, store
+import os
+import shutil
+import sqlite3
+import tempfile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DAY = 86400.0
+
+
+def screenings(*movies):
+    return [showtimes.Screening(movie, 'Friday', ('7:00pm',)) for movie in movies]
+
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'history.db')
+        self.store = history.HistoryStore(self.path)
+        # Laurelhurst picks up Parasite on day 2, after its first run at the Academy ends
+        days = [
+            {'Academy Theater': screenings('Parasite', 'Rocketman'), 'Laurelhurst': screenings('Booksmart')},
+            {'Academy Theater': screenings('Rocketman'), 'Laurelhurst': screenings('Booksmart', 'Parasite')},
+            {'Academy Theater': screenings('Rocketman'), 'Laurelhurst': screenings('Parasite')},
+            {'Academy Theater': screenings('Rocketman', 'Parasite'), 'Laurelhurst': screenings('Parasite')},
+        ]
+        for day, theater_screenings in enumerate(days):
+            self.store.append_all(theater_screenings, scraped_at=day * DAY)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_snapshots(self):
+        snapshots = self.store.snapshots()
+        self.assertEqual(len(snapshots), 8)
+        self.assertEqual(snapshots[0], history.Snapshot(
+            'Academy Theater', 0.0, [showtimes.Screening('Parasite', 'Friday', ('7:00pm',)),
+                                     showtimes.Screening('Rocketman', 'Friday', ('7:00pm',))]
+        ))
+        window = self.store.snapshots(start=DAY, end=3 * DAY, theater_names=['Laurelhurst'])
+        self.assertEqual([snapshot.scraped_at for snapshot in window], [DAY, 2 * DAY])
+        self.assertEqual(self.store.latest('Laurelhurst').screenings, screenings('Parasite'))
+        self.assertIsNone(self.store.latest('Cinema 21'))
+
+    def test_runs(self):
+        self.assertEqual(self.store.runs('parasite'), [
+            history.Run('Parasite', 'Academy Theater', 0.0, 0.0),
+            history.Run('Parasite', 'Laurelhurst', DAY, 3 * DAY),
+            history.Run('Parasite', 'Academy Theater', 3 * DAY, 3 * DAY),
+        ])
+        self.assertEqual(self.store.first_seen('Parasite', 'Laurelhurst'), DAY)
+        self.assertEqual(self.store.first_seen('PARASITE'), 0.0)
+        self.assertIsNone(self.store.first_seen('Cats'))
+        self.assertEqual(self.store.runs(theater_name='Laurelhurst', start=2 * DAY), [
+            history.Run('Parasite', 'Laurelhurst', DAY, 3 * DAY),
+        ])
+        self.assertEqual([run.title for run in self.store.runs(end=DAY)], ['Parasite', 'Rocketman', 'Booksmart'])
+
+    def test_out_of_order(self):
+        with self.assertRaises(store.StoreError):
+            self.store.append('Laurelhurst', screenings('Cats'), scraped_at=DAY)
+        # The failed append left nothing behind, and ids are still right
+        self.assertIsNone(self.store.first_seen('Cats'))
+        self.store.append('Laurelhurst', screenings('Cats'), scraped_at=4 * DAY)
+        self.assertEqual(self.store.latest('Laurelhurst').screenings, screenings('Cats'))
+
+    def test_compact(self):
+        before = self.store.runs()
+        # Rocketman-only snapshots at the Academy repeat on days 1 and 2
+        self.assertEqual(self.store.compact(3 * DAY), 1)
+        self.assertEqual([snapshot.scraped_at for snapshot in self.store.snapshots(theater_names=['Academy Theater'])],
+                         [0.0, DAY, 3 * DAY])
+        self.assertEqual(self.store.runs(), before)
+        self.assertEqual(self.store.compact(3 * DAY), 0)
+        # Appending carries on from the last snapshot, even if it was compacted away
+        self.store.append('Laurelhurst', screenings('Parasite'), scraped_at=4 * DAY)
+        self.assertEqual(self.store.runs('Parasite', 'Laurelhurst')[-1].last_seen, 4 * DAY)
+
+    def test_reopen(self):
+        self.store.close()
+        self.store = history.HistoryStore(self.path)
+        self.assertEqual(self.store.schema_version(), history.SCHEMA_VERSION)
+        self.assertEqual(len(self.store.snapshots()), 8)
+        self.store.append('Academy Theater', screenings('Rocketman'), scraped_at=4 * DAY)
+        self.assertEqual(self.store.runs('Rocketman'), [history.Run('Rocketman', 'Academy Theater', 0.0, 4 * DAY)])
+
+    def test_newer_schema(self):
+        self.store.close()
+        connection = sqlite3.connect(self.path)
+        connection.execute('PRAGMA user_version = {}'.format(history.SCHEMA_VERSION + 1))
+        connection.close()
+        with self.assertRaises(store.StoreError):
+            history.HistoryStore(self.path)
+        self.store = history.HistoryStore(os.path.join(self.test_dir, 'other.db'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/local/bin/python3
+
+import unittest
+import logging
+from moviescraper import moviescraper
+from moviescraper import matching
+import os
+import random
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_SITE = os.path.join(os.path.dirname(__file__), 'sample_site.html')
+
+
+class TestMovieMatcher(unittest.TestCase):
+    def setUp(self):
+        self.catalogue = {
+            'Spider-Man: Far From Home': ['Laurelhurst', 'Academy Theater'],
+            'Amélie': ['Living Room Theaters'],
+            'Toy Story 4': ['Academy Theater'],
+            'Rocketman': ['Lake Theater']
+        }
+        self.user_filters = {
+            'alice': ['Spider', 'Story'],
+            'bob': ['Amelie', 'man'],
+            'carol': []
+        }
+
+    def test_match(self):
+        matcher = matching.MovieMatcher(self.user_filters)
+        self.assertEqual(matcher.match(self.catalogue), [
+            matching.Match('alice', 'Spider-Man: Far From Home', ['Academy Theater', 'Laurelhurst']),
+            matching.Match('alice', 'Toy Story 4', ['Academy Theater']),
+            matching.Match('bob', 'Rocketman', ['Lake Theater'])
+        ])
+
+    def test_ignore_case(self):
+        matcher = matching.MovieMatcher(self.user_filters, ignore_case=True)
+        self.assertEqual(
+            sorted(match.title for match in matcher.match(self.catalogue) if match.user == 'bob'),
+            ['Rocketman', 'Spider-Man: Far From Home']
+        )
+
+    def test_ignore_accents(self):
+        matcher = matching.MovieMatcher({'bob': ['Amelie']}, ignore_accents=True)
+        self.assertEqual(matcher.users_for('Amélie'), {'bob'})
+        matcher = matching.MovieMatcher({'bob': ['AMÉLIE']}, ignore_case=True, ignore_accents=True)
+        self.assertEqual(matcher.users_for('Amelie'), {'bob'})
+
+    def test_overlapping_filters(self):
+        matcher = matching.MovieMatcher({'a': ['she'], 'b': ['he'], 'c': ['hers'], 'd': ['his']})
+        self.assertEqual(matcher.users_for('ushers'), {'a', 'b', 'c'})
+
+    def test_same_as_substring_filter(self):
+        rng = random.Random(1)
+        alphabet = 'abc '
+        titles = [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 12))) for _ in range(300)]
+        user_filters = dict(
+            (user, [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(3)])
+            for user in range(20)
+        )
+        matcher = matching.MovieMatcher(user_filters)
+        for title in titles:
+            expected = set(user for user, filters in user_filters.items() if any(f in title for f in filters))
+            self.assertEqual(matcher.users_for(title), expected, title)
+
+    def test_filter_titles(self):
+        matcher = matching.MovieMatcher({'user': ['other', 'Movie']})
+        self.assertEqual(
+            matcher.filter_titles(['A movie', 'Another movie', 'The Apostrophe\'s Movie']),
+            ['Another movie', 'The Apostrophe\'s Movie']
+        )
+
+    def test_invert(self):
+        self.assertEqual(
+            matching.invert({'One': ['A', 'B'], 'Two': ['B']}),
+            {'A': ['One'], 'B': ['One', 'Two']}
+        )
+
+
+class TestTheaterListMatches(unittest.TestCase):
+    def test_matches(self):
+        theater_list = moviescraper.TheaterList([
+            {
+                'site_url': SAMPLE_SITE,
+                'theater_name': 'Test Theater {}'.format(x),
+                'list_selector': 'div#test-id > div.test-class > span'
+            } for x in range(2)
+        ])
+        self.assertEqual(theater_list.matches({'user': ['return']}, ignore_case=True), [
+            matching.Match('user', 'Second Sample Movie: The Return', ['Test Theater 0', 'Test Theater 1'])
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/local/bin/python3
+
+import unittest
+from unittest.mock import MagicMock, patch
+from bs4 import BeautifulSoup
+import logging
+from moviescraper import moviescraper
+from moviescraper import cache, fetch, metrics
+import os
+import shutil
+import tempfile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_SITE = os.path.join(os.path.dirname(__file__), 'sample_site.html')
+SAMPLE_SELECTOR = 'div#test-id > div.test-class > span'
+
+
+class CountingSoup(BeautifulSoup):
+    formatted = 0
+
+    def __str__(self):
+        CountingSoup.formatted += 1
+        return super(CountingSoup, self).__str__()
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = metrics.Metrics()
+
+    def test_counters(self):
+        self.metrics.increment('errors', 'Theater One')
+        self.metrics.increment('errors', 'Theater One')
+        self.metrics.increment('errors', 'Theater Two')
+        self.assertEqual(self.metrics.counter('errors', 'Theater One'), 2)
+        self.assertEqual(self.metrics.counter('errors'), 3)
+        self.assertEqual(self.metrics.counter('cache_hits', 'Theater One'), 0)
+
+    def test_timings(self):
+        self.metrics.observe('parse', 'Theater One', 0.5)
+        self.metrics.observe('parse', 'Theater One', 1.5)
+        with self.metrics.timer('fetch', 'Theater Two'):
+            pass
+        self.assertEqual(self.metrics.timing('parse', 'Theater One'), metrics.StageTiming(2, 2.0, 1.5))
+        self.assertEqual(self.metrics.timing('fetch', 'Theater Two').count, 1)
+        self.assertEqual(self.metrics.slowest('parse'), [('Theater One', 2.0)])
+        self.assertEqual(self.metrics.slowest()[0][0], 'Theater One')
+
+    def test_snapshot_and_reset(self):
+        self.metrics.increment('scrapes', 'Theater One')
+        self.metrics.observe('select', 'Theater One', 0.25)
+        self.assertEqual(self.metrics.snapshot(), {'Theater One': {
+            'counters': {'scrapes': 1},
+            'stages': {'select': {'count': 1, 'total': 0.25, 'max': 0.25}}
+        }})
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot(), {})
+        self.assertEqual(self.metrics.render_prometheus(), '')
+
+    def test_render_prometheus(self):
+        self.metrics.increment('bytes_downloaded', 'Lake "Cafe"', 1024)
+        self.metrics.observe('fetch', 'Lake "Cafe"', 0.5)
+        text = self.metrics.render_prometheus()
+        self.assertIn('# TYPE moviescraper_bytes_downloaded_total counter', text)
+        self.assertIn('moviescraper_bytes_downloaded_total{theater="Lake \\"Cafe\\""} 1024', text)
+        self.assertIn('moviescraper_stage_seconds_sum{theater="Lake \\"Cafe\\"",stage="fetch"} 0.5', text)
+        self.assertIn('moviescraper_stage_seconds_count{theater="Lake \\"Cafe\\"",stage="fetch"} 1', text)
+        self.assertTrue(text.endswith('\n'))
+
+
+class TestTheaterMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = metrics.Metrics()
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_stages_recorded(self):
+        theater = moviescraper.Theater(
+            site_url = SAMPLE_SITE, theater_name = 'Test Theater', list_selector = SAMPLE_SELECTOR,
+            metrics = self.metrics
+        )
+        theater.movie_filter = ['Movie']
+        theater.movies()
+        for stage in ('fetch', 'parse', 'select', 'filter', 'strip'):
+            self.assertEqual(self.metrics.timing(stage, 'Test Theater').count, 1, stage)
+        self.assertEqual(self.metrics.timing('text_search', 'Test Theater').count, 0)
+        self.assertEqual(self.metrics.counter('scrapes', 'Test Theater'), 1)
+
+    def test_http_bytes_and_cache(self):
+        transport = fetch.LocalTransport()
+        body = '<div id="test-id"><div class="test-class"><span>A</span></div></div>'
+        transport.add_page('http://testtheatersite.com/', body)
+        theater_list = moviescraper.TheaterList([{
+            'site_url': 'http://testtheatersite.com/', 'theater_name': 'Test Theater', 'list_selector': SAMPLE_SELECTOR
+        }], cache=cache.ResponseCache(self.test_dir), fetcher=fetch.Fetcher(transport=transport), metrics=self.metrics)
+        theater_list.movies()
+        theater_list.theater_list[0].expire()
+        theater_list.movies()
+        self.assertEqual(self.metrics.counter('bytes_downloaded', 'Test Theater'), len(body))
+        self.assertEqual(self.metrics.counter('cache_misses', 'Test Theater'), 1)
+        self.assertEqual(self.metrics.counter('cache_hits', 'Test Theater'), 1)
+
+    def test_errors_counted(self):
+        theater = moviescraper.Theater(
+            site_url = SAMPLE_SITE, theater_name = 'Test Theater', list_selector = SAMPLE_SELECTOR,
+            text_search = 'No Match (.+)', metrics = self.metrics
+        )
+        with self.assertRaises(moviescraper.ScrapeError):
+            theater.movies()
+        self.assertEqual(self.metrics.counter('errors', 'Test Theater'), 1)
+
+        theater = moviescraper.Theater(
+            site_url = os.path.join(self.test_dir, 'missing.html'), theater_name = 'Missing Theater',
+            list_selector = SAMPLE_SELECTOR, metrics = self.metrics
+        )
+        with self.assertRaises(IOError):
+            theater.movies()
+        self.assertEqual(self.metrics.counter('errors', 'Missing Theater'), 1)
+
+    def test_debug_strings_not_built_when_disabled(self):
+        theater = moviescraper.Theater(
+            site_url = SAMPLE_SITE, theater_name = 'Test Theater', list_selector = SAMPLE_SELECTOR,
+            metrics = self.metrics
+        )
+        with open(SAMPLE_SITE) as html_file:
+            soup = CountingSoup(html_file, 'html.parser')
+        CountingSoup.formatted = 0
+        root_level = logging.getLogger().level
+        logging.getLogger().setLevel(logging.INFO)
+        try:
+            with patch.object(moviescraper.Theater, '_get_soup', MagicMock(return_value=soup)):
+                theater.movies()
+        finally:
+            logging.getLogger().setLevel(root_level)
+        self.assertEqual(CountingSoup.formatted, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,12 @@
 #!/usr/local/bin/python3
 
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import patch
 from bs4 import BeautifulSoup
+import json
 import logging
 from moviescraper import moviescraper
+from moviescraper import metrics
 import os
 import shutil
 import tempfile
@@ -66,9 +68,10 @@ class TestTheater(unittest.TestCase):
 
         self.assertEqual(filtered_list, expected_filtered_list)
 
-    def test_generate_movie_list(self):
-        self.test_theater._get_soup = MagicMock()
-        self.test_theater._get_soup.return_value = BeautifulSoup(
+    # Theater is slotted, so _get_soup is patched on the class rather than the instance
+    @patch.object(moviescraper.Theater, '_get_soup')
+    def test_generate_movie_list(self, get_soup):
+        get_soup.return_value = BeautifulSoup(
             '''<html><body><div class="test_1"><div id="test_2">
             <span>Test Movie</span><span>Test Movie Two</span>
             </div></div></body></html>''', 'html.parser'
@@ -79,9 +82,9 @@ class TestTheater(unittest.TestCase):
         movie_list = self.test_theater._generate_movie_list()
         self.assertEqual(movie_list, ['Test Movie', 'Test Movie Two'])
 
-    def test_generate_movie_list_with_text_search(self):
-        self.test_theater._get_soup = MagicMock()
-        self.test_theater._get_soup.return_value = BeautifulSoup(
+    @patch.object(moviescraper.Theater, '_get_soup')
+    def test_generate_movie_list_with_text_search(self, get_soup):
+        get_soup.return_value = BeautifulSoup(
             '''<html><body><div class="test_1"><div id="test_2">\
             <span>Awesome Movies: Test Movie, Test Movie Two</span>\
             </div></div></body></html>''', 'html.parser'
@@ -214,6 +217,151 @@ class TestTheaterList(unittest.TestCase):
             }
         )
 
+        # Both theaters share one copy of each title, and the catalogue holds them by id
+        movies = self.test_theater_list.movies()
+        for one, two in zip(movies['Test Theater One'], movies['Test Theater Two']):
+            self.assertIs(one, two)
+        catalogue = self.test_theater_list.catalogue
+        self.assertEqual(catalogue.to_dict(), movies)
+        self.assertEqual(len(catalogue.titles), 3)
+        self.assertEqual(catalogue.theaters('Third Sample Movie'), ['Test Theater One', 'Test Theater Two'])
+
+        # Theaters keep their titles as rows of the catalogue rather than lists of their own,
+        # while movies() still hands out plain lists
+        self.assertIsInstance(test_theater_two.movie_list, moviescraper.catalogue.Row)
+        self.assertIsInstance(movies['Test Theater Two'], list)
+        self.assertIsInstance(test_theater_two.movies(), list)
+        self.assertEqual(json.loads(json.dumps(movies)), movies)
+        self.assertEqual(json.dumps(test_theater_two.movies()), json.dumps(movies['Test Theater Two']))
+        self.test_theater_list.remove_theater(test_theater_two)
+        self.assertEqual(catalogue.theater_names(), ['Test Theater One'])
+        self.assertEqual(test_theater_two.movie_list, movies['Test Theater Two'])
+        self.assertIsInstance(test_theater_two.movie_list, list)
+
+    def test_failed_theaters_left_out(self):
+        sample_site = os.path.join(os.path.dirname(__file__), 'sample_site.html')
+        for max_workers in (1, 4):
+            good = moviescraper.Theater(
+                site_url = sample_site, theater_name = 'Good Theater', list_selector = 'div#test-id > div.test-class > span'
+            )
+            misconfigured = moviescraper.Theater(
+                site_url = sample_site, theater_name = 'Misconfigured Theater',
+                list_selector = 'div#test-id > div.test-class > span', text_search = 'Now Playing: (.+)$'
+            )
+            missing = moviescraper.Theater(
+                site_url = os.path.join(os.path.dirname(__file__), 'missing.html'), theater_name = 'Missing Theater',
+                list_selector = 'span'
+            )
+            missing.movie_list = ['Earlier Movie']
+            theater_list = moviescraper.TheaterList()
+            for theater in (misconfigured, good, missing):
+                theater_list.add_theater(theater)
+
+            movies = theater_list.refresh(max_workers)
+            self.assertEqual(list(movies), ['Good Theater'], max_workers)
+            self.assertEqual(sorted(theater_list.errors), ['Misconfigured Theater', 'Missing Theater'])
+            self.assertIsInstance(theater_list.errors['Misconfigured Theater'], moviescraper.ScrapeError)
+            self.assertEqual(theater_list.catalogue.theater_names(), ['Good Theater'])
+            self.assertIsNone(misconfigured.movie_list)
+            self.assertEqual(missing.movie_list, ['Earlier Movie'])
+            self.assertEqual(len(theater_list.matches({'user': ['Sample']}, max_workers=max_workers)), 3)
+            self.assertNotIn('Missing Theater', theater_list.screenings())
+            self.assertEqual(list(theater_list.errors), ['Missing Theater'])
+
+    def test_theater_is_slotted(self):
+        theater = moviescraper.Theater(theater_name = 'Test Theater')
+        with self.assertRaises(AttributeError):
+            theater.movie_lst = []
+        self.assertFalse(hasattr(theater, '__dict__'))
+
+
+class TestChangeDetection(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.metrics = metrics.Metrics()
+        self.site_path = os.path.join(self.test_dir, 'site.html')
+        self.write_site(['First Movie', 'Second Movie'])
+        self.test_theater = moviescraper.Theater(
+            site_url = self.site_path, theater_name = 'Test Theater', list_selector = 'div#test-id > span',
+            metrics = self.metrics
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_site(self, movies):
+        with open(self.site_path, 'w') as html_file:
+            html_file.write('<div id="test-id">{}</div>'.format(''.join('<span>{}</span>'.format(movie) for movie in movies)))
+
+    def test_known_empty_is_not_rescraped(self):
+        self.assertIsNone(self.test_theater.movie_list)
+        self.write_site([])
+        self.assertEqual(self.test_theater.movies(), [])
+        self.write_site(['First Movie'])
+        self.assertEqual(self.test_theater.movies(), [])
+        self.assertEqual(self.metrics.counter('scrapes', 'Test Theater'), 1)
+
+    def test_refresh_skips_unchanged_page(self):
+        self.assertEqual(self.test_theater.movies(), ['First Movie', 'Second Movie'])
+        content_hash = self.test_theater.content_hash
+        self.assertIsNotNone(content_hash)
+        self.assertEqual(self.test_theater.refresh(), ['First Movie', 'Second Movie'])
+        self.assertEqual(self.test_theater.content_hash, content_hash)
+        self.assertEqual(self.metrics.counter('unchanged', 'Test Theater'), 1)
+        self.assertEqual(self.metrics.timing('fetch', 'Test Theater').count, 2)
+        self.assertEqual(self.metrics.timing('parse', 'Test Theater').count, 1)
+
+        self.write_site(['Third Movie'])
+        self.assertEqual(self.test_theater.refresh(), ['Third Movie'])
+        self.assertNotEqual(self.test_theater.content_hash, content_hash)
+        self.assertEqual(self.metrics.timing('parse', 'Test Theater').count, 2)
+
+    def test_refresh_after_filter_change(self):
+        self.test_theater.movies()
+        self.test_theater.movie_filter = ['Second']
+        self.assertEqual(self.test_theater.refresh(), ['Second Movie'])
+        self.assertEqual(self.metrics.counter('unchanged', 'Test Theater'), 0)
+
+    def test_failed_refresh_keeps_movie_list(self):
+        self.test_theater.movies()
+        os.remove(self.site_path)
+        with self.assertRaises(IOError):
+            self.test_theater.refresh()
+        self.assertEqual(self.test_theater.movie_list, ['First Movie', 'Second Movie'])
+        self.assertEqual(self.metrics.counter('errors', 'Test Theater'), 1)
+
+    def test_broken_text_search_is_not_known_empty(self):
+        self.test_theater.text_search = 'Now Playing: (.+)$'
+        with self.assertRaises(moviescraper.ScrapeError):
+            self.test_theater.movies()
+        self.assertIsNone(self.test_theater.movie_list)
+        self.assertIsNone(self.test_theater.content_hash)
+        self.assertEqual(self.metrics.counter('errors', 'Test Theater'), 1)
+
+    def test_content_hash_ignores_filter_order(self):
+        page = '<div id="test-id"><span>First Movie</span></div>'
+        self.test_theater.movie_filter = ['First', 'Second', 'Third']
+        content_hash = self.test_theater._content_hash(page)
+        self.test_theater.movie_filter = ['Third', 'First', 'Second']
+        self.assertEqual(self.test_theater._content_hash(page), content_hash)
+
+    def test_theater_list_refresh(self):
+        theater_list = moviescraper.TheaterList(metrics=self.metrics)
+        theater_list.add_theater(self.test_theater)
+        theater_list.movies()
+        self.assertEqual(theater_list.refresh(max_workers=2), {'Test Theater': ['First Movie', 'Second Movie']})
+        self.assertEqual(self.metrics.counter('unchanged', 'Test Theater'), 1)
+
+    def test_save_load_scrape_state(self):
+        self.test_theater.movies()
+        path = os.path.join(self.test_dir, 'test_theater.json')
+        self.test_theater._save_theater_info(path)
+        reloaded = moviescraper.Theater(filepath=path, metrics=self.metrics)
+        self.assertEqual(reloaded.movie_list, ['First Movie', 'Second Movie'])
+        self.assertEqual(reloaded.content_hash, self.test_theater.content_hash)
+        reloaded.refresh()
+        self.assertEqual(self.metrics.counter('unchanged', 'Test Theater'), 1)
+
 
 if __name__ == '__main__':
     unittest.main()
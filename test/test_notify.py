@@ -0,0 +1,182 @@
+#!/usr/local/bin/python3
+
+import unittest
+from unittest.mock import MagicMock
+import json
+import logging
+from moviescraper import matching, notify
+import os
+import shutil
+import sqlite3
+import tempfile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FailingSink(object):
+    def send(self, notifications):
+        raise IOError('sink unavailable')
+
+
+class TestNotifier(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = notify.WatchlistStore(os.path.join(self.test_dir, 'watchlists.db'))
+        self.store.add_user('alice', 'alice@example.com')
+        self.store.add_movies('alice', ['spider-man', 'Toy Story'])
+        self.store.add_movies('bob', ['Rocketman'])
+        self.sink = notify.MemorySink()
+        self.notifier = notify.Notifier(self.store, self.sink)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_watchlists(self):
+        self.assertEqual(self.store.user_filters(), {'alice': {'spider-man', 'Toy Story'}, 'bob': {'Rocketman'}})
+        self.store.remove_movies('alice', ['Toy Story'])
+        self.assertEqual(self.store.movies('alice'), {'spider-man'})
+        self.assertEqual(self.store.users(), {'alice': 'alice@example.com', 'bob': None})
+
+    def test_first_run_notifies(self):
+        notifications = self.notifier.run({
+            'Laurelhurst': ['Spider-Man: Far From Home', 'Yesterday'],
+            'Academy Theater': ['Spider-Man: Far From Home', 'Rocketman']
+        })
+        self.assertEqual(notifications, [
+            notify.Notification('alice', 'alice@example.com', [
+                matching.Match('alice', 'Spider-Man: Far From Home', ['Academy Theater', 'Laurelhurst'])
+            ]),
+            notify.Notification('bob', None, [matching.Match('bob', 'Rocketman', ['Academy Theater'])])
+        ])
+        self.assertEqual(self.sink.sent, notifications)
+
+    def test_only_new_showings_notified(self):
+        self.notifier.run({'Laurelhurst': ['Spider-Man: Far From Home']})
+        self.assertEqual(self.notifier.run({'Laurelhurst': ['Spider-Man: Far From Home']}), [])
+
+        notifications = self.notifier.run({
+            'Laurelhurst': ['Spider-Man: Far From Home', 'Toy Story 4'],
+            'Academy Theater': ['Spider-Man: Far From Home']
+        })
+        self.assertEqual(notifications[0].matches, [
+            matching.Match('alice', 'Spider-Man: Far From Home', ['Academy Theater']),
+            matching.Match('alice', 'Toy Story 4', ['Laurelhurst'])
+        ])
+
+    def test_returning_movie_not_notified_twice(self):
+        self.notifier.run({'Laurelhurst': ['Rocketman']})
+        self.notifier.run({'Laurelhurst': []})
+        self.assertEqual(self.notifier.run({'Laurelhurst': ['Rocketman']}), [])
+        self.assertEqual(len(self.sink.sent), 1)
+
+    def test_missing_theater_keeps_snapshot(self):
+        self.notifier.run({'Laurelhurst': ['Yesterday'], 'Academy Theater': ['Aladdin']})
+        self.notifier.run({'Laurelhurst': ['Yesterday']})
+        self.assertEqual(self.store.new_showings({'Academy Theater': ['Aladdin']}), {})
+
+    def test_failed_delivery_retried(self):
+        notifier = notify.Notifier(self.store, FailingSink())
+        with self.assertRaises(IOError):
+            notifier.run({'Laurelhurst': ['Rocketman']})
+        self.assertEqual(len(self.notifier.run({'Laurelhurst': ['Rocketman']})), 1)
+
+    def test_matcher_rebuilt_on_change(self):
+        self.notifier.run({'Laurelhurst': ['Yesterday']})
+        self.store.add_movies('bob', ['yesterday'])
+        self.notifier.run({'Laurelhurst': ['Yesterday'], 'Academy Theater': ['Yesterday']})
+        # Yesterday was already playing at Laurelhurst, but the filter is new
+        self.assertEqual(self.sink.sent[-1].matches, [
+            matching.Match('bob', 'Yesterday', ['Academy Theater', 'Laurelhurst'])
+        ])
+
+    def test_added_filter_matches_current_showings(self):
+        self.notifier.run({'Laurelhurst': ['Aladdin']})
+        self.store.add_movies('alice', ['aladdin'])
+        self.assertEqual(self.notifier.run({'Laurelhurst': ['Aladdin']})[0].matches, [
+            matching.Match('alice', 'Aladdin', ['Laurelhurst'])
+        ])
+        self.assertEqual(self.notifier.run({'Laurelhurst': ['Aladdin']}), [])
+
+    def test_filter_added_by_another_process(self):
+        self.notifier.run({'Laurelhurst': ['Aladdin']})
+        with notify.WatchlistStore(self.store.path) as other:
+            other.add_movies('bob', ['Aladdin'])
+        self.assertEqual(self.notifier.run({'Laurelhurst': ['Aladdin']})[0].matches, [
+            matching.Match('bob', 'Aladdin', ['Laurelhurst'])
+        ])
+
+    def test_added_filter_retried_after_failed_delivery(self):
+        self.notifier.run({'Laurelhurst': ['Aladdin']})
+        self.store.add_movies('alice', ['Aladdin'])
+        self.notifier.sink = FailingSink()
+        with self.assertRaises(IOError):
+            self.notifier.run({'Laurelhurst': ['Aladdin']})
+        self.notifier.sink = self.sink
+        self.assertEqual(len(self.notifier.run({'Laurelhurst': ['Aladdin']})), 1)
+
+    def test_fresh_notifier_per_run(self):
+        # As from cron: only filters added since the last delivered run see the whole catalogue
+        notify.Notifier(self.store, self.sink).run({'Laurelhurst': ['Aladdin', 'Rocketman']})
+        self.assertEqual(self.store.user_filters(self.store.last_run()), {})
+        self.store.add_movies('alice', ['aladdin'])
+        self.assertEqual(self.store.user_filters(self.store.last_run()), {'alice': {'aladdin'}})
+        self.assertEqual(notify.Notifier(self.store, self.sink).run({'Laurelhurst': ['Aladdin', 'Rocketman']})[0].matches, [
+            matching.Match('alice', 'Aladdin', ['Laurelhurst'])
+        ])
+        self.assertEqual(self.store.user_filters(self.store.last_run()), {})
+        self.assertEqual(notify.Notifier(self.store, self.sink).run({'Laurelhurst': ['Aladdin', 'Rocketman']}), [])
+
+    def test_migrate_from_version_1(self):
+        path = os.path.join(self.test_dir, 'old.db')
+        connection = sqlite3.connect(path)
+        connection.executescript(notify.MIGRATIONS[1] + 'PRAGMA user_version = 1;')
+        connection.execute("INSERT INTO users (user_id) VALUES ('carol')")
+        connection.execute("INSERT INTO watchlist VALUES ('carol', 'Parasite')")
+        connection.commit()
+        connection.close()
+        with notify.WatchlistStore(path) as old_store:
+            self.assertIsNone(old_store.last_run())
+            self.assertEqual(old_store.user_filters(old_store.last_run()), {'carol': {'Parasite'}})
+
+    def test_batches(self):
+        for x in range(5):
+            self.store.add_movies('user{}'.format(x), ['Aladdin'])
+        sink = MagicMock()
+        notifier = notify.Notifier(self.store, sink, batch_size=2)
+        notifier.run({'Laurelhurst': ['Aladdin']})
+        self.assertEqual([len(call[0][0]) for call in sink.send.call_args_list], [2, 2, 1])
+
+
+class TestSinks(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.notification = notify.Notification('alice', 'alice@example.com', [
+            matching.Match('alice', 'Toy Story 4', ['Academy Theater', 'Laurelhurst'])
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_file_sink(self):
+        path = os.path.join(self.test_dir, 'notifications.jsonl')
+        notify.FileSink(path).send([self.notification, self.notification])
+        with open(path) as sink_file:
+            lines = [json.loads(line) for line in sink_file]
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]['matches'][0]['title'], 'Toy Story 4')
+
+    def test_smtp_sink(self):
+        smtp = MagicMock()
+        smtp.__enter__.return_value = smtp
+        sink = notify.SMTPSink(smtp_factory=MagicMock(return_value=smtp))
+        sink.send([self.notification, notify.Notification('bob', None, [])])
+        self.assertEqual(smtp.send_message.call_count, 1)
+        message = smtp.send_message.call_args[0][0]
+        self.assertEqual(message['To'], 'alice@example.com')
+        self.assertIn('Toy Story 4 at Academy Theater, Laurelhurst', message.get_content())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+#!/usr/local/bin/python3
+
+import unittest
+import logging
+from moviescraper import onboard, store
+import json
+import os
+import shutil
+import tempfile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_SITE = os.path.join(os.path.dirname(__file__), 'sample_site.html')
+SAMPLE_SELECTOR = 'div#test-id > div.test-class > span'
+
+NAVIGATION_PAGE = '''<html><body>
+<nav id="menu"><ul><li><a href="/">Home</a></li><li><a href="/about">About</a></li>
+<li><a href="/tickets">Tickets</a></li><li><a href="/contact">Contact</a></li></ul></nav>
+<div id="schedule">
+  <div class="film"><h3 class="title">Parasite</h3><ul class="times"><li>7:00pm</li><li>9:30pm</li></ul></div>
+  <div class="film"><h3 class="title">Knives Out</h3><ul class="times"><li>7:00pm</li><li>9:30pm</li></ul></div>
+  <div class="film"><h3 class="title">Little Women</h3><ul class="times"><li>6:45pm</li></ul></div>
+</div>
+</body></html>'''
+
+LABELLED_PAGE = '''<html><body>
+<section id="nowplaying"><div class="section-inner"><div class="section-content">
+<p><span>Now Playing: Toy Story 4, The Lion King, Yesterday</span></p>
+<p><span>Showtimes 5:30 and 8:00</span></p>
+</div></div></section>
+</body></html>'''
+
+EMPTY_PAGE = '<html><body><p>Closed for renovation</p></body></html>'
+
+
+class TestDiscover(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_page(self, markup, name = 'page.html'):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'w') as page_file:
+            page_file.write(markup)
+        return path
+
+    def test_title_like(self):
+        self.assertTrue(onboard.title_like('The Lion King'))
+        self.assertTrue(onboard.title_like('  1917 '))
+        for text in ('Home', 'Buy Tickets', '7:00pm', '9:30 p.m.', '$12.50', '10/31/2019', 'PG-13', 'Saturday', ''):
+            self.assertFalse(onboard.title_like(text), text)
+        self.assertFalse(onboard.title_like('word ' * 20))
+
+    def test_titles_starting_with_day_names(self):
+        for text in ('Monster', 'Thunderbolts', 'Frida', 'Sunshine', 'Saturn 3', 'Sun Valley 12'):
+            self.assertTrue(onboard.title_like(text), text)
+        for text in ('Mon', 'Tues.', 'Wednesday', 'Thurs', 'Sat, Oct 12', 'Sunday 10/13'):
+            self.assertFalse(onboard.title_like(text), text)
+
+    def test_sample_site(self):
+        with open(SAMPLE_SITE) as sample_file:
+            proposals = onboard.discover(sample_file.read())
+        self.assertEqual(proposals[0].list_selector, SAMPLE_SELECTOR)
+        self.assertIsNone(proposals[0].text_search)
+        self.assertEqual(len(proposals[0].movies), 3)
+
+    def test_prefers_titles_over_navigation_and_times(self):
+        proposals = onboard.discover(NAVIGATION_PAGE)
+        best = proposals[0]
+        self.assertEqual(best.list_selector, 'div#schedule > div.film > h3.title')
+        self.assertEqual(best.movies, ['Parasite', 'Knives Out', 'Little Women'])
+        scores = dict((proposal.list_selector, proposal.score) for proposal in proposals)
+        self.assertLess(scores.get('nav#menu > ul > li > a', 0), best.score)
+        self.assertLess(scores.get('div#schedule > div.film > ul.times > li', 0), best.score)
+
+    def test_labelled_list(self):
+        best = onboard.discover(LABELLED_PAGE)[0]
+        self.assertEqual(best.text_search, r'Now\ Playing: (.+)$')
+        self.assertIn(':nth-of-type(1)', best.list_selector)
+        self.assertEqual(best.movies, ['Toy Story 4', 'The Lion King', 'Yesterday'])
+
+        movies, error = onboard.validate(
+            {'theater_name': 'Lake', 'site_url': 'unused', 'list_selector': best.list_selector,
+             'text_search': best.text_search}, self.write_page(LABELLED_PAGE)
+        )
+        self.assertIsNone(error)
+        self.assertEqual(movies, ['The Lion King', 'Toy Story 4', 'Yesterday'])
+
+    def test_nothing_to_propose(self):
+        self.assertEqual(onboard.discover(EMPTY_PAGE), [])
+
+
+class TestOnboard(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.pages = []
+        for name, markup in (('film_house', NAVIGATION_PAGE), ('lake_theater', LABELLED_PAGE),
+                             ('closed_cinema', EMPTY_PAGE)):
+            path = os.path.join(self.test_dir, name + '.html')
+            with open(path, 'w') as page_file:
+                page_file.write(markup)
+            self.pages.append(onboard.Page(onboard.page_name(path), 'https://{}.example/'.format(name), path))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_validate(self):
+        theater_info = {'theater_name': 'Sample', 'site_url': 'unused', 'list_selector': SAMPLE_SELECTOR}
+        movies, error = onboard.validate(theater_info, SAMPLE_SITE)
+        self.assertIsNone(error)
+        self.assertEqual(len(movies), 3)
+
+        movies, error = onboard.validate(dict(theater_info, list_selector='div#missing > span'), SAMPLE_SITE)
+        self.assertEqual(movies, [])
+        self.assertIsNotNone(error)
+
+        movies, error = onboard.validate(dict(theater_info, text_search='Now Playing: (.+)$'), SAMPLE_SITE)
+        self.assertEqual(movies, [])
+        self.assertIn('ScrapeError', error)
+
+        movies, error = onboard.validate(theater_info, SAMPLE_SITE, min_movies=5)
+        self.assertEqual(len(movies), 3)
+        self.assertIn('at least 5', error)
+
+    def test_validate_configs(self):
+        theater_info = {'theater_name': 'Sample', 'site_url': 'unused', 'list_selector': SAMPLE_SELECTOR}
+        results = onboard.validate_configs(
+            [theater_info, dict(theater_info, list_selector='div#missing > span')], [SAMPLE_SITE, SAMPLE_SITE],
+            processes=2
+        )
+        self.assertIsNone(results[0][1])
+        self.assertIsNotNone(results[1][1])
+
+    def test_onboard_and_save(self):
+        results = list(onboard.onboard(self.pages, processes=2))
+        self.assertEqual([result.page for result in results], self.pages)
+
+        film_house, lake, closed = results
+        self.assertIsNone(film_house.error)
+        self.assertEqual(film_house.config['theater_name'], 'Film House')
+        self.assertEqual(film_house.config['site_url'], 'https://film_house.example/')
+        self.assertEqual(film_house.movies, ['Knives Out', 'Little Women', 'Parasite'])
+        self.assertIsNone(lake.error)
+        self.assertIn('text_search', lake.config)
+        self.assertIsNone(closed.config)
+        self.assertIsNotNone(closed.error)
+
+        with store.TheaterStore(os.path.join(self.test_dir, 'theaters.db')) as theater_store:
+            self.assertEqual(onboard.save(theater_store, results), 2)
+            self.assertEqual(sorted(theater_store.theater_names()), ['Film House', 'Lake Theater'])
+            saved = dict((theater_info['theater_name'], theater_info) for theater_info in theater_store.load_config())
+            self.assertEqual(saved['Lake Theater']['text_search'], lake.config['text_search'])
+
+    def test_missing_page(self):
+        result = onboard.onboard_page(onboard.Page('Gone', 'https://gone.example/', os.path.join(self.test_dir, 'x')))
+        self.assertIsNone(result.config)
+        self.assertIsNotNone(result.error)
+
+    def test_read_batch(self):
+        batch_path = os.path.join(self.test_dir, 'batch.json')
+        with open(batch_path, 'w') as batch_file:
+            json.dump([{'theater_name': 'Lake', 'site_url': 'https://lake.example/', 'page': 'lake_theater.html'}],
+                      batch_file)
+        self.assertEqual(onboard.read_batch(batch_path), [
+            onboard.Page('Lake', 'https://lake.example/', os.path.join(self.test_dir, 'lake_theater.html'))
+        ])
+
+    def test_main(self):
+        store_path = os.path.join(self.test_dir, 'theaters.db')
+        arguments = ['--processes', '1', store_path] + [page.path for page in self.pages]
+        for page in self.pages:
+            arguments.extend(['--url', page.site_url])
+        onboard.main(arguments)
+        with store.TheaterStore(store_path) as theater_store:
+            self.assertEqual(sorted(theater_store.theater_names()), ['Film House', 'Lake Theater'])
+            saved = dict((theater_info['theater_name'], theater_info['site_url']) for theater_info in theater_store.load_config())
+        self.assertEqual(saved['Film House'], 'https://film_house.example/')
+
+    def test_main_requires_urls_to_save(self):
+        store_path = os.path.join(self.test_dir, 'theaters.db')
+        paths = [page.path for page in self.pages]
+        with self.assertRaises(SystemExit):
+            onboard.main(['--processes', '1', store_path] + paths)
+        with self.assertRaises(SystemExit):
+            onboard.main(['--processes', '1', store_path, '--url', 'https://film_house.example/'] + paths)
+        onboard.main(['--processes', '1', '--dry-run', store_path] + paths)
+        self.assertFalse(os.path.exists(store_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/local/bin/python3
+
+import unittest
+import asyncio
+import logging
+from moviescraper import moviescraper, parallel
+import os
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_SITE = os.path.join(os.path.dirname(__file__), 'sample_site.html')
+
+
+class FakeTheater(object):
+    # Stands in for Theater, recording how many scrapes run at once per host
+    active = {}
+    peak = {}
+    total_peak = 0
+    lock = threading.Lock()
+
+    def __init__(self, site_url, theater_name, delay = 0.02, error = None):
+        self.site_url = site_url
+        self.theater_name = theater_name
+        self.delay = delay
+        self.error = error
+
+    def movies(self):
+        host = parallel.theater_host(self)
+        with FakeTheater.lock:
+            FakeTheater.active[host] = FakeTheater.active.get(host, 0) + 1
+            FakeTheater.peak[host] = max(FakeTheater.peak.get(host, 0), FakeTheater.active[host])
+            FakeTheater.total_peak = max(FakeTheater.total_peak, sum(FakeTheater.active.values()))
+        try:
+            time.sleep(self.delay)
+            if self.error:
+                raise self.error
+            return [self.theater_name + ' Movie']
+        finally:
+            with FakeTheater.lock:
+                FakeTheater.active[host] -= 1
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        FakeTheater.active = {}
+        FakeTheater.peak = {}
+        FakeTheater.total_peak = 0
+        self.theaters = [
+            FakeTheater('http://one.example.com/{}'.format(x), 'One {}'.format(x)) for x in range(6)
+        ] + [
+            FakeTheater('http://two.example.com/{}'.format(x), 'Two {}'.format(x)) for x in range(6)
+        ]
+
+    def test_scrape_threaded_per_host_limit(self):
+        results = list(parallel.scrape_threaded(self.theaters, max_workers=8, per_host_limit=2))
+        self.assertEqual(len(results), 12)
+        self.assertEqual(FakeTheater.peak, {'one.example.com': 2, 'two.example.com': 2})
+
+    def test_scrape_threaded_max_workers(self):
+        theaters = [FakeTheater('http://host{}.example.com/'.format(x), str(x)) for x in range(8)]
+        list(parallel.scrape_threaded(theaters, max_workers=3, per_host_limit=2))
+        self.assertEqual(FakeTheater.total_peak, 3)
+
+    def test_scrape_threaded_streams_results(self):
+        slow = FakeTheater('http://slow.example.com/', 'Slow', delay=0.5)
+        fast = FakeTheater('http://fast.example.com/', 'Fast', delay=0)
+        results = parallel.scrape_threaded([slow, fast], max_workers=2)
+        self.assertEqual(next(results).theater.theater_name, 'Fast')
+        self.assertEqual(next(results).theater.theater_name, 'Slow')
+
+    def test_scrape_threaded_failing_site(self):
+        broken = FakeTheater('http://broken.example.com/', 'Broken', error=ValueError('boom'))
+        results = {
+            result.theater.theater_name: result
+            for result in parallel.scrape_threaded([broken] + self.theaters[:2])
+        }
+        self.assertEqual(results['Broken'].movies, [])
+        self.assertIsInstance(results['Broken'].error, ValueError)
+        self.assertEqual(results['One 0'].movies, ['One 0 Movie'])
+        self.assertIsNone(results['One 1'].error)
+
+    def test_scrape_async(self):
+        async def collect():
+            return [result async for result in parallel.scrape_async(self.theaters, max_workers=8, per_host_limit=3)]
+
+        results = asyncio.run(collect())
+        self.assertEqual(
+            sorted(result.theater.theater_name for result in results),
+            sorted(theater.theater_name for theater in self.theaters)
+        )
+        self.assertEqual(FakeTheater.peak, {'one.example.com': 3, 'two.example.com': 3})
+
+
+class TestTheaterListConcurrent(unittest.TestCase):
+    def setUp(self):
+        self.test_theater_list = moviescraper.TheaterList([
+            {
+                'site_url': SAMPLE_SITE,
+                'theater_name': 'Test Theater {}'.format(x),
+                'list_selector': 'div#test-id > div.test-class > span'
+            } for x in range(4)
+        ])
+
+    def test_movies_concurrent(self):
+        expected = ['First Sample Movie', 'Second Sample Movie: The Return', 'Third Sample Movie']
+        movies = self.test_theater_list.movies(max_workers=4)
+        self.assertEqual(list(movies), self.test_theater_list.list_theaters())
+        for theater_movies in movies.values():
+            self.assertEqual(theater_movies, expected)
+
+    def test_iter_movies_async(self):
+        async def collect():
+            return [result async for result in self.test_theater_list.iter_movies_async(max_workers=2)]
+
+        results = asyncio.run(collect())
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(result.error is None for result in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
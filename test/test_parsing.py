@@ -0,0 +1,82 @@
+#!/usr/local/bin/python3
+
+import unittest
+import logging
+from moviescraper import moviescraper
+from moviescraper import parsing
+import os
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_SITE = os.path.join(os.path.dirname(__file__), 'sample_site.html')
+SAMPLE_MOVIES = ['First Sample Movie', 'Second Sample Movie: The Return', 'Third Sample Movie']
+
+
+class TestParsing(unittest.TestCase):
+    def test_selector_strainer(self):
+        self.assertIsNotNone(parsing.selector_strainer('div#test-id > div.test-class > span'))
+        self.assertIsNotNone(parsing.selector_strainer('a.a1title > b'))
+        self.assertIsNotNone(parsing.selector_strainer('#nowplaying span'))
+        self.assertIsNone(parsing.selector_strainer('div.one.two > span'))
+        self.assertIsNone(parsing.selector_strainer('li:nth-child(2) > a'))
+        self.assertIsNone(parsing.selector_strainer('div > span, p > b'))
+        self.assertIsNone(parsing.selector_strainer('[data-title]'))
+        self.assertIsNone(parsing.selector_strainer('h2.now + ul > li'))
+        self.assertIsNone(parsing.selector_strainer('h2.now ~ ul > li'))
+
+    def test_strainer_with_sibling_combinator(self):
+        markup = '<h2 class="now">Now Playing</h2><ul><li>A</li><li>B</li></ul>'
+        for parser in (parsing.HTML_PARSER, parsing.STRAINER):
+            soup = parsing.make_soup(markup, parser, 'h2.now + ul > li')
+            self.assertEqual([li.string for li in parsing.select(soup, 'h2.now + ul > li')], ['A', 'B'], parser)
+
+    def test_strainer_builds_only_matching_subtree(self):
+        with open(SAMPLE_SITE) as html_file:
+            soup = parsing.make_soup(html_file, parsing.STRAINER, 'div#test-id > div.test-class > span')
+        self.assertIsNone(soup.title)
+        self.assertEqual(
+            [span.string for span in parsing.select(soup, 'div#test-id > div.test-class > span')],
+            ['First Sample Movie', '  Second Sample Movie: The Return // Other Details', 'Third Sample Movie  ']
+        )
+
+    def test_strainer_matches_one_of_several_classes(self):
+        soup = parsing.make_soup(
+            '<div class="board wide"><a>Movie</a></div><div class="board-x"><a>Other</a></div>',
+            parsing.STRAINER, 'div.board > a'
+        )
+        self.assertEqual([a.string for a in parsing.select(soup, 'div.board > a')], ['Movie'])
+        self.assertNotIn('Other', str(soup))
+
+    def test_compile_selector_cached(self):
+        self.assertIs(parsing.compile_selector('div > span'), parsing.compile_selector('div > span'))
+
+    def test_unknown_parser(self):
+        with self.assertRaises(ValueError):
+            parsing.make_soup('<p></p>', 'html5')
+
+    def test_lxml_fallback(self):
+        soup = parsing.make_soup('<p>Movie</p>', parsing.LXML)
+        self.assertEqual(soup.p.string, 'Movie')
+
+
+class TestTheaterParsers(unittest.TestCase):
+    def test_movies_with_each_parser(self):
+        for parser in parsing.PARSERS:
+            theater = moviescraper.Theater(
+                site_url = SAMPLE_SITE, theater_name = 'Test Theater',
+                list_selector = 'div#test-id > div.test-class > span', parser = parser
+            )
+            self.assertEqual(theater.movies(), SAMPLE_MOVIES, parser)
+
+    def test_theater_list_parser(self):
+        theater_list = moviescraper.TheaterList([{
+            'site_url': SAMPLE_SITE, 'theater_name': 'Test Theater',
+            'list_selector': 'div#test-id > div.test-class > span'
+        }], parser=parsing.STRAINER)
+        self.assertEqual(theater_list.theater_list[0].parser, parsing.STRAINER)
+        self.assertEqual(theater_list.movies(), {'Test Theater': SAMPLE_MOVIES})
+
+
+if __name__ == '__main__':
+    unittest.main()
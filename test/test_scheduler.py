@@ -0,0 +1,199 @@
+#!/usr/local/bin/python3
+
+import unittest
+import logging
+from moviescraper import scheduler, store
+import os
+import random
+import shutil
+import tempfile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_SITE = os.path.join(os.path.dirname(__file__), 'sample_site.html')
+SAMPLE_SELECTOR = 'div#test-id > div.test-class > span'
+
+
+class FakeClock(object):
+    def __init__(self, now = 1000000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_theater(name, site_url = SAMPLE_SITE, **options):
+    theater_info = {'theater_name': name, 'site_url': site_url, 'list_selector': SAMPLE_SELECTOR}
+    theater_info.update(options)
+    return theater_info
+
+
+class TestScrapeQueue(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.clock = FakeClock()
+        self.queue = scheduler.ScrapeQueue(
+            os.path.join(self.test_dir, 'queue.db'), host_delay = 10, clock = self.clock, rng = random.Random(1)
+        )
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_schedule_spreads_new_jobs(self):
+        self.queue.schedule([make_theater('Theater {}'.format(x), refresh_interval = 1000) for x in range(20)])
+        next_runs = [job['next_run'] - self.clock.now for job in self.queue.jobs()]
+        self.assertTrue(all(0 <= delay <= 100 for delay in next_runs))
+        self.assertGreater(len(set(next_runs)), 1)
+        self.assertEqual(self.queue.jobs()[0]['refresh_interval'], 1000)
+
+    def test_claim_and_complete(self):
+        self.queue.schedule([make_theater('Theater One', 'http://one.com/', refresh_interval = 1000)])
+        self.assertIsNone(self.queue.claim('worker'))
+        self.clock.now += 100
+        job = self.queue.claim('worker')
+        self.assertEqual(job, scheduler.Job('Theater One', 'one.com', 1000, 0))
+        self.assertIsNone(self.queue.claim('other worker'))
+        self.assertTrue(self.queue.complete(job, 'worker'))
+        next_run = self.queue.jobs()[0]['next_run'] - self.clock.now
+        self.assertTrue(900 <= next_run <= 1100, next_run)
+
+    def test_host_rate_limit(self):
+        self.queue.schedule([make_theater('Theater {}'.format(x), 'http://same.com/{}'.format(x)) for x in range(2)]
+                            + [make_theater('Elsewhere', 'http://other.com/')])
+        self.clock.now += scheduler.DEFAULT_REFRESH_INTERVAL
+        first = self.queue.claim('worker')
+        self.queue.complete(first, 'worker')
+        second = self.queue.claim('worker')
+        self.assertEqual(second.host, 'other.com')
+        self.assertIsNone(self.queue.claim('worker'))
+        self.clock.now += 10
+        self.assertEqual(self.queue.claim('worker').host, 'same.com')
+
+        self.queue.set_host_delay('same.com', 100)
+        self.queue.schedule([make_theater('Theater 2', 'http://same.com/2')])
+        self.clock.now += scheduler.DEFAULT_REFRESH_INTERVAL
+        self.assertIsNotNone(self.queue.claim('worker'))
+
+    def test_per_host_limit(self):
+        self.queue.host_delay = 0
+        self.queue.schedule([make_theater('Theater {}'.format(x), 'http://same.com/{}'.format(x)) for x in range(3)])
+        self.clock.now += scheduler.DEFAULT_REFRESH_INTERVAL
+        self.assertIsNotNone(self.queue.claim('worker'))
+        self.assertIsNone(self.queue.claim('worker'))
+        self.queue.per_host_limit = 2
+        self.assertIsNotNone(self.queue.claim('worker'))
+        self.assertIsNone(self.queue.claim('worker'))
+
+    def test_backoff(self):
+        self.queue.schedule([make_theater('Theater One', 'http://one.com/')])
+        delays = []
+        for _ in range(4):
+            self.clock.now = self.queue.next_due() + 10
+            job = self.queue.claim('worker')
+            self.queue.fail(job, 'worker', IOError('down'))
+            delays.append(self.queue.next_due() - self.clock.now)
+        self.assertEqual(self.queue.jobs()[0]['failures'], 4)
+        self.assertEqual(self.queue.jobs()[0]['last_error'], "OSError('down')")
+        for attempt, delay in enumerate(delays):
+            expected = scheduler.DEFAULT_BACKOFF * 2 ** attempt
+            self.assertTrue(expected * 0.9 <= delay <= expected * 1.1, delays)
+
+        self.clock.now = self.queue.next_due() + 10
+        self.queue.complete(self.queue.claim('worker'), 'worker')
+        self.assertEqual(self.queue.jobs()[0]['failures'], 0)
+
+    def test_expired_lease(self):
+        self.queue.schedule([make_theater('Theater One', 'http://one.com/')])
+        self.clock.now += scheduler.DEFAULT_REFRESH_INTERVAL
+        job = self.queue.claim('crashed worker')
+        self.clock.now += scheduler.DEFAULT_LEASE_TIMEOUT
+        self.assertEqual(self.queue.claim('worker').theater_name, 'Theater One')
+        self.assertFalse(self.queue.complete(job, 'crashed worker'))
+        self.assertTrue(self.queue.complete(job, 'worker'))
+
+    def test_sync(self):
+        self.queue.schedule([make_theater('Removed Theater')])
+        with store.TheaterStore(os.path.join(self.test_dir, 'theaters.db')) as theater_store:
+            theater_store.import_config([make_theater('Theater One'), make_theater('Theater Two')])
+            self.assertEqual(self.queue.sync(theater_store), 2)
+        self.assertEqual([job['theater_name'] for job in self.queue.jobs()], ['Theater One', 'Theater Two'])
+
+
+class TestWorker(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.clock = FakeClock()
+        self.queue_path = os.path.join(self.test_dir, 'queue.db')
+        self.store_path = os.path.join(self.test_dir, 'theaters.db')
+        self.queue = scheduler.ScrapeQueue(self.queue_path, host_delay = 0, clock = self.clock)
+        self.store = store.TheaterStore(self.store_path)
+        self.store.import_config([
+            make_theater('Theater One', refresh_interval = 600),
+            make_theater('Missing Theater', os.path.join(self.test_dir, 'missing.html')),
+            make_theater('Theater Two', refresh_interval = 600)
+        ])
+        self.queue.sync(self.store)
+        self.worker = scheduler.Worker(self.queue, self.store, 'worker', sleep = self.clock.sleep)
+
+    def tearDown(self):
+        self.queue.close()
+        self.store.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_failures_do_not_block_others(self):
+        self.clock.now += scheduler.DEFAULT_REFRESH_INTERVAL
+        self.assertEqual(self.worker.run(exit_when_idle=True), 3)
+        lists = self.store.movie_lists()
+        self.assertEqual(sorted(lists), ['Theater One', 'Theater Two'])
+        self.assertEqual(len(lists['Theater One']), 3)
+        jobs = dict((job['theater_name'], job) for job in self.queue.jobs())
+        self.assertEqual(jobs['Missing Theater']['failures'], 1)
+        self.assertEqual(jobs['Theater One']['failures'], 0)
+
+    def test_exit_when_idle_waits_for_rate_limit(self):
+        self.queue.set_host_delay('', 60)
+        self.clock.now += scheduler.DEFAULT_REFRESH_INTERVAL
+        start = self.clock.now
+        # The missing theater's retry can come due while the others wait, so count at least 3
+        self.assertGreaterEqual(self.worker.run(exit_when_idle=True), 3)
+        self.assertGreaterEqual(self.clock.now - start, 120)
+        self.assertEqual(sorted(self.store.movie_lists()), ['Theater One', 'Theater Two'])
+
+    def test_run_until(self):
+        self.clock.now += scheduler.DEFAULT_REFRESH_INTERVAL
+        until = self.clock.now + 1800
+        # Two theaters every ~10 minutes, plus the missing one backing off from 1 minute
+        done = self.worker.run(until=until, idle_wait=30)
+        self.assertGreaterEqual(done, 9)
+        self.assertGreaterEqual(self.clock.now, until)
+        jobs = dict((job['theater_name'], job) for job in self.queue.jobs())
+        self.assertGreaterEqual(jobs['Missing Theater']['failures'], 4)
+
+
+class TestRunWorkers(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_process_pool(self):
+        queue_path = os.path.join(self.test_dir, 'queue.db')
+        store_path = os.path.join(self.test_dir, 'theaters.db')
+        with store.TheaterStore(store_path) as theater_store, scheduler.ScrapeQueue(queue_path, jitter = 0) as queue:
+            theater_store.import_config([make_theater('Theater {}'.format(x)) for x in range(6)])
+            queue.sync(theater_store)
+        done = scheduler.run_workers(queue_path, store_path, processes = 2,
+                                     queue_options = {'host_delay': 0, 'per_host_limit': 6}, exit_when_idle = True)
+        self.assertEqual(done, 6)
+        with store.TheaterStore(store_path) as theater_store:
+            self.assertEqual(len(theater_store.movie_lists()), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
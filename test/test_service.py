@@ -0,0 +1,239 @@
+#!/usr/local/bin/python3
+
+import unittest
+import asyncio
+import json
+import logging
+from moviescraper import notify, service, store
+import os
+import shutil
+import tempfile
+import threading
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+THEATER_MOVIES = {
+    'Theater One': ['Spider-Man: Far From Home', 'Amélie', 'Toy Story 4'],
+    'Theater Two': ['Spider-man - Far from Home', 'The Lion King'],
+}
+USER_FILTERS = {'alice': ['spider'], 'bob': ['amelie', 'lion']}
+
+
+def make_config(names):
+    return [
+        {'theater_name': name, 'site_url': 'http://{}.com/'.format(name.replace(' ', '')), 'list_selector': 'span'}
+        for name in names
+    ]
+
+
+async def get(port, paths, headers = ''):
+    # Sends every request on one keep-alive connection and returns [(status, body)]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    responses = []
+    try:
+        for path in paths:
+            writer.write('GET {} HTTP/1.1\r\nHost: localhost\r\n{}\r\n'.format(path, headers).encode('latin-1'))
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = None
+            while True:
+                line = await reader.readline()
+                if line == b'\r\n':
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            responses.append((status, json.loads(await reader.readexactly(length))))
+    finally:
+        writer.close()
+    return responses
+
+
+class TestQueryIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = service.QueryIndex(
+            THEATER_MOVIES, USER_FILTERS, {'Theater One': 100.0, 'Theater Two': 200.0}, built_at = 300.0
+        )
+
+    def test_where(self):
+        self.assertEqual(self.index.where('spider man far from home'), [
+            {'title': 'Spider-Man: Far From Home', 'theaters': ['Theater One', 'Theater Two']}
+        ])
+        self.assertEqual(self.index.where('Lion'), [{'title': 'The Lion King', 'theaters': ['Theater Two']}])
+        self.assertEqual(self.index.where('Jaws'), [])
+        self.assertEqual(self.index.where('!!'), [])
+
+    def test_new_since(self):
+        self.assertEqual(len(self.index.new_since(0)), 5)
+        self.assertEqual(
+            [(showing['title'], showing['theater']) for showing in self.index.new_since(150)],
+            [('The Lion King', 'Theater Two'), ('Spider-man - Far from Home', 'Theater Two')]
+        )
+
+        movies = dict(THEATER_MOVIES)
+        movies['Theater One'] = movies['Theater One'] + ['Parasite']
+        reloaded = service.QueryIndex(movies, None, {'Theater One': 400.0, 'Theater Two': 400.0}, self.index)
+        self.assertEqual(reloaded.version, 2)
+        self.assertEqual(reloaded.new_since(200), [{'first_seen': 400.0, 'title': 'Parasite', 'theater': 'Theater One'}])
+
+    def test_matches(self):
+        self.assertEqual(self.index.matches('alice'), [
+            {'title': 'Spider-Man: Far From Home', 'theaters': ['Theater One', 'Theater Two']}
+        ])
+        self.assertEqual([match['title'] for match in self.index.matches('bob')], ['Amélie', 'The Lion King'])
+        with self.assertRaises(service.QueryError):
+            self.index.matches('carol')
+
+    def test_respond(self):
+        status, body = self.index.respond('/movies')
+        self.assertEqual(status, 200)
+        self.assertEqual(len(json.loads(body)['movies']), 4)
+        self.assertIs(self.index.respond('/movies')[1], body)
+        self.assertEqual(json.loads(self.index.respond('/users/alice/matches')[1])['user'], 'alice')
+        self.assertEqual(self.index.respond('/users/carol/matches')[0], 404)
+        self.assertEqual(self.index.respond('/new')[0], 400)
+        self.assertEqual(self.index.respond('/new', {'since': 'yesterday'})[0], 400)
+        self.assertEqual(self.index.respond('/new', {'since': 'nan'})[0], 400)
+        self.assertEqual(json.loads(self.index.respond('/new', {'since': '1970-01-01T00:02:30'})[1])['since'], 150.0)
+        self.assertEqual(self.index.respond('/elsewhere')[0], 404)
+        self.assertEqual(json.loads(self.index.respond('/status')[1])['theaters'], 2)
+
+
+class TestQueryService(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store_path = os.path.join(self.test_dir, 'theaters.db')
+        self.watchlist_path = os.path.join(self.test_dir, 'watchlists.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_concurrent_clients(self):
+        async def run():
+            query_service = await service.QueryService(port = 0).start()
+            query_service.publish(THEATER_MOVIES, USER_FILTERS)
+            try:
+                paths = ['/movies', '/movies?title=toy%20story%204', '/users/bob/matches', '/status']
+                return await asyncio.gather(*[get(query_service.port, paths) for _ in range(50)])
+            finally:
+                await query_service.close()
+
+        for responses in asyncio.run(run()):
+            self.assertEqual([status for status, body in responses], [200, 200, 200, 200])
+            self.assertEqual(responses[1][1]['matches'], [{'title': 'Toy Story 4', 'theaters': ['Theater One']}])
+            self.assertEqual(len(responses[2][1]['matches']), 2)
+
+    def test_connection_close_and_bad_requests(self):
+        async def run():
+            query_service = await service.QueryService(port = 0).start()
+            try:
+                closed = await get(query_service.port, ['/status'], 'Connection: close\r\n')
+                reader, writer = await asyncio.open_connection('127.0.0.1', query_service.port)
+                writer.write(b'POST /movies HTTP/1.1\r\n\r\nGARBAGE\r\n\r\n')
+                await writer.drain()
+                responses = await reader.read()
+                writer.close()
+                return closed, responses
+            finally:
+                await query_service.close()
+
+        closed, responses = asyncio.run(run())
+        self.assertEqual(closed[0][0], 200)
+        self.assertTrue(responses.startswith(b'HTTP/1.1 405 Method Not Allowed\r\n'))
+        self.assertIn(b'HTTP/1.1 400 Bad Request\r\n', responses)
+
+    def test_reload_is_atomic(self):
+        # Requests keep getting the old index while the next one is being built
+        building = threading.Event()
+        release = threading.Event()
+
+        class SlowLoader(object):
+            loads = 0
+
+            def data_version(self):
+                return self.loads
+
+            def load(self, previous = None):
+                self.loads += 1
+                if self.loads > 1:
+                    building.set()
+                    release.wait(5)
+                return service.QueryIndex(THEATER_MOVIES, USER_FILTERS, previous = previous)
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            query_service = await service.QueryService(SlowLoader(), port = 0, reload_interval = 0).start()
+            try:
+                reload = asyncio.ensure_future(query_service.reload())
+                await loop.run_in_executor(None, building.wait, 5)
+                during = await get(query_service.port, ['/status'])
+                release.set()
+                await reload
+                after = await get(query_service.port, ['/status'])
+                return during, after
+            finally:
+                release.set()
+                await query_service.close()
+
+        during, after = asyncio.run(run())
+        self.assertEqual(after[0][1]['version'], during[0][1]['version'] + 1)
+
+    def test_store_loader_hot_reload(self):
+        with store.TheaterStore(self.store_path) as theater_store, notify.WatchlistStore(self.watchlist_path) as watchlists:
+            theater_store.import_config(make_config(THEATER_MOVIES))
+            watchlists.add_movies('alice', ['spider'])
+
+            async def run():
+                loader = service.StoreLoader(self.store_path, self.watchlist_path)
+                query_service = await service.QueryService(loader, port = 0, reload_interval = 0.02).start()
+                try:
+                    before = await get(query_service.port, ['/movies', '/users/alice/matches'])
+                    loaded_version = query_service.index.version
+                    theaters = theater_store.load_theaters()
+                    for theater in theaters:
+                        theater.movie_list = THEATER_MOVIES[theater.theater_name]
+                    theater_store.save_movie_lists(theaters, scraped_at = 500.0)
+                    for _ in range(100):
+                        if query_service.index.version > loaded_version:
+                            break
+                        await asyncio.sleep(0.02)
+                    after = await get(query_service.port, ['/movies', '/users/alice/matches', '/new?since=499'])
+                    return before, after
+                finally:
+                    await query_service.close()
+                    loader.close()
+
+            before, after = asyncio.run(run())
+        self.assertEqual(before[0][1]['movies'], {})
+        self.assertEqual(before[1][1]['matches'], [])
+        self.assertEqual(len(after[0][1]['movies']), 4)
+        self.assertEqual(after[1][1]['matches'][0]['theaters'], ['Theater One', 'Theater Two'])
+        self.assertEqual(len(after[2][1]['showings']), 5)
+
+    def test_store_loader_restart_keeps_first_seen(self):
+        with store.TheaterStore(self.store_path) as theater_store:
+            theater_store.import_config(make_config(THEATER_MOVIES))
+            theaters = theater_store.load_theaters()
+            for theater in theaters:
+                theater.movie_list = THEATER_MOVIES[theater.theater_name][:1]
+            theater_store.save_movie_lists(theaters, scraped_at = 100.0)
+            for theater in theaters:
+                theater.movie_list = THEATER_MOVIES[theater.theater_name]
+            theater_store.save_movie_lists(theaters, scraped_at = 500.0)
+
+        # A freshly started loader has no previous index to carry first_seen over from
+        loader = service.StoreLoader(self.store_path)
+        try:
+            index = loader.load()
+        finally:
+            loader.close()
+        showings = index.new_since(499)
+        self.assertEqual(sorted((showing['title'], showing['theater']) for showing in showings), [
+            ('Amélie', 'Theater One'), ('The Lion King', 'Theater Two'), ('Toy Story 4', 'Theater One')
+        ])
+        self.assertEqual(len(index.new_since(99)), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
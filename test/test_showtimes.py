@@ -0,0 +1,163 @@
+#!/usr/local/bin/python3
+
+import unittest
+import logging
+from moviescraper import config, metrics, moviescraper, parsing, showtimes
+import os
+import shutil
+import tempfile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LISTING_PAGE = '''<html><body>
+<h2 class="date">Friday, October 18</h2>
+<div id="schedule">
+  <div class="film">
+    <h3 class="title">Parasite</h3>
+    <ul class="times"><li>7:00pm</li><li>9:30pm</li></ul>
+  </div>
+  <div class="film">
+    <h3 class="title">Knives Out  </h3>
+    <ul class="times"><li>6:45pm</li></ul>
+  </div>
+  <div class="film">
+    <span class="day">Saturday, October 19</span>
+    <h3 class="title">Little Women</h3>
+    <ul class="times"><li> 1:00pm </li><li>4:00pm</li></ul>
+  </div>
+</div>
+</body></html>'''
+
+LABELLED_PAGE = '''<html><body><div id="nowplaying">
+<p><span>Now Playing: Toy Story 4, Yesterday</span></p><p class="times">Showtimes 5:30 and 8:00</p>
+</div></body></html>'''
+
+
+MULTI_DATE_PAGE = '''<html><body>
+<div id="schedule">
+  <h2 class="date">Friday, October 18</h2>
+  <div class="film"><h3 class="title">Parasite</h3><ul class="times"><li>7:00pm</li></ul></div>
+  <div class="film"><h3 class="title">Knives Out</h3><ul class="times"><li>6:45pm</li></ul></div>
+  <h2 class="date">Saturday, October 19</h2>
+  <div class="film"><h3 class="title">Parasite</h3><ul class="times"><li>1:00pm</li></ul></div>
+</div>
+</body></html>'''
+
+FLAT_PAGE = '''<html><body>
+<div id="listing">
+  <h2 class="date">Friday, October 18</h2>
+  <h3>Parasite</h3><span class="time">7:00pm</span><span class="time">9:30pm</span>
+  <h3>Knives Out</h3><span class="time">6:45pm</span>
+  <h2 class="date">Saturday, October 19</h2>
+  <h3>Parasite</h3><span class="time">1:00pm</span>
+</div>
+<footer><span class="time">Box office opens 5:00pm</span></footer>
+</body></html>'''
+
+SINGLE_TITLE_PAGE = '''<html><body>
+<div id="feature"><h3 class="title">Parasite</h3><ul class="times"><li>7:00pm</li></ul></div>
+<div id="other"><ul class="times"><li>Private event 3:00pm</li></ul></div>
+</body></html>'''
+
+
+class TestExtract(unittest.TestCase):
+    def test_showtimes_and_dates(self):
+        soup = parsing.make_soup(LISTING_PAGE)
+        self.assertEqual(showtimes.extract(
+            soup, 'div#schedule > div.film > h3.title', showtime_selector='ul.times > li',
+            date_selector='.date, .day'
+        ), [
+            showtimes.Screening('Knives Out', 'Friday, October 18', ('6:45pm',)),
+            showtimes.Screening('Little Women', 'Saturday, October 19', ('1:00pm', '4:00pm')),
+            showtimes.Screening('Parasite', 'Friday, October 18', ('7:00pm', '9:30pm')),
+        ])
+
+    def test_nearest_preceding_date(self):
+        soup = parsing.make_soup(MULTI_DATE_PAGE)
+        self.assertEqual(showtimes.extract(
+            soup, 'div.film > h3.title', showtime_selector='ul.times > li', date_selector='h2.date'
+        ), [
+            showtimes.Screening('Knives Out', 'Friday, October 18', ('6:45pm',)),
+            showtimes.Screening('Parasite', 'Friday, October 18', ('7:00pm',)),
+            showtimes.Screening('Parasite', 'Saturday, October 19', ('1:00pm',)),
+        ])
+
+    def test_flat_listing(self):
+        # Titles and times are siblings, so each title's times are the ones up to the next title
+        soup = parsing.make_soup(FLAT_PAGE)
+        self.assertEqual(showtimes.extract(
+            soup, 'div#listing > h3', showtime_selector='span.time', date_selector='h2.date'
+        ), [
+            showtimes.Screening('Knives Out', 'Friday, October 18', ('6:45pm',)),
+            showtimes.Screening('Parasite', 'Friday, October 18', ('7:00pm', '9:30pm')),
+            showtimes.Screening('Parasite', 'Saturday, October 19', ('1:00pm',)),
+        ])
+
+    def test_single_title_block_stops_below_body(self):
+        soup = parsing.make_soup(SINGLE_TITLE_PAGE)
+        self.assertEqual(showtimes.extract(soup, 'h3.title', showtime_selector='ul.times > li'), [
+            showtimes.Screening('Parasite', None, ('7:00pm',)),
+        ])
+
+    def test_titles_only(self):
+        soup = parsing.make_soup(LISTING_PAGE)
+        self.assertEqual(showtimes.extract(soup, 'div#schedule > div.film > h3.title'), [
+            showtimes.Screening('Knives Out', None, ()),
+            showtimes.Screening('Little Women', None, ()),
+            showtimes.Screening('Parasite', None, ()),
+        ])
+
+    def test_text_search(self):
+        # Every title in the string shares the element's block
+        soup = parsing.make_soup(LABELLED_PAGE)
+        self.assertEqual(showtimes.extract(
+            soup, 'div#nowplaying > p > span', 'Now Playing: (.+)$', showtime_selector='p.times'
+        ), [
+            showtimes.Screening('Toy Story 4', None, ('Showtimes 5:30 and 8:00',)),
+            showtimes.Screening('Yesterday', None, ('Showtimes 5:30 and 8:00',)),
+        ])
+
+
+class TestTheaterScreenings(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.site_path = os.path.join(self.test_dir, 'listing.html')
+        with open(self.site_path, 'w') as html_file:
+            html_file.write(LISTING_PAGE)
+        self.theater_info = {
+            'theater_name': 'Film House', 'site_url': self.site_path,
+            'list_selector': 'div#schedule > div.film > h3.title', 'showtime_selector': 'ul.times > li',
+            'date_selector': 'h2.date'
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_screenings(self):
+        theater_metrics = metrics.Metrics()
+        theater = moviescraper.Theater(metrics=theater_metrics, **self.theater_info)
+        screenings = theater.screenings()
+        self.assertEqual([screening.title for screening in screenings], ['Knives Out', 'Little Women', 'Parasite'])
+        self.assertEqual(screenings[2].times, ('7:00pm', '9:30pm'))
+        self.assertEqual(set(screening.date for screening in screenings), {'Friday, October 18'})
+        # The extended scrape leaves the movie list alone
+        self.assertIsNone(theater.movie_list)
+        self.assertEqual(theater.movies(), ['Knives Out', 'Little Women', 'Parasite'])
+
+    def test_filter_and_streaming_parser(self):
+        theater = moviescraper.Theater(parser=parsing.STREAM, **self.theater_info)
+        theater.movie_filter = ['Women']
+        self.assertEqual(theater.screenings(), [
+            showtimes.Screening('Little Women', 'Friday, October 18', ('1:00pm', '4:00pm'))
+        ])
+
+    def test_config_fields(self):
+        theater = moviescraper.Theater(**self.theater_info)
+        self.assertEqual(config.validate_theater(theater.to_config()), self.theater_info)
+        theater_list = moviescraper.TheaterList([self.theater_info])
+        self.assertEqual(list(theater_list.screenings()), ['Film House'])
+
+
+if __name__ == '__main__':
+    unittest.main()
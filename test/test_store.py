@@ -0,0 +1,182 @@
+#!/usr/local/bin/python3
+
+import unittest
+import logging
+from moviescraper import moviescraper
+from moviescraper import config, metrics, parsing, store
+import os
+import shutil
+import sqlite3
+import tempfile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_SITE = os.path.join(os.path.dirname(__file__), 'sample_site.html')
+
+
+def make_config(count):
+    return [
+        {
+            'theater_name': 'Test Theater {:04d}'.format(x),
+            'site_url': 'http://testtheatersite{}.com/'.format(x),
+            'list_selector': 'div#test-id > div.test-class > span'
+        } for x in range(count)
+    ]
+
+
+class TestTheaterStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'theaters.db')
+        self.store = store.TheaterStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_schema_version(self):
+        self.assertEqual(self.store.schema_version(), store.SCHEMA_VERSION)
+
+    def test_newer_schema_rejected(self):
+        self.store.connection.execute('PRAGMA user_version = {}'.format(store.SCHEMA_VERSION + 1))
+        with self.assertRaises(store.StoreError):
+            store.TheaterStore(self.path)
+
+    def test_bulk_import_and_load(self):
+        self.assertEqual(self.store.import_config(make_config(1200)), 1200)
+        self.assertEqual(len(self.store.theater_names()), 1200)
+        theaters = self.store.load_theaters()
+        self.assertEqual(theaters[0].theater_name, 'Test Theater 0000')
+        self.assertEqual(theaters[-1].site_url, 'http://testtheatersite1199.com/')
+
+    def test_import_updates_existing(self):
+        self.store.import_config(make_config(2))
+        changed = dict(make_config(1)[0], list_selector='ul > li')
+        self.store.import_config([changed])
+        self.assertEqual(self.store.load_theater('Test Theater 0000').list_selector, 'ul > li')
+        self.assertEqual(len(self.store.theater_names()), 2)
+
+    def test_lazy_load(self):
+        self.store.import_config(make_config(700))
+        names = ['Test Theater 0650', 'Test Theater 0003']
+        self.assertEqual([theater.theater_name for theater in self.store.load_theaters(names)], names)
+        with self.assertRaises(KeyError):
+            self.store.load_theater('Missing Theater')
+
+    def test_load_options(self):
+        self.store.import_config(make_config(1))
+        theater = self.store.load_theater('Test Theater 0000', parser=parsing.STRAINER)
+        self.assertEqual(theater.parser, parsing.STRAINER)
+
+    def test_save_movie_lists(self):
+        self.store.import_config(make_config(2))
+        theaters = self.store.load_theaters()
+        theaters[0].movie_list = ['A Movie', 'Another Movie']
+        self.store.save_movie_lists(theaters[:1])
+        self.assertEqual(self.store.movie_lists(), {'Test Theater 0000': ['A Movie', 'Another Movie']})
+        self.assertEqual(self.store.load_theater('Test Theater 0000').movie_list, ['A Movie', 'Another Movie'])
+        self.assertIsNone(self.store.load_theater('Test Theater 0001').movie_list)
+
+    def test_scrape_state(self):
+        self.store.import_config([{
+            'theater_name': 'Test Theater', 'site_url': SAMPLE_SITE,
+            'list_selector': 'div#test-id > div.test-class > span'
+        }, {
+            'theater_name': 'Empty Theater', 'site_url': SAMPLE_SITE, 'list_selector': 'div#no-such-id > span'
+        }, {
+            'theater_name': 'Unscraped Theater', 'site_url': SAMPLE_SITE, 'list_selector': 'span'
+        }])
+        theaters = self.store.load_theaters(['Test Theater', 'Empty Theater'])
+        for theater in theaters:
+            theater.movies()
+        self.store.save_movie_lists(theaters + self.store.load_theaters(['Unscraped Theater']))
+        self.assertEqual(self.store.movie_lists(), {
+            'Empty Theater': [],
+            'Test Theater': ['First Sample Movie', 'Second Sample Movie: The Return', 'Third Sample Movie']
+        })
+
+        empty, unscraped = self.store.load_theaters(['Empty Theater', 'Unscraped Theater'])
+        self.assertEqual(empty.movie_list, [])
+        self.assertEqual(empty.content_hash, theaters[1].content_hash)
+        self.assertIsNone(unscraped.movie_list)
+        self.assertIsNone(unscraped.content_hash)
+
+    def test_refresh_from_saved_state(self):
+        self.store.import_config([{
+            'theater_name': 'Test Theater', 'site_url': SAMPLE_SITE,
+            'list_selector': 'div#test-id > div.test-class > span'
+        }])
+        theater_list = self.store.theater_list()
+        theater_list.movies()
+        self.store.save_movie_lists(theater_list.theater_list)
+
+        test_metrics = metrics.Metrics()
+        theater_list = self.store.theater_list(metrics=test_metrics)
+        self.assertEqual(len(theater_list.refresh()['Test Theater']), 3)
+        self.assertEqual(test_metrics.counter('unchanged', 'Test Theater'), 1)
+        self.assertEqual(test_metrics.timing('parse', 'Test Theater').count, 0)
+
+    def test_migrate_from_version_1(self):
+        self.store.close()
+        os.remove(self.path)
+        connection = sqlite3.connect(self.path)
+        connection.executescript(store.MIGRATIONS[1] + 'PRAGMA user_version = 1;')
+        connection.execute('''INSERT INTO theaters VALUES ('Test Theater', 'http://testtheatersite.com/',
+            '{"theater_name": "Test Theater", "site_url": "http://testtheatersite.com/", "list_selector": "span"}')''')
+        connection.execute('''INSERT INTO scrape_state VALUES ('Test Theater', '["A Movie"]', 0)''')
+        connection.commit()
+        connection.close()
+
+        self.store = store.TheaterStore(self.path)
+        self.assertEqual(self.store.schema_version(), store.SCHEMA_VERSION)
+        theater = self.store.load_theater('Test Theater')
+        self.assertEqual(theater.movie_list, ['A Movie'])
+        self.assertIsNone(theater.content_hash)
+        self.assertEqual(self.store.first_seen(), {('A Movie', 'Test Theater'): 0})
+
+    def test_first_seen(self):
+        self.store.import_config(make_config(1))
+        theater = self.store.load_theater('Test Theater 0000')
+        theater.movie_list = ['A Movie', 'B Movie']
+        self.store.save_movie_lists([theater], scraped_at = 100.0)
+        theater.movie_list = ['B Movie', 'C Movie']
+        self.store.save_movie_lists([theater], scraped_at = 200.0)
+        self.assertEqual(self.store.first_seen(), {
+            ('B Movie', 'Test Theater 0000'): 100.0, ('C Movie', 'Test Theater 0000'): 200.0
+        })
+        # Dropped titles start a new run when they come back
+        theater.movie_list = ['A Movie', 'B Movie']
+        self.store.save_movie_lists([theater], scraped_at = 300.0)
+        self.assertEqual(self.store.first_seen()[('A Movie', 'Test Theater 0000')], 300.0)
+
+    def test_remove_theater(self):
+        self.store.import_config(make_config(1))
+        theater = self.store.load_theater('Test Theater 0000')
+        theater.movie_list = ['A Movie']
+        self.store.save_movie_lists([theater])
+        self.store.remove_theater('Test Theater 0000')
+        self.assertEqual(self.store.theater_names(), [])
+        self.assertEqual(self.store.movie_lists(), {})
+
+    def test_config_file_round_trip(self):
+        self.store.import_config(make_config(3))
+        path = os.path.join(self.test_dir, 'theaters.json')
+        self.store.export_config_file(path)
+        self.assertEqual(config.load_config(path), make_config(3))
+
+    def test_theater_list(self):
+        self.store.import_config([{
+            'theater_name': 'Test Theater', 'site_url': SAMPLE_SITE,
+            'list_selector': 'div#test-id > div.test-class > span'
+        }])
+        theater_list = self.store.theater_list()
+        self.assertEqual(theater_list.movies(), {
+            'Test Theater': ['First Sample Movie', 'Second Sample Movie: The Return', 'Third Sample Movie']
+        })
+        self.store.save_movie_lists(theater_list.theater_list)
+        self.assertEqual(len(self.store.movie_lists()['Test Theater']), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
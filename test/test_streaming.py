@@ -0,0 +1,150 @@
+#!/usr/local/bin/python3
+
+import unittest
+from io import BytesIO
+import logging
+from moviescraper import moviescraper
+from moviescraper import cache, fetch, metrics, parsing, streaming
+import os
+import shutil
+import tempfile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_SITE = os.path.join(os.path.dirname(__file__), 'sample_site.html')
+SAMPLE_SELECTOR = 'div#test-id > div.test-class > span'
+SAMPLE_MOVIES = ['First Sample Movie', 'Second Sample Movie: The Return', 'Third Sample Movie']
+LISTING = '''<html><body>
+    <div id="listing"><ul class="films">
+        <li><a>First Film</a></li>
+        <li><a>Second &amp; Third</a></li>
+    </ul></div>
+'''
+
+
+class TrackedBody(BytesIO):
+    # Remembers how far the response body was read before it was closed
+    def read(self, *args, **kwargs):
+        data = super(TrackedBody, self).read(*args, **kwargs)
+        self.bytes_read = self.tell()
+        return data
+
+
+def large_page(filler_bytes = 1024 * 1024):
+    return (LISTING + '<p>filler</p>' * (filler_bytes // 13) + '</body></html>').encode('utf-8')
+
+
+class TestStreamSelector(unittest.TestCase):
+    def soup_strings(self, markup, selector):
+        return [element.string for element in parsing.select(parsing.make_soup(markup), selector)]
+
+    def test_matches_soup_select(self):
+        with open(SAMPLE_SITE) as html_file:
+            markup = html_file.read()
+        for selector in (SAMPLE_SELECTOR, 'span', 'div span', 'body > div#test-id span', '* > b', 'p b', 'div.other-class'):
+            for chunk_size in (1, 7, 4096):
+                self.assertEqual(
+                    sorted(streaming.select_strings(streaming.text_chunks(markup, chunk_size), selector), key=str),
+                    sorted(self.soup_strings(markup, selector), key=str),
+                    '{} in chunks of {}'.format(selector, chunk_size)
+                )
+
+    def test_element_string(self):
+        markup = '<ul><li><a><b>Nested</b></a></li><li>Mixed <b>text</b></li><li></li><li>A &amp; B<br></li></ul>'
+        self.assertEqual(list(streaming.select_strings([markup], 'ul > li')), ['Nested', None, None, None])
+        self.assertEqual(self.soup_strings(markup, 'ul > li'), ['Nested', None, None, None])
+        self.assertEqual(list(streaming.select_strings([markup], 'li a')), ['Nested'])
+
+    def test_unsupported_selectors(self):
+        for selector in ('div > span, p > b', 'li:nth-child(2) > a', '[data-title]', 'h2 + p', ''):
+            self.assertFalse(streaming.supports(selector), selector)
+            with self.assertRaises(ValueError):
+                streaming.StreamSelector(selector)
+        self.assertTrue(streaming.supports('div.one.two > span'))
+
+    def test_stops_after_id_container(self):
+        consumed = []
+
+        def chunks():
+            for chunk in [LISTING] + ['<p>filler</p>'] * 100:
+                consumed.append(chunk)
+                yield chunk
+
+        self.assertEqual(list(streaming.select_strings(chunks(), 'div#listing li > a')), ['First Film', 'Second & Third'])
+        self.assertEqual(len(consumed), 1)
+
+    def test_reads_to_end_without_id(self):
+        markup = '<ul class="films"><li>One</li></ul><p>filler</p><ul class="films"><li>Two</li></ul>'
+        self.assertEqual(list(streaming.select_strings(streaming.text_chunks(markup, 5), 'ul.films > li')), ['One', 'Two'])
+
+
+class TestStreamingTheater(unittest.TestCase):
+    def setUp(self):
+        self.metrics = metrics.Metrics()
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def make_theater(self, **options):
+        theater_info = dict(site_url = SAMPLE_SITE, theater_name = 'Test Theater', list_selector = SAMPLE_SELECTOR,
+                            parser = parsing.STREAM, metrics = self.metrics)
+        theater_info.update(options)
+        return moviescraper.Theater(**theater_info)
+
+    def test_movies_from_file(self):
+        theater = self.make_theater()
+        self.assertEqual(theater.movies(), SAMPLE_MOVIES)
+        self.assertEqual(self.metrics.timing('fetch', 'Test Theater').count, 1)
+        self.assertEqual(self.metrics.timing('parse', 'Test Theater').count, 1)
+        self.assertEqual(self.metrics.counter('scrapes', 'Test Theater'), 1)
+
+    def test_iter_movies_with_filter(self):
+        theater = self.make_theater()
+        theater.movie_filter = ['Second', 'Third']
+        self.assertEqual(list(theater.iter_movies()), ['Second Sample Movie: The Return', 'Third Sample Movie'])
+        self.assertEqual(theater.movie_list, ['Second Sample Movie: The Return', 'Third Sample Movie'])
+        self.assertEqual(list(theater.iter_movies()), theater.movie_list)
+
+    def test_text_search(self):
+        theater = self.make_theater(site_url = os.path.join(self.test_dir, 'lake.html'), list_selector = 'p > span',
+                                    text_search = 'Now Playing: (.+)$')
+        with open(theater.site_url, 'w') as html_file:
+            html_file.write('<p><span>Now Playing: First Film, Second Film</span></p>')
+        self.assertEqual(list(theater.iter_movies()), ['First Film', 'Second Film'])
+
+    def test_unsupported_selector_falls_back(self):
+        theater = self.make_theater(list_selector = 'div#test-id > div.test-class > span:first-child')
+        self.assertEqual(theater.movies(), ['First Sample Movie'])
+
+    def test_stops_download_after_container(self):
+        page = large_page()
+        body = TrackedBody(page)
+        transport = fetch.LocalTransport()
+        transport.add_page('http://testtheatersite.com/', body)
+        theater = self.make_theater(site_url = 'http://testtheatersite.com/', list_selector = 'div#listing li > a',
+                                    fetcher = fetch.Fetcher(transport=transport))
+        movies = theater.iter_movies()
+        self.assertEqual(next(movies), 'First Film')
+        self.assertEqual(list(movies), ['Second & Third'])
+        self.assertLess(body.bytes_read, len(page) // 10)
+        self.assertLess(self.metrics.counter('bytes_downloaded', 'Test Theater'), len(page) // 10)
+        self.assertEqual(theater.movie_list, ['First Film', 'Second & Third'])
+
+    def test_cached_page(self):
+        transport = fetch.LocalTransport()
+        transport.add_page('http://testtheatersite.com/', LISTING)
+        theater_list = moviescraper.TheaterList([{
+            'site_url': 'http://testtheatersite.com/', 'theater_name': 'Test Theater',
+            'list_selector': 'div#listing li > a', 'parser': parsing.STREAM
+        }], cache=cache.ResponseCache(self.test_dir), fetcher=fetch.Fetcher(transport=transport), metrics=self.metrics)
+        self.assertEqual(theater_list.movies(), {'Test Theater': ['First Film', 'Second & Third']})
+        theater_list.theater_list[0].expire()
+        self.assertEqual(theater_list.movies(), {'Test Theater': ['First Film', 'Second & Third']})
+        self.assertEqual(len(transport.sent), 1)
+        self.assertEqual(self.metrics.counter('cache_hits', 'Test Theater'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
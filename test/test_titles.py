@@ -0,0 +1,55 @@
+#!/usr/local/bin/python3
+
+import unittest
+import logging
+from moviescraper import titles
+import random
+import re
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def strip_title_in_passes(title):
+    # The original multi-pass implementation from Theater._strip_movie_titles()
+    title = re.sub(r'^\W+', '', title)
+    title = re.sub(r'\W+$', '', title)
+    title = re.sub(r' //.*', '', title)
+    return re.sub(u"’", '\'', title)
+
+
+class TestTitles(unittest.TestCase):
+    def test_strip_title(self):
+        self.assertEqual(titles.strip_title(' A movie'), 'A movie')
+        self.assertEqual(titles.strip_title('Another movie // with some following text'), 'Another movie')
+        self.assertEqual(titles.strip_title('The Apostrophe’s Movie'), 'The Apostrophe\'s Movie')
+        self.assertEqual(titles.strip_title('’Tis the Season!'), 'Tis the Season')
+
+    def test_strip_title_matches_multi_pass(self):
+        rng = random.Random(0)
+        alphabet = ['a', 'b', ' ', '/', '/', '’', '!', ':', '-', 'é', '\n']
+        for _ in range(20000):
+            title = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            self.assertEqual(titles.strip_title(title), strip_title_in_passes(title), repr(title))
+
+    def test_canonical_key(self):
+        self.assertEqual(
+            titles.canonical_key('Spider-Man: Far From Home'),
+            titles.canonical_key('Spider-man - Far from Home')
+        )
+        self.assertEqual(titles.canonical_key('Amélie (2001)'), 'amelie')
+        self.assertEqual(titles.canonical_key('Ocean’s Eleven'), titles.canonical_key("OCEAN'S ELEVEN"))
+        self.assertEqual(titles.canonical_key('  Toy Story 4 // 3D'), 'toy story 4')
+        self.assertEqual(titles.canonical_key('1917'), '1917')
+        self.assertEqual(titles.canonical_key('Blade Runner 2049'), 'blade runner 2049')
+
+    def test_caches_are_bounded(self):
+        titles.clear_caches()
+        titles.canonical_key('Rocketman')
+        titles.canonical_key('Rocketman')
+        self.assertEqual(titles.canonical_key.cache_info().hits, 1)
+        self.assertEqual(titles.canonical_key.cache_info().maxsize, titles.CACHE_SIZE)
+
+
+if __name__ == '__main__':
+    unittest.main()